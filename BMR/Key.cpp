@@ -7,7 +7,7 @@
 #include <string.h>
 #include "Key.h"
 
-Key Key::prod(uint8_t x, const std::vector<Key> &delta) {
+Key Key::prod(uint32_t x, const std::vector<Key> &delta) {
 	Key k(0LL);
 	for(std::size_t i=0; i < delta.size(); i++) {
 		if(((x >> i) & 0x1) > 0) {
@@ -17,16 +17,16 @@ Key Key::prod(uint8_t x, const std::vector<Key> &delta) {
 	return k;
 }
 
-void Key::set_signal(std::size_t n, uint8_t signal) {
-	assert(n <= 8);
+void Key::set_signal(std::size_t n, uint32_t signal) {
+	assert(n <= 32);
 	long long mask = ~0ul << n;
 	r &= ~_mm_cvtsi64_si128(~mask);
 	r ^= _mm_cvtsi64_si128(signal);
 }
 
-uint8_t Key::get_signal(std::size_t n) const {
-	assert(n <= 8);
-	return (uint8_t)(get<unsigned long>()) & ~(0xFF << n);
+uint32_t Key::get_signal(std::size_t n) const {
+	assert(n <= 32);
+	return (uint32_t)(get<unsigned long>() & ~(~0ul << n));
 }
 
 ostream& operator<<(ostream& o, const Key& key)
@@ -40,11 +40,11 @@ public:
 	void set_signal(bool signal);
 
 	// returns the n least significant bits
-	// n <= 8
-	uint8_t get_signal(std::size_t n) const;
+	// n <= 32
+	uint32_t get_signal(std::size_t n) const;
 	// sets the n least significant bits to signal
-	// n<=8
-	void set_signal(std::size_t n, uint8_t signal);
+	// n <= 32
+	void set_signal(std::size_t n, uint32_t signal);
 
 	Key doubling(int i) const;
 
@@ -55,7 +55,7 @@ public:
 	// x = x0 x1 x2 x3 ...
 	// delta = d0 d1 d2 d3 ...
 	// returns x0 * d0 + x1 * d1 + ...
-	static Key prod(uint8_t x, const std::vector<Key> &delta);
+	static Key prod(uint32_t x, const std::vector<Key> &delta);
 };
 
 ostream& operator<<(ostream& o, const Key& key);
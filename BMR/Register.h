@@ -18,6 +18,7 @@ using namespace std;
 #include "GC/Memory.h"
 #include "GC/Access.h"
 #include "GC/ArgTuples.h"
+#include "GC/Instruction.h"
 #include "Math/gf2n.h"
 #include "Tools/FlexBuffer.h"
 #include "Tools/PointerVector.h"
@@ -239,7 +240,11 @@ public:
   template <class T>
 	static void xorm(T&, const vector<int>&) { throw not_implemented(); }
   template <class T>
-	static void projs(T&, const vector<int>&) { throw not_implemented(); }
+	static void projs(T&, const vector<int>&, const GC::TruthTables&) { throw not_implemented(); }
+  template <class T>
+	static void projms(T&, const vector<int>&, const GC::TruthTables&) { throw not_implemented(); }
+  template <class T>
+	static void inputbn(T&, const vector<int>&) { throw not_implemented(); }
   template <class T>
 	static void xormn(T&, const vector<int>&) { throw not_implemented(); }
 	template <class T>
@@ -305,7 +310,7 @@ public:
 	void other_input(Input&, int) {}
 
 	char get_output() { return 0; }
-  uint8_t get_output(std::size_t&) { throw not_implemented(); }
+  uint32_t get_output(std::size_t&) { throw not_implemented(); }
 
 	ProgramRegister(const Register& reg) : Register(reg) {}
 };
@@ -405,7 +410,7 @@ public:
 	void random();
 	void output();
 	unsigned long long get_output() { return Register::get_output(); }
-  uint8_t get_output(std::size_t&) { throw not_implemented(); }
+  uint32_t get_output(std::size_t&) { throw not_implemented(); }
 
 	template <class T>
 	static void store_clear_in_dynamic(GC::Memory<T>& mem,
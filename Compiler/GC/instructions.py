@@ -73,6 +73,9 @@ opcodes = dict(
     CONVCBIT = 0x230,
     CONVCBITVEC = 0x231,
     PROJS = 0x24a,
+    PROJMS = 0x24c,
+    TRUTHTABLE = 0x24d,
+    INPUTBN = 0x24e,
     REVEALN = 0x250,
     XORMN = 0x24b,
 )
@@ -157,6 +160,9 @@ class andrs(BinaryVectorInstruction):
     def add_usage(self, req_node):
         req_node.increment(('bit', 'triple'), sum(self.args[::4]))
 
+    def n_gates(self):
+        return sum(self.args[::4])
+
 class ands(BinaryVectorInstruction):
     """ Bitwise AND of secret bit register vector.
 
@@ -173,6 +179,9 @@ class ands(BinaryVectorInstruction):
     def add_usage(self, req_node):
         req_node.increment(('bit', 'triple'), sum(self.args[::4]))
 
+    def n_gates(self):
+        return sum(self.args[::4])
+
 class andm(BinaryVectorInstruction):
     """ Bitwise AND of single secret and clear bit registers.
 
@@ -569,6 +578,34 @@ class inputbvec(base.DoNotEliminateInstruction, base.VarArgsInstruction,
         for x in self.get_arg_tuples(self.args):
             req_node.increment(('bit', 'input', x[2]), x[0] - 3)
 
+class inputbn(base.DoNotEliminateInstruction, base.VarArgsInstruction,
+              base.Mergeable):
+    """ Copy private input to n-bit wires, one input per wire. The
+    input is read as integer in :math:`[-2^n, 2^n)`, and negative
+    values are taken modulo :math:`2^n`. The bit-length is between 2
+    and 32, use :py:class:`inputb` for single bits. The wire labels
+    are chosen directly by the garbler or obtained by oblivious
+    transfer of n-bit labels for the evaluator.
+
+    :param: player number (int)               +
+    :param: bit-length of the wires (int)      |
+    :param: number of wires (int)              | repeat
+    :param: destination (sbit)                 +
+    """
+    __slots__ = []
+    code = opcodes['INPUTBN']
+    arg_format = tools.cycle(['p','int','int','sbw'])
+    is_vec = lambda self: True
+
+    def __init__(self, *args, **kwargs):
+        assert all(2 <= n_bits <= 32 for n_bits in args[1::4])
+        super(inputbn, self).__init__(*args, **kwargs)
+
+    def add_usage(self, req_node):
+        for i in range(0, len(self.args), 4):
+            req_node.increment(('bit', 'input', self.args[i]),
+                               self.args[i + 1] * self.args[i + 2])
+
 class print_regb(base.VectorInstruction, base.IOInstruction):
     """ Debug output of clear bit register.
 
@@ -630,19 +667,74 @@ class projs(base.VarArgsInstruction, base.Mergeable):
     :param: number of destination-source pairs to follow
     :param: bit-length of destination register value (int)
     :param: bit-length of source register value (int)
-    :param: truth table of the projection 4 rows are encoded per int (one per byte) (int)
+    :param: truth table of the projection, rows are encoded as 4 per int (one per byte) for up to 8 output bits, 2 per int for up to 16 bits, and 1 per int for up to 32 bits (int). When writing the bytecode, this is replaced by the index of a :py:class:`truthtable` of the tape (int)
     :param: number of wires in register (int)   +
     :param: destination (sbit)                  | repeat
     :param: source (sbit)                       +
     """
     code = opcodes['PROJS']
     is_vec = lambda self: True
-    def __init__(self, *args):
-        truth_table_size = 2**args[2]
-        n_ints = int(math.ceil(truth_table_size/4.))
+    def __init__(self, *args, **kwargs):
+        n_ints = self.truth_table_size(args[2], args[1])
         self.arg_format = ['int', 'int', 'int'] + ['int'] * n_ints + ['int', 'sbw', 'sb'] * args[0]
         self.truth_table = args[3:3+n_ints]
-        super(projs, self).__init__(*args)
+        self.tuples_offset = 3 + n_ints
+        super(projs, self).__init__(*args, **kwargs)
+
+    @staticmethod
+    def rows_per_int(output_size):
+        if output_size <= 8:
+            return 4
+        elif output_size <= 16:
+            return 2
+        else:
+            return 1
+
+    @classmethod
+    def truth_table_size(cls, input_size, output_size):
+        """ Number of ints used to encode a truth table. """
+        return int(math.ceil(2**input_size / cls.rows_per_int(output_size)))
+
+    @classmethod
+    def encode_truth_table(cls, truth_table, output_size=8):
+        """ Pack truth table rows into ints, as many rows per int as fit
+        in 32 bits after rounding to 8, 16, or 32 bits per row. """
+        rows_per_int = cls.rows_per_int(output_size)
+        row_bits = 32 // rows_per_int
+        res = []
+        for i in range(0, len(truth_table), rows_per_int):
+            res.append(sum((row % 2 ** row_bits) << (row_bits * k)
+                           for k, row in enumerate(
+                                   truth_table[i:i+rows_per_int])))
+        return res
+
+    @classmethod
+    def decode_truth_table(cls, ints, input_size, output_size):
+        """ Unpacked truth table, one entry per row. """
+        rows_per_int = cls.rows_per_int(output_size)
+        row_bits = 32 // rows_per_int
+        return [(ints[x // rows_per_int] >> (row_bits * (x % rows_per_int)))
+                % 2 ** row_bits for x in range(2**input_size)]
+
+    def get_truth_table(self):
+        """ Unpacked truth table, one entry per row. """
+        return self.decode_truth_table(self.truth_table, self.args[2],
+                                       self.args[1])
+
+    def get_arg_tuples(self):
+        """ (number of wires, destination, source) for every pair. """
+        for i in range(self.tuples_offset, len(self.args), 3):
+            yield self.args[i:i+3]
+
+    def intern_truth_tables(self, pool):
+        """ Replace the inline truth table by its index in :py:obj:`pool`,
+        which maps (input bit-length, output bit-length, encoded table)
+        to indices. """
+        key = self.args[2], self.args[1], tuple(self.truth_table)
+        index = pool.setdefault(key, len(pool))
+        self.args[3:self.tuples_offset] = [index]
+        self.arg_format[3:self.tuples_offset] = ['int']
+        self.tuples_offset = 4
 
     def merge_id(self):
         # mergeable if same input and output bit-length and same truth table
@@ -650,12 +742,95 @@ class projs(base.VarArgsInstruction, base.Mergeable):
     def merge(self, other):
         assert self.truth_table == other.truth_table
         self.args[0] += other.args[0]
-        self.args += other.args[3+len(self.truth_table):]
+        self.args += other.args[other.tuples_offset:]
         self.arg_format += ['int', 'sbw', 'sb'] * other.args[0]
     def add_usage(self, req_node):
         print(f'added usage {self.args[2]}, {self.args[1]}')
-        req_node.increment(('bit', f'truthtable {self.args[2]}-to-{self.args[1]}-bit'), sum(self.args[3+len(self.truth_table)::3]))
+        req_node.increment(('bit', f'truthtable {self.args[2]}-to-{self.args[1]}-bit'), sum(self.args[self.tuples_offset::3]))
+    def n_gates(self):
+        return sum(self.args[self.tuples_offset::3])
+
 
+class projms(base.VarArgsInstruction, base.Mergeable):
+    """
+    Apply several projection functions to the same register value and
+    store the results in separate registers. The input is decoded once
+    for all projections.
+
+    :param: number of truth tables (int)
+    :param: bit-length of source register value (int)
+    :param: bit-length of destination register value (int)
+    :param: (repeat for every truth table)...
+    :param: truth table of the projection encoded as for :py:class:`projs` according to the respective bit-length, or the index of a :py:class:`truthtable` in the bytecode (int)
+    :param: (repeat for every truth table)...
+    :param: number of wires in register (int)   +
+    :param: destination (sbit)                  |
+    :param: (repeat for every truth table)...   | repeat
+    :param: source (sbit)                       +
+    """
+    code = opcodes['PROJMS']
+    is_vec = lambda self: True
+    def __init__(self, *args, **kwargs):
+        n_tables = args[0]
+        offset = 2 + n_tables
+        self.truth_tables = []
+        for output_size in args[2:2 + n_tables]:
+            n_ints = projs.truth_table_size(args[1], output_size)
+            self.truth_tables.append(args[offset:offset + n_ints])
+            offset += n_ints
+        self.tuples_offset = offset
+        n_tuples = (len(args) - offset) // (n_tables + 2)
+        self.arg_format = ['int'] * offset + \
+            (['int'] + ['sbw'] * n_tables + ['sb']) * n_tuples
+        super(projms, self).__init__(*args, **kwargs)
+
+    def get_arg_tuples(self):
+        """ (number of wires, destinations..., source) for every input. """
+        step = self.args[0] + 2
+        for i in range(self.tuples_offset, len(self.args), step):
+            yield self.args[i:i+step]
+
+    def intern_truth_tables(self, pool):
+        """ Replace the inline truth tables by their indices in
+        :py:obj:`pool` as in :py:meth:`projs.intern_truth_tables`. """
+        n_tables = self.args[0]
+        indices = [pool.setdefault((self.args[1], output_size, tuple(table)),
+                                   len(pool))
+                   for output_size, table in zip(self.args[2:2 + n_tables],
+                                                 self.truth_tables)]
+        self.args[2 + n_tables:self.tuples_offset] = indices
+        self.arg_format[2 + n_tables:self.tuples_offset] = ['int'] * n_tables
+        self.tuples_offset = 2 + 2 * n_tables
+
+    def merge_id(self):
+        # mergeable if same bit-lengths and same truth tables
+        return (type(self),) + tuple(self.args[:2 + self.args[0]]) + \
+            tuple(x for t in self.truth_tables for x in t)
+    def merge(self, other):
+        assert self.truth_tables == other.truth_tables
+        self.args += other.args[other.tuples_offset:]
+        self.arg_format += other.arg_format[other.tuples_offset:]
+    def add_usage(self, req_node):
+        n = sum(self.args[self.tuples_offset::self.args[0] + 2])
+        for out_bits in self.args[2:2 + self.args[0]]:
+            req_node.increment(('bit', f'truthtable {self.args[1]}-to-{out_bits}-bit'), n)
+    def n_gates(self):
+        return self.args[0] * sum(self.args[self.tuples_offset::self.args[0] + 2])
+
+class truthtable(base.VarArgsInstruction):
+    """ Define a truth table for the projection gates in the tape. The
+    tables are written once per tape, and :py:class:`projs` and
+    :py:class:`projms` refer to them by index in the bytecode.
+
+    :param: index (int)
+    :param: bit-length of source register value (int)
+    :param: bit-length of destination register value (int)
+    :param: truth table encoded as for :py:class:`projs` (int)
+    """
+    code = opcodes['TRUTHTABLE']
+    def __init__(self, *args, **kwargs):
+        self.arg_format = ['int'] * len(args)
+        super(truthtable, self).__init__(*args, **kwargs)
 
 class revealn(base.VarArgsInstruction, base.Mergeable):
     """ Reveal secret n-bit register vectors and copy result to clear bit
@@ -0,0 +1,276 @@
+"""
+This module contains compile-time optimizations for binary circuits
+using projection gates and n-bit wires. The passes work on the
+instructions of a single basic block before merging, which means that
+every projection is still a separate :py:class:`projs` instruction.
+"""
+
+import Compiler.GC.instructions as inst
+from Compiler.instructions import ldint_class
+from collections import defaultdict
+
+class ProjOptimizer:
+    """ Rewrites chains of projection gates within a basic block. """
+    descriptions = dict(
+        absorbed='constant XORs absorbed into projection tables',
+        fused='projection tables eliminated by fusion',
+        merged='projections merged into multi-output gates',
+        unused='unused projections removed',
+    )
+
+    def __init__(self, block):
+        self.block = block
+        self.counter = defaultdict(lambda: 0)
+
+    def run(self):
+        instructions = self.block.instructions
+        if not any(isinstance(x, (inst.projs, inst.projms))
+                   for x in instructions):
+            return
+        self.remove_unused(instructions)
+        self.absorb_constants(instructions)
+        self.fuse_projections(instructions)
+        self.merge_sources(instructions)
+
+    @staticmethod
+    def count_uses(instructions):
+        uses = defaultdict(lambda: 0)
+        for instr in instructions:
+            if instr is not None:
+                for reg in instr.get_used():
+                    uses[id(reg.vectorbase)] += 1
+        return uses
+
+    @classmethod
+    def is_intermediate(cls, reg, uses):
+        """ Whether :py:obj:`reg` is read exactly once in this block
+        and nowhere else. """
+        if reg.vectorbase is not reg or uses[id(reg)] != 1:
+            return False
+        return cls.can_eliminate(reg)
+
+    @classmethod
+    def can_eliminate(cls, reg):
+        regs = [reg] + reg.vector
+        return all(dup.can_eliminate for x in regs for dup in x.duplicates)
+
+    @staticmethod
+    def is_plain(reg):
+        """ Whether :py:obj:`reg` is not linked to any other register. """
+        return reg.vectorbase is reg and not reg.vector and \
+            len(reg.duplicates) == 1
+
+    @staticmethod
+    def single_pair(instr):
+        if isinstance(instr, inst.projs) and instr.args[0] == 1:
+            return next(instr.get_arg_tuples())
+
+    @staticmethod
+    def find_constants(instructions):
+        """ Map clear bit registers loaded with a compile-time constant
+        to the defining instruction and the constant. """
+        regints = {}
+        res = {}
+        for i, instr in enumerate(instructions):
+            if isinstance(instr, ldint_class) and instr.get_size() == 1:
+                regints[id(instr.args[0])] = instr.args[1]
+            elif isinstance(instr, inst.convcint) and \
+                 id(instr.args[1]) in regints:
+                res[id(instr.args[0])] = i, regints[id(instr.args[1])]
+        return res
+
+    def remove_unused(self, instructions):
+        """ Remove projections whose output is not read anywhere, for
+        example bits extracted from an n-bit wire only to be combined
+        to the same wire again. Multi-output projections lose the
+        unused outputs and their truth tables. Going backwards also
+        removes chains of such projections. """
+        uses = self.count_uses(instructions)
+        def unused(dest):
+            return self.is_plain(dest) and not uses[id(dest)] and \
+                self.can_eliminate(dest)
+        for i in reversed(range(len(instructions))):
+            instr = instructions[i]
+            if isinstance(instr, inst.projms):
+                self.remove_unused_outputs(instructions, i, unused, uses)
+                continue
+            pair = self.single_pair(instr)
+            if pair is None:
+                continue
+            n, dest, src = pair
+            if unused(dest):
+                uses[id(src.vectorbase)] -= 1
+                instructions[i] = None
+                self.counter['unused'] += n
+        instructions[:] = [x for x in instructions if x is not None]
+
+    def remove_unused_outputs(self, instructions, i, unused, uses):
+        """ Drop the unused outputs of the :py:class:`projms` at
+        position :py:obj:`i`, replacing it by a :py:class:`projs` if
+        only one is left. """
+        instr = instructions[i]
+        tuples = list(instr.get_arg_tuples())
+        if len(tuples) != 1:
+            return
+        n, *dests, src = tuples[0]
+        n_tables = instr.args[0]
+        keep = [j for j in range(n_tables) if not unused(dests[j])]
+        if len(keep) == n_tables:
+            return
+        self.counter['unused'] += n * (n_tables - len(keep))
+        output_sizes = instr.args[2:2 + n_tables]
+        if not keep:
+            uses[id(src.vectorbase)] -= 1
+            instructions[i] = None
+        elif len(keep) == 1:
+            j = keep[0]
+            instructions[i] = inst.projs(
+                1, output_sizes[j], instr.args[1], *instr.truth_tables[j],
+                n, dests[j], src, add_to_prog=False)
+        else:
+            instructions[i] = inst.projms(
+                len(keep), instr.args[1], *(output_sizes[j] for j in keep),
+                *(x for j in keep for x in instr.truth_tables[j]),
+                n, *(dests[j] for j in keep), src, add_to_prog=False)
+
+    def absorb_constants(self, instructions):
+        """ Remove XORs of n-bit wires with constants by permuting the
+        truth table of the following projection (``T'(x) = T(x ^ c)``)
+        or adding the constant to the outputs of the preceding one
+        (``T'(x) = T(x) ^ c``). """
+        constants = self.find_constants(instructions)
+        uses = self.count_uses(instructions)
+        last_proj = {}
+        last_xor = {}
+        loaded = []
+        for i, instr in enumerate(instructions):
+            if isinstance(instr, inst.xormn) and len(instr.args) == 5 and \
+               id(instr.args[4]) in constants:
+                bit_length, n, dest, src, cb = instr.args
+                c = constants[id(cb)][1] % 2 ** bit_length
+                j = last_proj.pop(id(src), None)
+                if j is not None:
+                    proj = instructions[j]
+                    if self.single_pair(proj)[0] == n and \
+                       proj.args[1] == bit_length and \
+                       self.is_intermediate(src, uses):
+                        table = [y ^ c for y in proj.get_truth_table()]
+                        instructions[j] = inst.projs(
+                            1, bit_length, proj.args[2],
+                            *inst.projs.encode_truth_table(table, bit_length),
+                            n, dest, proj.args[-1], add_to_prog=False)
+                        instructions[i] = None
+                        last_proj[id(dest)] = j
+                        loaded.append(cb)
+                        self.counter['absorbed'] += n
+                        continue
+                last_xor[id(dest)] = i, c
+            pair = self.single_pair(instr)
+            if pair is None:
+                continue
+            n, dest, src = pair
+            j, c = last_xor.pop(id(src), (None, None))
+            if j is not None:
+                xor = instructions[j]
+                if xor.args[1] == n and xor.args[0] == instr.args[2] and \
+                   self.is_intermediate(src, uses):
+                    t = instr.get_truth_table()
+                    table = [t[x ^ c] for x in range(len(t))]
+                    instr = inst.projs(
+                        1, instr.args[1], instr.args[2],
+                        *inst.projs.encode_truth_table(
+                            table, instr.args[1]),
+                        n, dest, xor.args[3], add_to_prog=False)
+                    instructions[i] = instr
+                    instructions[j] = None
+                    loaded.append(xor.args[4])
+                    self.counter['absorbed'] += n
+            last_proj[id(dest)] = i
+        # remove constants that are not needed anymore
+        for regs in (loaded, [instructions[constants[id(cb)][0]].args[1]
+                              for cb in loaded]):
+            uses = self.count_uses(instructions)
+            defs = dict((id(x.args[0]), i) for i, x in enumerate(instructions)
+                        if isinstance(x, (ldint_class, inst.convcint)))
+            for reg in regs:
+                j = defs.get(id(reg))
+                if j is not None and not uses[id(reg)] and \
+                   self.can_eliminate(reg):
+                    instructions[j] = None
+        instructions[:] = [x for x in instructions if x is not None]
+
+    def fuse_projections(self, instructions):
+        """ Replace ``projs(T2, projs(T1, x))`` by ``projs(T2 o T1, x)``
+        if the intermediate register has no other consumers. """
+        uses = self.count_uses(instructions)
+        last_proj = {}
+        for i, instr in enumerate(instructions):
+            pair = self.single_pair(instr)
+            if pair is None:
+                continue
+            n, dest, src = pair
+            j = last_proj.pop(id(src), None)
+            if j is not None:
+                first = instructions[j]
+                n_first, _, first_src = self.single_pair(first)
+                if n_first == n and first.args[1] == instr.args[2] and \
+                   self.is_intermediate(src, uses):
+                    mask = 2 ** first.args[1] - 1
+                    t1, t2 = first.get_truth_table(), instr.get_truth_table()
+                    table = [t2[y & mask] for y in t1]
+                    instr = inst.projs(
+                        1, instr.args[1], first.args[2],
+                        *inst.projs.encode_truth_table(
+                            table, instr.args[1]),
+                        n, dest, first_src, add_to_prog=False)
+                    instructions[i] = instr
+                    instructions[j] = None
+                    self.counter['fused'] += n
+            last_proj[id(dest)] = i
+        instructions[:] = [x for x in instructions if x is not None]
+
+    def merge_sources(self, instructions):
+        """ Replace projections of the same source register by a single
+        :py:class:`projms` at the position of the first one. The later
+        destinations are only defined earlier, which is safe if they
+        are written and read nowhere else in between. """
+        n_defs = defaultdict(lambda: 0)
+        first_use = {}
+        for i, instr in enumerate(instructions):
+            for reg in instr.get_used():
+                first_use.setdefault(id(reg.vectorbase), i)
+            for reg in instr.get_def():
+                n_defs[id(reg.vectorbase)] += 1
+        groups = []
+        pending = {}
+        for i, instr in enumerate(instructions):
+            pair = self.single_pair(instr)
+            if pair is not None:
+                n, dest, src = pair
+                if id(src) in pending:
+                    if n_defs[id(dest)] == 1 and self.is_plain(dest) and \
+                       first_use.get(id(dest), len(instructions)) > i:
+                        pending[id(src)].append(i)
+                elif self.is_plain(src):
+                    pending[id(src)] = [i]
+                    groups.append(pending[id(src)])
+            for reg in instr.get_def():
+                pending.pop(id(reg.vectorbase), None)
+        for group in groups:
+            if len(group) < 2:
+                continue
+            projections = sorted(
+                [(instructions[i].args[1], instructions[i].truth_table,
+                  instructions[i].args[-2]) for i in group],
+                key=lambda x: x[:2])
+            first = instructions[group[0]]
+            n, _, src = self.single_pair(first)
+            instructions[group[0]] = inst.projms(
+                len(projections), first.args[2],
+                *(x[0] for x in projections),
+                *(y for x in projections for y in x[1]),
+                n, *(x[2] for x in projections), src, add_to_prog=False)
+            for i in group[1:]:
+                instructions[i] = None
+            self.counter['merged'] += n * (len(group) - 1)
+        instructions[:] = [x for x in instructions if x is not None]
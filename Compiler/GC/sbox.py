@@ -0,0 +1,844 @@
+"""
+This module contains the cost model behind
+:py:meth:`Compiler.GC.types.sbits.sbox`. An S-box can be evaluated
+either as projection gate on an n-bit wire or as bitsliced circuit of
+XOR and AND gates on 1-bit wires. Projections are much cheaper to
+evaluate while AND gates are cheaper to garble and to send, so the
+choice depends on the objective set with ``--sbox-objective``.
+
+The bitsliced circuit is the one with the fewest AND gates among a
+known circuit (:py:mod:`Compiler.GC.sbox_circuits`), a recursive
+decomposition sharing subfunctions that only differ by free XORs, and
+the algebraic normal form. This is a heuristic, so tables without
+known circuit may need more AND gates than their multiplicative
+complexity.
+
+The third option is a layered plan of smaller projections, AND gates,
+and free XORs. It is found by covering the bitsliced circuit with
+projections of at most :py:attr:`SboxPlan.max_split_inputs` wires
+where this is cheaper according to the objective. For example, the
+AES circuit contains the inversion in :math:`GF(2^4)` as function of
+four wires with seven AND gates, which is replaced by one projection
+with four outputs if evaluation is weighted enough. Another candidate
+writes the S-box as XOR of functions of disjoint sets of input bits.
+On n-bit wires, the plan requires extracting the input bits like the
+bitsliced circuit. As any projection of an n-bit wire costs as much as
+the S-box projection itself, this is never cheaper than the latter.
+Plans are cached in ``Programs/Cache`` across compilations.
+
+The conversion between n-bit wires and 1-bit wires is planned here as
+well, see :py:func:`extraction_plan`.
+"""
+
+from Compiler.exceptions import CompilerError
+import functools
+import hashlib
+import heapq
+import json
+import os
+
+class Cost:
+    """ Cost of a garbled circuit as number of hashes computed by the
+    garbler and the evaluator and number of keys sent. """
+    measures = 'garble', 'eval', 'size'
+
+    def __init__(self, garble=0, eval=0, size=0):
+        self.garble = garble
+        self.eval = eval
+        self.size = size
+
+    def __add__(self, other):
+        return Cost(*(getattr(self, x) + getattr(other, x)
+                      for x in self.measures))
+
+    def __mul__(self, factor):
+        return Cost(*(getattr(self, x) * factor for x in self.measures))
+
+    __rmul__ = __mul__
+
+    def weighted(self, objective):
+        return sum(objective[x] * getattr(self, x) for x in self.measures)
+
+    def __repr__(self):
+        return 'Cost(%s)' % ', '.join('%s=%s' % (x, getattr(self, x))
+                                       for x in self.measures)
+
+def and_cost():
+    """ Half-gate AND: four hashes for garbling, two for evaluation,
+    and two keys. """
+    return Cost(4, 2, 2)
+
+def proj_cost(input_size, n_tables=1):
+    """ Projection gates sharing one input, with one row less per
+    table due to row reduction. """
+    return Cost(2 ** input_size * n_tables, n_tables,
+                (2 ** input_size - 1) * n_tables)
+
+default_objective = dict(garble=1, eval=1, size=1)
+
+def parse_objective(spec):
+    """ Parse an objective like ``garble=1,eval=4,size=0.5``.
+    Measures not mentioned have weight zero, and ``None`` results in
+    equal weights. """
+    if spec is None:
+        return dict(default_objective)
+    res = dict((x, 0) for x in Cost.measures)
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in res:
+            raise CompilerError('unknown S-box objective: %s' % name)
+        try:
+            res[name] = float(weight)
+        except ValueError:
+            raise CompilerError('invalid weight for %s: %s' % (name, weight))
+    return res
+
+def lut_cost(input_size, n_tables=1):
+    """ Projections of 1-bit wires, combining them into one wire
+    first. """
+    return input_size * proj_cost(1) + proj_cost(input_size, n_tables)
+
+def composition_cost(n_bits):
+    """ Combining 1-bit wires into an n-bit wire, one single-row
+    projection per bit. """
+    return n_bits * proj_cost(1)
+
+@functools.lru_cache(maxsize=None)
+def extraction_plan(width, n_bits):
+    """ Cheapest way of extracting :py:obj:`n_bits` bits from a
+    :py:obj:`width`-bit wire, minimizing the number of keys first and
+    garbler hashes second. Every step projects the wire to narrower
+    wires holding disjoint groups of the needed bits, which are then
+    extracted recursively. For example, all four bits of a 4-bit wire
+    are cheapest via two 2-bit wires (42 keys instead of 60 with one
+    projection per bit), while a single bit is best projected directly.
+
+    :returns: tuple of :py:class:`Cost` and list of group sizes for
+      the first step (empty for 1-bit wires)
+    """
+    if not 0 < n_bits <= width:
+        raise CompilerError('cannot extract %d bits from %d-bit wire' %
+                            (n_bits, width))
+    if width == 1:
+        return Cost(), []
+    key = lambda cost: (cost.size, cost.garble)
+    # best[k]: cheapest way to cover k bits with groups from this wire
+    best = [(Cost(), [])]
+    for k in range(1, n_bits + 1):
+        options = []
+        for g in range(1, min(k, width - 1) + 1):
+            cost, groups = best[k - g]
+            options.append((cost + proj_cost(width) +
+                            extraction_plan(g, g)[0], groups + [g]))
+        best.append(min(options, key=lambda x: key(x[0])))
+    cost, groups = best[n_bits]
+    return cost, sorted(groups, reverse=True)
+
+def anf(table, input_size, output_size):
+    """ Algebraic normal form of every output bit as list of
+    monomials, which are bit masks of input bits. The empty mask
+    stands for the constant one. """
+    res = []
+    for j in range(output_size):
+        coeffs = [(y >> j) & 1 for y in table]
+        for i in range(input_size):
+            for x in range(2 ** input_size):
+                if (x >> i) & 1:
+                    coeffs[x] ^= coeffs[x ^ (1 << i)]
+        res.append([x for x in range(2 ** input_size) if coeffs[x]])
+    return res
+
+def components(terms, input_size):
+    """ Partition the input bits occurring in :py:obj:`terms` such
+    that no monomial contains bits of two parts. """
+    parent = list(range(input_size))
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    used = 0
+    for term in terms:
+        for mask in term:
+            used |= mask
+            bits = [i for i in range(input_size) if (mask >> i) & 1]
+            for i in bits[1:]:
+                parent[find(i)] = find(bits[0])
+    res = {}
+    for i in range(input_size):
+        if (used >> i) & 1:
+            res[find(i)] = res.get(find(i), 0) | (1 << i)
+    return sorted(res.values())
+
+def restrict(term, mask):
+    """ Truth table of the monomials of :py:obj:`term` within
+    :py:obj:`mask` as function of these bits only. """
+    positions = [i for i in range(mask.bit_length()) if (mask >> i) & 1]
+    res = []
+    for x in range(2 ** len(positions)):
+        full = sum(((x >> j) & 1) << i for j, i in enumerate(positions))
+        res.append(sum(1 for m in term if m and m & mask == m and
+                       m & full == m) % 2)
+    return res
+
+class BitCircuit:
+    """ Circuit of XOR, AND, NOT, and projection gates on 1-bit wires.
+    The first wires are the inputs, least significant first, and every
+    gate adds a wire except projections, which add a wire per truth
+    table. Outputs are pairs of wire (``None`` for zero) and whether to
+    invert it. """
+    def __init__(self, input_size, gates=None, outputs=None):
+        self.input_size = input_size
+        self.n_wires = input_size
+        self.gates = []
+        for gate in gates or []:
+            self.add(*gate)
+        self.outputs = [tuple(x) for x in outputs or []]
+
+    @classmethod
+    def trace(cls, input_size, function):
+        """ Record the gates of a function using ``^``, ``&``, and
+        ``~`` on a list of input bits. """
+        res = cls(input_size)
+        outputs = function([_Wire(res, i) for i in range(input_size)])
+        res.outputs = [(x.index, False) for x in outputs]
+        return res
+
+    def add(self, op, *args):
+        """ Add a gate, with input wires and truth tables for
+        projections.
+
+        :returns: first wire added """
+        self.gates.append((op,) + args)
+        self.n_wires += len(args[1]) if op == 'proj' else 1
+        return self.n_wires - (len(args[1]) if op == 'proj' else 1)
+
+    def n_ands(self):
+        return sum(1 for gate in self.gates if gate[0] == 'and')
+
+    def cost(self):
+        res = Cost()
+        for op, *args in self.gates:
+            if op == 'and':
+                res += and_cost()
+            elif op == 'proj':
+                res += lut_cost(len(args[0]), len(args[1]))
+        return res
+
+    def projections(self):
+        """ Number of input wires of every projection. """
+        return [len(args[0]) for op, *args in self.gates if op == 'proj']
+
+    def evaluate(self, bits, zero):
+        """ Apply to a list of registers. """
+        values = list(bits)
+        for op, *args in self.gates:
+            if op == 'xor':
+                values.append(values[args[0]] ^ values[args[1]])
+            elif op == 'and':
+                values.append(values[args[0]] & values[args[1]])
+            elif op == 'proj':
+                values.extend(_project([values[i] for i in args[0]],
+                                       args[1]))
+            else:
+                values.append(~values[args[0]])
+        res = []
+        for wire, invert in self.outputs:
+            value = zero if wire is None else values[wire]
+            res.append(~value if invert else value)
+        return res
+
+    def table(self):
+        res = []
+        for x in range(2 ** self.input_size):
+            bits = [_Bit((x >> i) & 1) for i in range(self.input_size)]
+            res.append(sum(b.value << j for j, b in enumerate(
+                self.evaluate(bits, _Bit(0)))))
+        return res
+
+    def with_constants(self, mask_in, mask_out):
+        """ Circuit computing :math:`y \oplus b` from :math:`x
+        \oplus a` for constants :math:`a` and :math:`b`. """
+        res = BitCircuit(self.input_size)
+        wires = [res.add('not', i) if (mask_in >> i) & 1 else i
+                 for i in range(self.input_size)]
+        for op, *args in self.gates:
+            assert op != 'proj'
+            wires.append(res.add(op, *(wires[x] for x in args)))
+        res.outputs = [(None if wire is None else wires[wire],
+                        invert ^ bool((mask_out >> j) & 1))
+                       for j, (wire, invert) in enumerate(self.outputs)]
+        return res
+
+    def state(self):
+        return dict(gates=self.gates, outputs=self.outputs)
+
+class _Wire:
+    def __init__(self, circuit, index):
+        self.circuit = circuit
+        self.index = index
+
+    def __xor__(self, other):
+        return _Wire(self.circuit, self.circuit.add(
+            'xor', self.index, other.index))
+
+    def __and__(self, other):
+        return _Wire(self.circuit, self.circuit.add(
+            'and', self.index, other.index))
+
+    def __invert__(self):
+        return _Wire(self.circuit, self.circuit.add('not', self.index))
+
+class _Bit:
+    def __init__(self, value):
+        self.value = value
+
+    def __xor__(self, other):
+        return _Bit(self.value ^ other.value)
+
+    def __and__(self, other):
+        return _Bit(self.value & other.value)
+
+    def __invert__(self):
+        return _Bit(1 - self.value)
+
+def _project(inputs, tables):
+    if isinstance(inputs[0], _Bit):
+        x = sum(b.value << i for i, b in enumerate(inputs))
+        return [_Bit(table[x]) for table in tables]
+    wire = sum(b.proj([0, 1 << i], len(inputs))
+               for i, b in enumerate(inputs))
+    return wire.proj_multi(tables, [1] * len(tables))
+
+def known_circuit(table, input_size, output_size):
+    """ Circuit from :py:mod:`Compiler.GC.sbox_circuits` computing
+    :py:obj:`table` up to XOR with constants on input and output. """
+    from Compiler.GC import sbox_circuits
+    for k, m, function in sbox_circuits.circuits:
+        if (k, m) != (input_size, output_size):
+            continue
+        circuit = BitCircuit.trace(k, function)
+        known = circuit.table()
+        for mask_in in range(2 ** k):
+            mask_out = table[0] ^ known[mask_in]
+            if all(table[x] == known[x ^ mask_in] ^ mask_out
+                   for x in range(2 ** k)):
+                return circuit.with_constants(mask_in, mask_out)
+
+def anf_circuit(terms, ands, input_size):
+    """ Circuit computing every monomial with the AND gates in
+    :py:obj:`ands` and every output as XOR of monomials. """
+    res = BitCircuit(input_size)
+    wires = dict((1 << i, i) for i in range(input_size))
+    for mask, left, right in ands:
+        wires[mask] = res.add('and', wires[left], wires[right])
+    for term in terms:
+        acc = None
+        for mask in term:
+            if mask:
+                acc = wires[mask] if acc is None else \
+                    res.add('xor', acc, wires[mask])
+        res.outputs.append((acc, 0 in term))
+    return res
+
+def davio_circuit(table, input_size, output_size):
+    """ Circuit from recursively writing every output bit as
+    :math:`f = f_0 \oplus x_i g` where :math:`f_0` is :math:`f` with
+    :math:`x_i = 0` and :math:`g` is the derivative in :math:`x_i`.
+    Subfunctions are shared if they only differ by an affine function,
+    which costs XOR gates only. The variable is chosen greedily by the
+    number of AND gates without sharing. """
+    k = input_size
+    full = 2 ** 2 ** k - 1
+    var = [sum(1 << x for x in range(2 ** k) if (x >> i) & 1)
+           for i in range(k)]
+    affine_mask = 1 | sum(1 << (1 << i) for i in range(k))
+    def mobius(f):
+        for i in range(k):
+            f ^= (f & ~var[i] & full) << (1 << i)
+        return f
+    def nonlinear(f):
+        return mobius(f) & ~affine_mask & full
+    def split(f, i):
+        f0 = f & ~var[i] & full
+        f1 = (f & var[i]) >> (1 << i)
+        f0 |= f0 << (1 << i)
+        f1 |= f1 << (1 << i)
+        return f0, f0 ^ f1
+    estimates = {}
+    def estimate(f):
+        key = nonlinear(f)
+        if key and key not in estimates:
+            estimates[key] = min(1 + estimate(f0) + estimate(g)
+                                 for f0, g in (split(f, i) for i in range(k))
+                                 if g)
+        return estimates.get(key, 0)
+    res = BitCircuit(input_size)
+    built = {}
+    def build(f):
+        """ Wire and inversion computing :py:obj:`f`. """
+        key = nonlinear(f)
+        if key and key not in built:
+            i = min((i for i in range(k) if split(f, i)[1]),
+                    key=lambda i: sum(estimate(x) for x in split(f, i)
+                                      if nonlinear(x) not in built))
+            f0, g = split(f, i)
+            wire, invert = build(g)
+            if invert:
+                wire = res.add('not', wire)
+            product = res.add('and', i, wire)
+            wire, invert = build(f0)
+            if wire is not None:
+                product = res.add('xor', product, wire)
+            built[key] = f, product, invert
+        h, wire, invert = built[key] if key else (0, None, False)
+        linear = mobius(f ^ h)
+        for i in range(k):
+            if (linear >> (1 << i)) & 1:
+                wire = i if wire is None else res.add('xor', wire, i)
+        return wire, invert ^ bool(linear & 1)
+    outputs = [sum(((y >> j) & 1) << x for x, y in enumerate(table))
+               for j in range(output_size)]
+    wires = {}
+    for j in sorted(range(output_size), key=lambda j: estimate(outputs[j])):
+        wires[j] = build(outputs[j])
+    res.outputs = [wires[j] for j in range(output_size)]
+    return res
+
+def map_projections(circuit, objective, max_inputs, max_cuts=12,
+                    max_tries=100):
+    """ Cover parts of a circuit of XOR, AND, and NOT gates with
+    projections of at most :py:obj:`max_inputs` wires where this is
+    cheaper according to :py:obj:`objective`. A candidate projection
+    replaces the region determined by a cut, which is a set of wires
+    enumerated as in LUT mapping. It needs one truth table per
+    dimension of the functions used outside the region modulo affine
+    functions of the cut because XOR and NOT gates are free. The
+    candidate with the largest saving among the :py:obj:`max_tries`
+    most promising ones is applied until none is left.
+
+    :returns: :py:class:`BitCircuit` with projections
+    """
+    k = circuit.input_size
+    ops = [None] * k + [gate[0] for gate in circuit.gates]
+    fanins = [()] * k + [tuple(gate[1:]) for gate in circuit.gates]
+    n = len(ops)
+    cuts = [[frozenset([i])] for i in range(n)]
+    for i in range(k, n):
+        merged = set()
+        if ops[i] == 'not':
+            merged.update(cuts[fanins[i][0]])
+        else:
+            for a in cuts[fanins[i][0]]:
+                for b in cuts[fanins[i][1]]:
+                    if len(a | b) <= max_inputs:
+                        merged.add(a | b)
+        merged.discard(frozenset([i]))
+        cuts[i] += sorted(merged, key=lambda x: (len(x), sorted(x)))[
+            :max_cuts]
+    candidates = sorted(set(cut for x in cuts[k:] for cut in x[1:]
+                            if len(cut) > 1),
+                        key=lambda x: (len(x), sorted(x)))
+    fanouts = [[] for i in range(n)]
+    for i in range(k, n):
+        for j in set(fanins[i]):
+            fanouts[j].append(i)
+    and_value = and_cost().weighted(objective)
+    regions = {}
+    def region(cut):
+        """ Truth tables of all wires determined by the cut. """
+        if cut not in regions:
+            cut_list = sorted(cut)
+            size = 2 ** len(cut)
+            full = 2 ** size - 1
+            values = {}
+            for pos, i in enumerate(cut_list):
+                values[i] = sum(1 << x for x in range(size) if (x >> pos) & 1)
+            inside = {}
+            todo = [i for j in cut for i in fanouts[j]]
+            heapq.heapify(todo)
+            while todo:
+                i = heapq.heappop(todo)
+                if i not in values and all(j in values for j in fanins[i]):
+                    for j in fanouts[i]:
+                        heapq.heappush(todo, j)
+                    a = values[fanins[i][0]]
+                    if ops[i] == 'xor':
+                        values[i] = a ^ values[fanins[i][1]]
+                    elif ops[i] == 'and':
+                        values[i] = a & values[fanins[i][1]]
+                    else:
+                        values[i] = full ^ a
+                    inside[i] = values[i]
+            affine = [full] + [values[i] for i in cut_list]
+            regions[cut] = cut_list, inside, affine
+        return regions[cut]
+    def reduce(cut, boundary):
+        """ Wires whose truth tables are needed and every boundary
+        wire as combination of constant, cut, and tables. """
+        cut_list, inside, affine = region(cut)
+        basis = {}
+        def eliminate(vector, combination):
+            while vector and vector.bit_length() - 1 in basis:
+                other, other_combination = basis[vector.bit_length() - 1]
+                vector ^= other
+                combination ^= other_combination
+            return vector, combination
+        for pos, vector in enumerate(affine):
+            vector, combination = eliminate(vector, 1 << pos)
+            basis[vector.bit_length() - 1] = vector, combination
+        tables = []
+        res = {}
+        for i in sorted(boundary):
+            vector, combination = eliminate(inside[i], 0)
+            if vector or combination < 2:
+                res[i] = 1 << (len(affine) + len(tables))
+                tables.append(i)
+                if vector:
+                    basis[vector.bit_length() - 1] = \
+                        vector, combination ^ res[i]
+            else:
+                res[i] = combination
+        return tables, res
+    def plan(assign, chosen):
+        """ Needed gates and boundary wires of every region, or
+        ``None`` if regions depend on each other. """
+        needed = set()
+        boundary = [set() for _ in chosen]
+        active = set()
+        done = set()
+        def visit(i):
+            r = assign.get(i)
+            if r is None:
+                if i not in needed:
+                    needed.add(i)
+                    for j in fanins[i]:
+                        visit(j)
+                return
+            boundary[r].add(i)
+            if r in done:
+                return
+            if r in active:
+                raise CompilerError('cyclic projection regions')
+            active.add(r)
+            for j in chosen[r]:
+                visit(j)
+            active.remove(r)
+            done.add(r)
+        try:
+            for wire, _ in circuit.outputs:
+                if wire is not None:
+                    visit(wire)
+        except CompilerError:
+            return None
+        value = and_value * sum(1 for i in needed if ops[i] == 'and')
+        reduced = []
+        for cut, wires in zip(chosen, boundary):
+            reduced.append(reduce(cut, wires) if wires else ([], {}))
+            if reduced[-1][0]:
+                value += lut_cost(len(cut), len(reduced[-1][0])).weighted(
+                    objective)
+        return value, needed, reduced
+    assign = {}
+    chosen = []
+    value, needed, reduced = plan(assign, chosen)
+    lut_values = [lut_cost(x).weighted(objective)
+                  for x in range(max_inputs + 1)]
+    while True:
+        # the saving is at most the AND gates replaced by one table
+        bounds = []
+        for cut in candidates:
+            if cut not in chosen:
+                inside = region(cut)[1]
+                bound = and_value * sum(1 for i in inside if i in needed
+                                        and ops[i] == 'and') - \
+                    lut_values[len(cut)]
+                if bound > 0:
+                    bounds.append((-bound, len(bounds), cut))
+        best = None
+        for bound, _, cut in sorted(bounds)[:max_tries]:
+            if best is not None and -bound <= value - best[0][0]:
+                break
+            new_assign = dict(assign)
+            for i in region(cut)[1]:
+                new_assign[i] = len(chosen)
+            res = plan(new_assign, chosen + [cut])
+            if res and res[0] < value and (best is None or
+                                            res[0] < best[0][0]):
+                best = res, new_assign, cut
+        if best is None:
+            break
+        (value, needed, reduced), assign, cut = best
+        chosen.append(cut)
+    res = BitCircuit(k)
+    wires = dict((i, i) for i in range(k))
+    def build(i):
+        if i in wires:
+            return wires[i]
+        r = assign.get(i)
+        if r is None:
+            wires[i] = res.add(ops[i], *(build(j) for j in fanins[i]))
+            return wires[i]
+        cut_list = region(chosen[r])[0]
+        tables, combinations = reduced[r]
+        sources = [None] + [build(j) for j in cut_list]
+        if tables:
+            first = res.add('proj', sources[1:], [
+                cone_bits(region(chosen[r])[1][j], len(cut_list))
+                for j in tables])
+            sources += range(first, first + len(tables))
+        for j, combination in combinations.items():
+            wire = None
+            for pos, source in enumerate(sources[1:]):
+                if (combination >> (pos + 1)) & 1:
+                    wire = source if wire is None else \
+                        res.add('xor', wire, source)
+            if combination & 1:
+                wire = res.add('not', wire)
+            wires[j] = wire
+        return wires[i]
+    res.outputs = [(None if wire is None else build(wire), invert)
+                   for wire, invert in circuit.outputs]
+    return res
+
+def cone_bits(value, input_size):
+    return [(value >> x) & 1 for x in range(2 ** input_size)]
+
+def submasks(mask):
+    sub = (mask - 1) & mask
+    while sub:
+        yield sub
+        sub = (sub - 1) & mask
+
+class SboxPlan:
+    """ Bitsliced circuit, decomposition, and costs for one S-box. Use
+    :py:meth:`get` to reuse plans of the same table. """
+    cache = {}
+    disk_cache = None
+    methods = 'proj', 'bits', 'split'
+    # change when plans are computed differently or stored in a
+    # different format, which invalidates cached plans
+    version = 3
+    max_split_inputs = 6
+
+    @classmethod
+    def get(cls, table, input_size, output_size):
+        key = 'v%d-%d-%d-%s' % (cls.version, input_size, output_size,
+                                hashlib.sha256(json.dumps(
+                                    list(table)).encode()).hexdigest())
+        if key not in cls.cache:
+            stored = cls.load_disk_cache().get(key)
+            res = cls(table, input_size, output_size, stored)
+            res.key = key
+            if stored is None:
+                res.store()
+            cls.cache[key] = res
+        return cls.cache[key]
+
+    @staticmethod
+    def disk_cache_path():
+        from Compiler.program import Program
+        prog = getattr(Program, 'prog', None)
+        if prog is not None and hasattr(prog, 'programs_dir'):
+            return os.path.join(prog.programs_dir, 'Cache', 'sbox-plans.json')
+
+    @classmethod
+    def load_disk_cache(cls):
+        if cls.disk_cache is None:
+            cls.disk_cache = {}
+            path = cls.disk_cache_path()
+            if path and os.path.exists(path):
+                try:
+                    with open(path) as f:
+                        cls.disk_cache = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return cls.disk_cache
+
+    def store(self):
+        if self.key is not None:
+            self.load_disk_cache()[self.key] = self.state()
+            self.store_disk_cache()
+
+    @classmethod
+    def store_disk_cache(cls):
+        path = cls.disk_cache_path()
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as f:
+                    json.dump(cls.disk_cache, f)
+            except OSError:
+                pass
+
+    def __init__(self, table, input_size, output_size, state=None):
+        if len(table) != 2 ** input_size:
+            raise CompilerError('S-box needs %d rows, got %d' %
+                                (2 ** input_size, len(table)))
+        if any(not 0 <= y < 2 ** output_size for y in table):
+            raise CompilerError('S-box output exceeds %d bits' % output_size)
+        self.input_size = input_size
+        self.output_size = output_size
+        self.key = None
+        self.reported = set()
+        if state is None:
+            self.terms = anf(table, input_size, output_size)
+            self.ands = []
+            self.schedule_ands()
+            candidates = [known_circuit(table, input_size, output_size),
+                          davio_circuit(table, input_size, output_size),
+                          anf_circuit(self.terms, self.ands, input_size)]
+            self.circuit = min((x for x in candidates if x),
+                               key=lambda x: (x.n_ands(), len(x.gates)))
+            self.splits = {}
+        else:
+            self.terms = state['terms']
+            self.circuit = BitCircuit(input_size, **state['circuit'])
+            self.splits = dict((key, BitCircuit(input_size, **x))
+                               for key, x in state['splits'].items())
+
+    def state(self):
+        return dict(terms=self.terms, circuit=self.circuit.state(),
+                    splits=dict((key, x.state())
+                                for key, x in self.splits.items()))
+
+    def split(self, objective):
+        """ Cheapest layered plan of projections, AND gates, and XORs
+        according to :py:obj:`objective`, computed once per objective.
+
+        :returns: :py:class:`BitCircuit`
+        """
+        key = ','.join('%s=%s' % (x, objective[x]) for x in Cost.measures)
+        if key not in self.splits:
+            candidates = self.decompose() + [map_projections(
+                self.circuit, objective,
+                min(self.input_size, self.max_split_inputs))]
+            self.splits[key] = min(candidates, key=lambda x: (
+                x.cost().weighted(objective), len(x.gates)))
+            self.store()
+        if key not in self.reported:
+            self.reported.add(key)
+            self.report(self.splits[key], objective)
+        return self.splits[key]
+
+    def decompose(self):
+        """ Write the S-box as XOR of functions of disjoint input bits,
+        either for all output bits jointly or for every output bit on
+        its own. Functions of more than one bit need a projection.
+
+        :returns: list of two :py:class:`BitCircuit`
+        """
+        joint = [(mask, [j for j, term in enumerate(self.terms)
+                         if any(m & mask for m in term)])
+                 for mask in components(self.terms, self.input_size)]
+        single = {}
+        for j, term in enumerate(self.terms):
+            for mask in components([term], self.input_size):
+                single.setdefault(mask, []).append(j)
+        res = []
+        for parts in joint, sorted(single.items()):
+            circuit = BitCircuit(self.input_size)
+            acc = [None] * self.output_size
+            for mask, outputs in parts:
+                inputs = [i for i in range(self.input_size)
+                          if (mask >> i) & 1]
+                tables = [restrict(self.terms[j], mask) for j in outputs]
+                if len(inputs) == 1:
+                    wires = [inputs[0] if table[1] else None
+                             for table in tables]
+                else:
+                    first = circuit.add('proj', inputs, tables)
+                    wires = range(first, first + len(tables))
+                for j, wire in zip(outputs, wires):
+                    if wire is not None:
+                        acc[j] = wire if acc[j] is None else \
+                            circuit.add('xor', acc[j], wire)
+            circuit.outputs = [(wire, 0 in term)
+                               for wire, term in zip(acc, self.terms)]
+            res.append(circuit)
+        return res
+
+    def report(self, split, objective):
+        sizes = split.projections()
+        if not sizes or split.cost().weighted(objective) >= min(
+                self.cost(method, False).weighted(objective)
+                for method in ('proj', 'bits')):
+            return
+        print('S-box with %d input bits as projections of %s bits and %d '
+              'AND gates: %s instead of %s with one projection and %s '
+              'with AND gates only' %
+              (self.input_size, '/'.join(str(x) for x in sizes),
+               split.n_ands(), split.cost(), self.cost('proj', False),
+               self.cost('bits', False)))
+
+    def schedule_ands(self):
+        """ Compute every monomial of degree at least two with one AND
+        of two monomials computed earlier, reusing as many as
+        possible. """
+        available = set(1 << i for i in range(self.input_size))
+        def build(mask):
+            if mask in available:
+                return
+            best = None
+            for sub in submasks(mask):
+                if sub in available:
+                    if mask ^ sub in available:
+                        best = sub
+                        break
+                    if best is None or bin(sub).count('1') > \
+                       bin(best).count('1'):
+                        best = sub
+            build(mask ^ best)
+            self.ands.append((mask, best, mask ^ best))
+            available.add(mask)
+        needed = set(x for term in self.terms for x in term
+                     if bin(x).count('1') > 1)
+        for mask in sorted(needed, key=lambda x: (bin(x).count('1'), x)):
+            build(mask)
+
+    def cost(self, method, wire_domain, objective=default_objective):
+        """ Cost of one S-box evaluation including the conversion from
+        and to n-bit wires or 1-bit wires.
+
+        :param method: ``'proj'``, ``'bits'``, or ``'split'``
+        :param wire_domain: whether input and output are n-bit wires
+        :param objective: objective for finding the layered plan
+        """
+        k, m = self.input_size, self.output_size
+        if method == 'proj':
+            if wire_domain:
+                return proj_cost(k)
+            else:
+                return lut_cost(k, m)
+        elif method in ('bits', 'split'):
+            if method == 'bits':
+                res = self.circuit.cost()
+            else:
+                res = self.split(objective).cost()
+            if wire_domain:
+                res += extraction_plan(k, k)[0] + composition_cost(m)
+            return res
+        else:
+            raise CompilerError('unknown S-box method: %s' % method)
+
+    def choose(self, wire_domain, objective):
+        """ Cheapest method according to :py:obj:`objective`. """
+        costs = [(self.cost(method, wire_domain, objective), method)
+                 for method in self.methods]
+        return min((cost.weighted(objective), i, method)
+                   for i, (cost, method) in enumerate(costs))[2]
+
+    def evaluate_bits(self, bits, zero):
+        """ Apply the bitsliced circuit to 1-bit wires.
+
+        :param bits: input registers, least significant first
+        :param zero: register of zeros with the right number of wires
+        :returns: list of output registers, least significant first
+        """
+        return self.circuit.evaluate(bits, zero)
+
+    def evaluate_split(self, bits, zero, objective=default_objective):
+        """ Apply the layered plan for :py:obj:`objective` to 1-bit
+        wires, with the same parameters as :py:meth:`evaluate_bits`. """
+        return self.split(objective).evaluate(bits, zero)
@@ -295,6 +295,7 @@ class sbits(bits):
     bitcom = inst.bitcoms
     conv_regint = inst.convsint
     single_wire_n = 1 # indicates if sbits(n) are represented as n-bit wire or n 1-bit wires
+    wire_source = None # n-bit wire and bit position, see wire_to_bits()
     @classmethod
     def conv_regint_by_bit(cls, n, res, other):
         tmp = cbits.get_type(n)()
@@ -318,11 +319,22 @@ class sbits(bits):
         inst.bitb(res)
         return res
     @classmethod
-    def get_input_from(cls, player, n_bits=None):
+    def get_input_from(cls, player, n_bits=None, single_wire_n=1):
         """ Secret input from :py:obj:`player`.
 
         :param: player (int)
+        :param: n_bits: number of bits, or number of wires if
+          :py:obj:`single_wire_n` is more than one (default: one wire)
+        :param: single_wire_n: input as n-bit wires of this length
+          with one input per wire (default: 1)
         """
+        if single_wire_n > 1:
+            if single_wire_n > 32:
+                raise CompilerError('n-bit wires can have at most 32 bits')
+            n_wires = 1 if n_bits is None else n_bits
+            res = sbits.new(n=n_wires, single_wire_n=single_wire_n)
+            inst.inputbn(player, single_wire_n, n_wires, res)
+            return res
         if n_bits is None:
             n_bits = cls.n
         res = cls()
@@ -553,22 +565,168 @@ class sbits(bits):
         bits = sbitvec.from_vec(sbitvec([self]).v[:n_bits]).elements()[0]
         bits = sint(bits, size=n_bits)
         return sint.bit_compose(bits)
-    def proj(self, truth_table, output_size):
+    def _check_proj(self, truth_table, output_size):
         ttn = len(truth_table)
         if ttn != 2**self.single_wire_n:
             raise CompilerError(f'Incorrect number of rows in the truth_table. Expected {2**self.single_wire_n}, got {ttn}')
         if output_size < 0:
             raise CompilerError('Invalid output size')
-        if output_size > 8:
-            raise CompilerError('Output size > 8 not yet supported')
-        tt = [(truth_table[4*i+0] & 0xff) | ((truth_table[4*i+1] & 0xff) << 8) | ((truth_table[4*i+2] & 0xff) << 16) | ((truth_table[4*i+3] & 0xff) << 24) for i in range(int(ttn/4))]
-        if ttn % 4 != 0:
-            tt.append(0)
-            for k,i in enumerate(range(ttn- (ttn % 4), ttn)):
-                tt[-1] |= (truth_table[i] & 0xff) << 8*k
+        if output_size > 32:
+            raise CompilerError('Output size > 32 not supported')
+    def proj(self, truth_table, output_size):
+        self._check_proj(truth_table, output_size)
+        tt = inst.projs.encode_truth_table(truth_table, output_size)
         res = sbits.new(None, n=self.n, single_wire_n=output_size)
         inst.projs(1, output_size, self.single_wire_n, *tt, self.n, res, self)
         return res
+    def proj_multi(self, truth_tables, output_sizes):
+        """ Apply several projections to the same input, which is only
+        decoded once.
+
+        :param truth_tables: list of truth tables as for :py:meth:`proj`
+        :param output_sizes: output bit-length per truth table
+        :returns: list of :py:class:`sbits` (one per truth table)
+        """
+        if len(truth_tables) != len(output_sizes):
+            raise CompilerError('Need one output size per truth table')
+        if not truth_tables:
+            return []
+        for tt, size in zip(truth_tables, output_sizes):
+            self._check_proj(tt, size)
+        res = [sbits.new(None, n=self.n, single_wire_n=size)
+               for size in output_sizes]
+        tts = sum((inst.projs.encode_truth_table(tt, size)
+                   for tt, size in zip(truth_tables, output_sizes)), [])
+        inst.projms(len(truth_tables), self.single_wire_n, *output_sizes,
+                    *tts, self.n, *res, self)
+        return res
+    def wire_to_bits(self, positions=None):
+        """ Extract bits of an n-bit wire into 1-bit wires, using the
+        cheapest sequence of projections to narrower wires (see
+        :py:func:`Compiler.GC.sbox.extraction_plan`)::
+
+            w = sbit(1).proj([0, 9], 4)
+            print_ln('%s', [b.reveal() for b in w.wire_to_bits([0, 1])])
+
+        This will output ``[1, 0]``. The result remembers its origin,
+        so :py:meth:`bits_to_wire` returns this wire instead of
+        computing it again when applied to all bits in order.
+
+        :param positions: bits to extract (default: all)
+        :returns: list of 1-bit :py:class:`sbits`
+        """
+        from Compiler.GC.sbox import extraction_plan
+        width = self.single_wire_n
+        if positions is None:
+            positions = range(width)
+        positions = list(positions)
+        if any(not 0 <= p < width for p in positions):
+            raise CompilerError('bit position out of range for %d-bit wire'
+                                % width)
+        needed = sorted(set(positions))
+        if width == 1:
+            res = {0: self}
+        else:
+            res = {}
+            groups = extraction_plan(width, len(needed))[1]
+            for size in groups:
+                group, needed = needed[:size], needed[size:]
+                wire = self.proj([sum(((x >> p) & 1) << i
+                                      for i, p in enumerate(group))
+                                  for x in range(2 ** width)], size)
+                res.update(zip(group, wire.wire_to_bits()))
+            for p, b in res.items():
+                b.wire_source = self, p
+        return [res[p] for p in positions]
+    @staticmethod
+    def bits_to_wire(bits):
+        """ Combine 1-bit wires into an n-bit wire, the first being
+        the least significant bit. This undoes :py:meth:`wire_to_bits`
+        without any projection. """
+        bits = list(bits)
+        if not bits or any(b.single_wire_n != 1 for b in bits):
+            raise CompilerError('need 1-bit wires')
+        sources = [b.wire_source for b in bits]
+        if None not in sources:
+            wire = sources[0][0]
+            if wire.single_wire_n == len(bits) and \
+               all(w is wire and p == i for i, (w, p) in enumerate(sources)):
+                return wire
+        n = len(bits)
+        return sum(b.proj([0, 1 << i], n) for i, b in enumerate(bits))
+    def sbox(self, table, n=None, method=None):
+        """ Apply an S-box given by its truth table. The compiler
+        either uses a projection gate or a bitsliced circuit, whichever
+        is cheaper according to the objective set by
+        ``--sbox-objective``. The result has the same representation as
+        the input: n-bit wires if the input consists of n-bit wires and
+        a bit vector otherwise::
+
+            sb4 = sbits.get_type(4)
+            print_ln('%s', sb4(5).sbox([0xc, 6, 9, 0, 1, 0xa, 2, 0xb, 3, 8, 5, 0xd, 4, 0xe, 7, 0xf]).reveal())
+
+        This will output 10.
+
+        :param table: list of :math:`2^k` outputs for :math:`k`-bit input
+        :param n: output bit length (default: input bit length)
+        :param method: force ``'proj'``, ``'bits'``, or ``'split'``
+          (smaller projections, see :py:mod:`Compiler.GC.sbox`)
+        """
+        from Compiler.GC.sbox import SboxPlan
+        input_size = int(math.log2(len(table)))
+        if 2 ** input_size != len(table):
+            raise CompilerError('S-box table length must be a power of two')
+        if n is None:
+            n = input_size
+        plan = SboxPlan.get(table, input_size, n)
+        wire_domain = self.single_wire_n > 1
+        if wire_domain and self.single_wire_n != input_size:
+            raise CompilerError('S-box input must have %d bits' % input_size)
+        objective = Program.prog.sbox_objective
+        method = method or plan.choose(wire_domain, objective)
+        if wire_domain:
+            if method == 'proj':
+                return self.proj(table, n)
+            zero = sbits.get_type(self.n)(0)
+            if method == 'split':
+                res = plan.evaluate_split(self.wire_to_bits(), zero,
+                                          objective)
+            else:
+                res = plan.evaluate_bits(self.wire_to_bits(), zero)
+            return self.bits_to_wire(res)
+        else:
+            bits = self.bit_decompose(input_size)
+            return sbits.get_type(n).bit_compose(
+                self.sbox_bits(table, bits, n, method))
+    @staticmethod
+    def sbox_bits(table, bits, n=None, method=None):
+        """ Apply an S-box to a bitsliced input, for example
+        several instances in parallel when every register holds one
+        bit of all instances.
+
+        :param table: list of :math:`2^k` outputs
+        :param bits: :math:`k` registers of the same length, least
+          significant first
+        :param n: output bit length (default: :math:`k`)
+        :param method: force ``'proj'``, ``'bits'``, or ``'split'``
+          (smaller projections, see :py:mod:`Compiler.GC.sbox`)
+        :returns: :math:`n` registers, least significant first
+        """
+        from Compiler.GC.sbox import SboxPlan
+        input_size = len(bits)
+        if n is None:
+            n = input_size
+        plan = SboxPlan.get(table, input_size, n)
+        objective = Program.prog.sbox_objective
+        method = method or plan.choose(False, objective)
+        zero = sbits.get_type(bits[0].n)(0)
+        if method == 'bits':
+            return plan.evaluate_bits(bits, zero)
+        elif method == 'split':
+            return plan.evaluate_split(bits, zero, objective)
+        wire = sbits.bits_to_wire(bits)
+        return wire.proj_multi([[(y >> i) & 1 for y in table]
+                                for i in range(n)], [1] * n)
     def long_one(self):
         n = self.single_wire_n if self.single_wire_n > 1 else self.n
         return 2**n - 1 if n != None else None
@@ -588,6 +746,153 @@ class sbits(bits):
             r.single_wire_n = single_wire_n
         return res
 
+class sbitsn(object):
+    """ Vector of n-bit wires, one per SIMD instance, held by a single
+    register. Projections and XORs result in one instruction for all
+    instances, so the compilation time does not depend on the number
+    of instances::
+
+        sb4n = sbitsn.get_type(4)
+        x = sb4n([1, 2, 3])
+        print_ln('%s', (x.proj([(y + 1) % 16 for y in range(16)], 4) ^ 8).reveal())
+
+    This will output ``[10, 11, 12]``. Operands with one instance are
+    broadcast to the size of the other operand, which is useful for
+    round keys shared by all instances.
+
+    Use :py:meth:`get_type` for a fixed wire length.
+    """
+    width = None
+    types = {}
+    @staticmethod
+    def get_type(width):
+        """ Vector type for :py:obj:`width`-bit wires. """
+        if not 0 < width <= 32:
+            raise CompilerError('n-bit wires can have at most 32 bits')
+        if width not in sbitsn.types:
+            sbitsn.types[width] = type('sbitsn%d' % width, (sbitsn,),
+                                       dict(width=width))
+        return sbitsn.types[width]
+    @classmethod
+    def get_input_from(cls, player, size=1):
+        """ Secret input from :py:obj:`player`, one value per instance.
+
+        :param player: (int)
+        :param size: number of instances
+        """
+        return cls(sbits.get_input_from(player, size,
+                                        single_wire_n=cls.width))
+    @classmethod
+    def from_bits(cls, bits):
+        """ Combine :math:`n` registers of 1-bit wires, least
+        significant first, with one wire per instance each. """
+        if len(bits) != cls.width:
+            raise CompilerError('need %d bits' % cls.width)
+        return cls(sbits.bits_to_wire(bits))
+    def __init__(self, value=None, size=None):
+        """
+        :param value: :py:class:`sbits` register of n-bit wires, list
+          of such wires with one instance each, list of public values,
+          or public value for all instances
+        :param size: number of instances for a single public value
+        """
+        if isinstance(value, sbitsn):
+            value = value.v
+        if value is None:
+            value = 0
+        if util.is_constant(value):
+            value = [value] * (size or 1)
+        if isinstance(value, (list, tuple)):
+            if all(util.is_constant(x) for x in value):
+                value = self._constant(list(value))
+            else:
+                value = sbits.bit_compose(
+                    [x.v if isinstance(x, sbitsn) else x for x in value])
+        if not isinstance(value, sbits) or \
+           value.single_wire_n != self.width:
+            raise CompilerError('need %d-bit wires' % self.width)
+        self.v = value
+    @classmethod
+    def _constant(cls, values):
+        if any(not 0 <= x < 2 ** cls.width for x in values):
+            raise CompilerError('constant too large for %d-bit wire' %
+                                cls.width)
+        bits = [sbits.get_type(len(values))(
+            sum(((x >> i) & 1) << j for j, x in enumerate(values)))
+                for i in range(cls.width)]
+        if cls.width == 1:
+            return bits[0]
+        return sbits.bits_to_wire(bits)
+    @property
+    def size(self):
+        """ Number of instances. """
+        return self.v.n
+    @property
+    def single_wire_n(self):
+        return self.width
+    def __len__(self):
+        return self.size
+    def expand(self, size):
+        """ Repeat a single instance :py:obj:`size` times. """
+        if self.size == size:
+            return self
+        if self.size != 1:
+            raise CompilerError('cannot expand %d instances to %d' %
+                                (self.size, size))
+        return type(self)([self.v] * size)
+    def _align(self, other):
+        if isinstance(other, sbits):
+            other = type(self)(other)
+        if other.width != self.width:
+            raise CompilerError('wire lengths differ: %d/%d' %
+                                (self.width, other.width))
+        if self.size == 1:
+            return self.expand(other.size), other
+        else:
+            return self, other.expand(self.size)
+    def __xor__(self, other):
+        if util.is_constant(other):
+            return self.xor_int(other)
+        x, y = self._align(other)
+        return type(self)(x.v ^ y.v)
+    __rxor__ = __xor__
+    __add__ = __xor__
+    __radd__ = __xor__
+    def xor_int(self, other):
+        """ XOR with a public value for all instances. """
+        return type(self)(self.v.xor_int(other))
+    def __invert__(self):
+        return type(self)(~self.v)
+    def proj(self, truth_table, output_size):
+        """ Projection gate for all instances, see :py:meth:`sbits.proj`. """
+        return sbitsn.get_type(output_size)(
+            self.v.proj(truth_table, output_size))
+    def proj_multi(self, truth_tables, output_sizes):
+        """ Several projections of all instances, see
+        :py:meth:`sbits.proj_multi`. """
+        return [sbitsn.get_type(size)(x) for x, size in zip(
+            self.v.proj_multi(truth_tables, output_sizes), output_sizes)]
+    def sbox(self, table, n=None, method=None):
+        """ S-box for all instances, see :py:meth:`sbits.sbox`. """
+        res = self.v.sbox(table, n, method)
+        return sbitsn.get_type(res.single_wire_n)(res)
+    def to_bits(self):
+        """ Registers of 1-bit wires with one wire per instance, least
+        significant first. """
+        if self.width == 1:
+            return [self.v]
+        return self.v.wire_to_bits()
+    def elements(self):
+        """ List of n-bit wires, one per instance. """
+        return self.v.bit_decompose()
+    def reveal(self):
+        """ List of public values, one per instance. """
+        if self.width == 1:
+            return [x.reveal() for x in self.elements()]
+        return self.v.reveal()
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, self.v)
+
 class sbitvec(_vec):
     """ Vector of registers of secret bits, effectively a matrix of secret bits.
     This facilitates parallel arithmetic operations in binary circuits.
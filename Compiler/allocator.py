@@ -9,6 +9,7 @@ import Compiler.graph
 import Compiler.program
 import heapq, itertools
 import operator
+from array import array
 import sys
 from functools import reduce
 
@@ -60,18 +61,46 @@ class BlockAllocator:
 
 class StraightlineAllocator:
     """Allocate variables in a straightline program using n registers.
-    It is based on the precondition that every register is only defined once."""
+    It is based on the precondition that every register is only defined once.
+
+    Registers are numbered densely when first seen, and the allocation
+    state is kept in flat arrays indexed by this number instead of
+    dictionaries keyed by the register object."""
     def __init__(self, n, program):
-        self.alloc = dict_by_id()
+        # dense number of every register seen and the reverse mapping
+        self.index = {}
+        self.regs = []
+        # allocated register index or -1
+        self.alloc = array('q')
+        self.defined = bytearray()
+        self.dealloc = bytearray()
         self.usage = Compiler.program.RegType.create_dict(lambda: 0)
-        self.defined = dict_by_id()
-        self.dealloc = set_by_id()
         self.n = n
         self.program = program
 
+    def number(self, reg):
+        try:
+            return self.index[id(reg)]
+        except KeyError:
+            res = self.index[id(reg)] = len(self.regs)
+            self.regs.append(reg)
+            self.alloc.append(-1)
+            self.defined.append(0)
+            self.dealloc.append(0)
+            return res
+
+    def is_allocated(self, reg):
+        k = self.index.get(id(reg.vectorbase))
+        return k is not None and self.alloc[k] != -1
+
+    def is_deallocated(self, reg):
+        k = self.index.get(id(reg))
+        return k is not None and self.dealloc[k]
+
     def alloc_reg(self, reg, free):
         base = reg.vectorbase
-        if base in self.alloc:
+        k = self.index.get(id(base))
+        if k is not None and self.alloc[k] != -1:
             # already allocated
             return
 
@@ -85,58 +114,69 @@ class StraightlineAllocator:
                 self.usage[reg_type] += size
             else:
                 raise RegisterOverflowError()
-        self.alloc[base] = res
+        if k is None:
+            k = self.number(base)
+        self.alloc[k] = res
 
-        base.i = self.alloc[base]
+        base.i = res
 
         for dup in base.duplicates:
             dup = dup.vectorbase
-            self.alloc[dup] = self.alloc[base]
-            dup.i = self.alloc[base]
+            self.alloc[self.number(dup)] = res
+            dup.i = res
 
     def dealloc_reg(self, reg, inst, free):
+        dealloc = self.dealloc
         if reg.vector:
-            self.dealloc |= reg.vector
+            for x in reg.vector:
+                dealloc[self.number(x)] = 1
         else:
-            self.dealloc.add(reg)
+            dealloc[self.number(reg)] = 1
         base = reg.vectorbase
 
-        seen = set_by_id()
-        to_check = set_by_id()
-        to_check.add(base)
-        while to_check:
-            dup = to_check.pop()
-            if dup not in seen:
-                seen.add(dup)
-                base = dup.vectorbase
-                if base.vector:
-                    for i in base.vector:
-                        if i not in self.dealloc:
-                            # not all vector elements ready for deallocation
+        if len(base.duplicates) == 1 and \
+           all(len(i.duplicates) == 1 for i in base.vector):
+            # no aliases, only wait for the vector elements
+            if not all(self.is_deallocated(i) for i in base.vector or [base]):
+                return
+        else:
+            seen = set_by_id()
+            to_check = set_by_id()
+            to_check.add(base)
+            while to_check:
+                dup = to_check.pop()
+                if dup not in seen:
+                    seen.add(dup)
+                    base = dup.vectorbase
+                    if base.vector:
+                        for i in base.vector:
+                            if not self.is_deallocated(i):
+                                # not all vector elements ready for deallocation
+                                return
+                            if len(i.duplicates) > 1:
+                                for x in i.duplicates:
+                                    to_check.add(x)
+                    else:
+                        if not self.is_deallocated(base):
                             return
-                        if len(i.duplicates) > 1:
-                            for x in i.duplicates:
-                                to_check.add(x)
-                else:
-                    if base not in self.dealloc:
-                        return
-                for x in itertools.chain(dup.duplicates, base.duplicates):
-                    to_check.add(x)
+                    for x in itertools.chain(dup.duplicates, base.duplicates):
+                        to_check.add(x)
 
-        free[reg.reg_type, base.size].add(self.alloc[base])
+        free[reg.reg_type, base.size].add(self.alloc[self.number(base)])
         if inst.is_vec() and base.vector:
-            self.defined[base] = inst
+            self.defined[self.number(base)] = 1
             for i in base.vector:
-                self.defined[i] = inst
+                self.defined[self.number(i)] = 1
         else:
-            self.defined[reg] = inst
+            self.defined[self.number(reg)] = 1
 
     def process(self, program, alloc_pool):
         for k,i in enumerate(reversed(program)):
             unused_regs = []
-            for j in i.get_def():
-                if j.vectorbase in self.alloc:
-                    if j in self.defined:
+            defs = list(i.get_def())
+            for j in defs:
+                if self.is_allocated(j):
+                    if self.defined[self.number(j)]:
                         raise CompilerError("Double write on register %s " \
                                             "assigned by '%s' in %s" % \
                                                 (j,i,format_trace(i.caller)))
@@ -144,7 +184,7 @@ class StraightlineAllocator:
                     # unused register
                     self.alloc_reg(j, alloc_pool)
                     unused_regs.append(j)
-            if unused_regs and len(unused_regs) == len(list(i.get_def())) and \
+            if unused_regs and len(unused_regs) == len(defs) and \
                self.program.verbose:
                 # only report if all assigned registers are unused
                 print("Register(s) %s never used, assigned by '%s' in %s" % \
@@ -152,7 +192,7 @@ class StraightlineAllocator:
 
             for j in i.get_used():
                 self.alloc_reg(j, alloc_pool)
-            for j in i.get_def():
+            for j in defs:
                 self.dealloc_reg(j, i, alloc_pool)
 
             if k % 1000000 == 0 and k > 0:
@@ -166,9 +206,11 @@ class StraightlineAllocator:
         return self.usage
 
     def finalize(self, options):
-        for reg in self.alloc:
+        for reg, res in zip(self.regs, self.alloc):
+            if res == -1:
+                continue
             for x in reg.vector:
-                if x not in self.dealloc and reg not in self.dealloc:
+                if not self.is_deallocated(x) and not self.is_deallocated(reg):
                     print('Warning: read before write at register', x)
                     print('\tregister trace: %s' % format_trace(x.caller,
                                                                 '\t\t'))
@@ -210,7 +252,36 @@ def determine_scope(block, options):
 
     block.used_from_scope = used_from_scope
 
+def parse_gc_schedule(spec):
+    """ Parse limits like ``wide,batch=100000,live=1000000`` for
+    merging binary circuits into wide batches (see
+    :py:meth:`Merger.gc_layer`). ``batch`` is the maximum number of
+    gates per instruction and ``live`` the maximum number of gates per
+    layer. The latter only limits the width of a layer, which is an
+    upper bound on the results of a layer but does not account for
+    results kept from earlier layers. Limits not mentioned or zero
+    mean no limit, and ``None`` disables the schedule. """
+    if spec is None:
+        return None
+    res = dict(batch=0, live=0)
+    for part in spec.split(','):
+        name, eq, limit = part.partition('=')
+        name = name.strip()
+        if not eq and name == 'wide':
+            continue
+        if name not in res:
+            raise CompilerError('unknown GC schedule limit: %s' % name)
+        try:
+            res[name] = int(limit)
+        except ValueError:
+            raise CompilerError('invalid limit for %s: %s' % (name, limit))
+    return res
+
 class Merger:
+    # depths in the GC schedule are the layer times this plus the
+    # depth of gates without communication within the layer
+    layer_size = 2 ** 32
+
     def __init__(self, block, options, merge_classes):
         self.block = block
         self.instructions = block.instructions
@@ -221,7 +292,33 @@ class Merger:
             self.max_parallel_open = float('inf')
         self.counter = defaultdict(lambda: 0)
         self.rounds = defaultdict(lambda: 0)
-        self.dependency_graph(merge_classes)
+        self.merge_classes = merge_classes
+        self.gc_schedule = block.parent.program.gc_schedule
+        if not (self.only_register_dependencies() and
+                self.register_depths(merge_classes)):
+            self.warn_gc_schedule('it contains instructions that are not '
+                                  'only ordered by registers')
+            self.dependency_graph(merge_classes)
+
+    def warn_gc_schedule(self, reason):
+        """ Warn that the dependency graph ignores the GC schedule """
+        if self.gc_schedule and any(
+                isinstance(instr, self.gc_layer_classes())
+                for instr in self.instructions if instr is not None):
+            print('Warning: GC schedule has no effect in block %s '
+                  'because %s' % (self.block.name, reason))
+
+    def only_register_dependencies(self):
+        """ Whether the order of the block is only constrained by
+        registers, in which case merging does not need the full
+        dependency graph. This is typical for binary circuits. """
+        ordered = (TextInputInstruction, RawInputInstruction,
+                   ReadMemoryInstruction, WriteMemoryInstruction, matmulsm,
+                   IOInstruction, PublicFileIOInstruction,
+                   startprivateoutput_class, stopprivateoutput_class,
+                   prep_class, StackInstruction)
+        return not any(isinstance(instr, ordered)
+                       for instr in self.instructions)
 
     def do_merge(self, merges_iter):
         """ Merge an iterable of nodes in G, returning the number of merged
@@ -259,6 +356,8 @@ class Merger:
         depths = self.depths
         if not merge_nodes:
             return 0
+        if G is None:
+            return self.register_merge()
 
         # merge opens at same depth
         merges = defaultdict(list)
@@ -289,6 +388,185 @@ class Merger:
 
         return len(merges)
 
+    def register_merge(self):
+        """ Merge instructions at the same depth without a graph.
+        Every merged instruction comes right after the instructions of
+        lower depth it depends on, and every other instruction comes
+        right before the first merged instruction that needs it. """
+        instructions = self.instructions
+        open_nodes = self.open_nodes
+        depths = self.depths
+        producers, ptr = self.producers
+
+        # depth of the first merged instruction needing each instruction
+        needed = [float('inf')] * len(instructions)
+        for n in range(len(instructions) - 1, -1, -1):
+            need = depths[n] if n in open_nodes else needed[n]
+            for i in producers[ptr[n]:ptr[n + 1]]:
+                if need < needed[i]:
+                    needed[i] = need
+        self.producers = None
+
+        merges = defaultdict(list)
+        for node in sorted(open_nodes):
+            if self.gc_schedule:
+                # one instruction per type and truth table in a layer
+                merges[depths[node],
+                       instructions[node].merge_id()].append(node)
+            else:
+                merges[depths[node]].append(node)
+        if self.gc_schedule:
+            order = sorted(merges, key=lambda x: x[0])
+        else:
+            order = sorted(merges)
+        for i, x in enumerate(order):
+            merge = merges[x]
+            t = type(instructions[merge[0]])
+            self.counter[t] += len(merge)
+            self.rounds[t] += 1
+            if len(merge) > 10000:
+                print('Merging %d %s in round %d/%d' % \
+                    (len(merge), t.__name__, i, len(merges)))
+            for batch in self.batches(merge):
+                self.do_merge(batch)
+
+        def key(n):
+            if n in open_nodes:
+                return depths[n], 1
+            else:
+                return needed[n], 0
+
+        if len(instructions) > 1000000:
+            print("Sorting by depth ...")
+        order = sorted((n for n, instr in enumerate(instructions)
+                        if instr is not None), key=key)
+        instructions[:] = [instructions[n] for n in order]
+        return len(merges)
+
+    def batches(self, merge):
+        """ Split nodes to merge according to the maximum number of
+        gates per instruction in the GC schedule """
+        limit = self.gc_schedule and self.gc_schedule['batch']
+        if not limit or not hasattr(self.instructions[merge[0]], 'n_gates'):
+            yield merge
+            return
+        batch = []
+        n_gates = 0
+        for node in merge:
+            size = self.instructions[node].n_gates()
+            if batch and n_gates + size > limit:
+                yield batch
+                batch = []
+                n_gates = 0
+            batch.append(node)
+            n_gates += size
+        yield batch
+
+    def register_depths(self, merge_classes):
+        """ Compute the depths as in dependency_graph() in one pass
+        over the block, following only the registers. Returns False if
+        an instruction does not use any registers because only the
+        dependency graph keeps those in place. """
+        self.G = None
+        self.open_nodes = set()
+        self.depths = depths = [0] * len(self.instructions)
+        producers = array('i')
+        ptr = array('i', [0])
+        self.producers = producers, ptr
+        last_def = defaultdict_by_id(lambda: -1)
+        merge_depth = self.merge_depth()
+        if self.gc_schedule:
+            layer_classes = self.gc_layer_classes()
+            gc_layer = self.gc_layer()
+        else:
+            layer_classes = ()
+        for n, instr in enumerate(self.instructions):
+            outputs, inputs = instr.get_def(), instr.get_used()
+            has_registers = False
+            for reg in inputs:
+                has_registers = True
+                for r in reg.vector if reg.vector and instr.is_vec() \
+                    else (reg,):
+                    i = last_def[r]
+                    if i != -1:
+                        producers.append(i)
+                        if depths[n] < depths[i]:
+                            depths[n] = depths[i]
+            for reg in outputs:
+                has_registers = True
+                for r in reg.vector if reg.vector and instr.is_vec() \
+                    else (reg,):
+                    last_def[r] = n
+            if not has_registers:
+                self.producers = None
+                return False
+            ptr.append(len(producers))
+            if isinstance(instr, layer_classes):
+                self.open_nodes.add(n)
+                depths[n] = gc_layer(instr, depths[n])
+            elif isinstance(instr, merge_classes):
+                self.open_nodes.add(n)
+                depths[n] = merge_depth(instr, depths[n] + 1)
+        return True
+
+    @staticmethod
+    def gc_layer_classes():
+        """ Instructions with gates placed in layers by the GC schedule """
+        import Compiler.GC.instructions as gc
+        return gc.ands, gc.andrs, gc.projs, gc.projms
+
+    def gc_layer(self):
+        """ Function that returns the depth of the first layer after
+        a given depth with space for an instruction with AND or
+        projection gates, and reserves it. In contrast to
+        :py:meth:`merge_depth`, instructions of different types share
+        a layer, and other instructions do not start a new layer. """
+        limit = self.gc_schedule['live']
+        n_gates = defaultdict(lambda: 0)
+        next_available_layer = {}
+
+        def find(instr, depth):
+            layer = depth // self.layer_size + 1
+            skipped_layers = set()
+            while limit and n_gates[layer] and \
+                  n_gates[layer] + instr.n_gates() > limit:
+                skipped_layers.add(layer)
+                layer = next_available_layer.get(layer, layer + 1)
+            for l in skipped_layers:
+                next_available_layer[l] = layer
+            n_gates[layer] += instr.n_gates()
+            return layer * self.layer_size
+
+        return find
+
+    def merge_depth(self):
+        """ Function that returns the first depth from a minimum that
+        has the right type and isn't full, and reserves it for an
+        instruction """
+        options = self.options
+        parallel_open = defaultdict(lambda: 0)
+        next_available_depth = {}
+        round_type = {}
+
+        def find(instr, depth):
+            skipped_depths = set()
+            while (depth in round_type and \
+                   round_type[depth] != instr.merge_id()) or \
+                  (int(options.max_parallel_open) > 0 and \
+                  parallel_open[depth] >= int(options.max_parallel_open)):
+                skipped_depths.add(depth)
+                depth = next_available_depth.get((type(instr), depth), \
+                                                 depth + 1)
+            for d in skipped_depths:
+                next_available_depth[type(instr), d] = depth
+
+            round_type[depth] = instr.merge_id()
+            if int(options.max_parallel_open) > 0:
+                parallel_open[depth] += len(instr.args) * instr.get_size()
+            return depth
+
+        return find
+
     def dependency_graph(self, merge_classes):
         """ Create the program dependency graph. """
         block = self.block
@@ -301,7 +579,7 @@ class Merger:
                                 triple='green', square='green', bit='green',\
                                 asm_input='lightgreen')
 
-        G = Compiler.graph.SparseDiGraph(len(block.instructions))
+        G = Compiler.graph.CompactDiGraph(len(block.instructions))
         self.G = G
 
         reg_nodes = {}
@@ -318,11 +596,8 @@ class Merger:
 
         depths = [0] * len(block.instructions)
         self.depths = depths
-        parallel_open = defaultdict(lambda: 0)
-        next_available_depth = {}
-        self.sources = []
+        merge_depth = self.merge_depth()
         self.real_depths = [0] * len(block.instructions)
-        round_type = {}
 
         def add_edge(i, j):
             G.add_edge(i, j)
@@ -431,24 +706,7 @@ class Merger:
                 G.add_node(n, merges=[])
                 # the following must happen after adding the edge
                 self.real_depths[n] += 1
-                depth = depths[n] + 1
-
-                # find first depth that has the right type and isn't full
-                skipped_depths = set()
-                while (depth in round_type and \
-                       round_type[depth] != instr.merge_id()) or \
-                      (int(options.max_parallel_open) > 0 and \
-                      parallel_open[depth] >= int(options.max_parallel_open)):
-                    skipped_depths.add(depth)
-                    depth = next_available_depth.get((type(instr), depth), \
-                                                     depth + 1)
-                for d in skipped_depths:
-                    next_available_depth[type(instr), d] = depth
-
-                round_type[depth] = instr.merge_id()
-                if int(options.max_parallel_open) > 0:
-                    parallel_open[depth] += len(instr.args) * instr.get_size()
-                depths[n] = depth
+                depths[n] = merge_depth(instr, depths[n] + 1)
 
             if isinstance(instr, ReadMemoryInstruction):
                 if options.preserve_mem_order:
@@ -483,26 +741,40 @@ class Merger:
             elif isinstance(instr, StackInstruction):
                 keep_order(instr, n, StackInstruction)
 
-            if not G.pred[n]:
-                self.sources.append(n)
-
             if n % 1000000 == 0 and n > 0:
                 print("Processed dependency of %d/%d instructions at" % \
                     (n, len(block.instructions)), time.asctime())
 
+        self.sources = [n for n in range(len(G)) if not G.pred[n]]
+
     def merge_nodes(self, i, j):
         """ Merge node j into i, removing node j """
         G = self.G
-        if j in G[i]:
-            G.remove_edge(i, j)
-        if i in G[j]:
-            G.remove_edge(j, i)
-        G.add_edges_from(list(zip(itertools.cycle([i]), G[j], [G.weights[(j,k)] for k in G[j]])))
-        G.add_edges_from(list(zip(G.pred[j], itertools.cycle([i]), [G.weights[(k,j)] for k in G.pred[j]])))
+        if G is None:
+            return
+        G.contract(i, j)
         G.get_attr(i, 'merges').append(j)
-        G.remove_node(j)
+
+    @staticmethod
+    def can_eliminate(inst):
+        """ Whether an instruction can be removed if its results are
+        not used """
+        can_eliminate_defs = True
+        for reg in inst.get_def():
+            for dup in reg.duplicates:
+                if not dup.can_eliminate:
+                    can_eliminate_defs = False
+                    break
+        return len(list(inst.get_def())) and can_eliminate_defs \
+            and not isinstance(inst, (DoNotEliminateInstruction))
 
     def eliminate_dead_code(self):
+        if self.G is None:
+            if self.producers is not None:
+                return self.eliminate_dead_registers()
+            self.warn_gc_schedule('dead code elimination needs the '
+                                  'dependency graph')
+            self.dependency_graph(self.merge_classes)
         instructions = self.instructions
         G = self.G
         merge_nodes = self.open_nodes
@@ -512,16 +784,8 @@ class Merger:
         for i,inst in zip(range(len(instructions) - 1, -1, -1), reversed(instructions)):
             if inst is None:
                 continue
-            can_eliminate_defs = True
-            for reg in inst.get_def():
-                for dup in reg.duplicates:
-                    if not dup.can_eliminate:
-                        can_eliminate_defs = False
-                        break
             # remove if instruction has result that isn't used
-            unused_result = not G.degree(i) and len(list(inst.get_def())) \
-                and can_eliminate_defs \
-                and not isinstance(inst, (DoNotEliminateInstruction))
+            unused_result = not G.degree(i) and self.can_eliminate(inst)
             def eliminate(i):
                 G.remove_node(i)
                 merge_nodes.discard(i)
@@ -546,6 +810,30 @@ class Merger:
             print('Eliminated %d dead instructions, among which %d opens: %s' \
                 % (count, open_count, dict(stats)))
 
+    def eliminate_dead_registers(self):
+        """ Dead code elimination following the producers found by
+        :py:meth:`register_depths` instead of the dependency graph,
+        which keeps the depths of the GC schedule """
+        instructions = self.instructions
+        producers, ptr = self.producers
+        n_users = array('i', [0]) * len(instructions)
+        for i in producers:
+            n_users[i] += 1
+        count = 0
+        stats = defaultdict(lambda: 0)
+        for i in range(len(instructions) - 1, -1, -1):
+            inst = instructions[i]
+            if inst is None or n_users[i] or not self.can_eliminate(inst):
+                continue
+            for j in producers[ptr[i]:ptr[i + 1]]:
+                n_users[j] -= 1
+            self.open_nodes.discard(i)
+            stats[type(inst).__name__] += 1
+            instructions[i] = None
+            count += 1
+        if count > 0 and self.block.parent.program.verbose:
+            print('Eliminated %d dead instructions: %s' % (count, dict(stats)))
+
     def print_graph(self, filename):
         f = open(filename, 'w')
         print('digraph G {', file=f)
@@ -5,16 +5,198 @@ the ones used below into ``Programs/Circuits`` as follows::
 
     make Programs/Circuits
 
+The parsed circuits are cached in ``Programs/Cache`` across
+compilations.
+
+Circuits with projection gates use an extension of the format, which
+``a2bristol.py`` writes for programs using :py:meth:`sbits.proj`.
+Every wire has a bit length: the line ``WIDTHS`` after the output
+line gives the length of the wires of every input and then every
+output, and the length of every other wire follows from the gate
+writing it. The line ``TABLES <k>`` is followed by one line per truth
+table ``<input bits> <output bits> <row 0> ... <row 2^l - 1>``, which
+are numbered from zero. The extension adds two gate types, and XOR
+gates also work on n-bit wires::
+
+    1 m <input> <output 1> ... <output m> PROJ <table 1> ... <table m>
+    1 1 <input> <output> XORC <public value>
+
+``PROJ`` applies truth tables to the same input as
+:py:meth:`sbits.proj` and :py:meth:`sbits.proj_multi`, and ``XORC``
+computes the XOR with a public value.
+
 .. _`Bristol Fashion`: https://homes.esat.kuleuven.be/~nsmart/MPC
 
 """
 
 from Compiler.GC.types import *
 from Compiler.library import function_block
+from Compiler.exceptions import CompilerError
 from Compiler import util
+from array import array
+import hashlib
 import itertools
+import os
+import pickle
 import struct
 
+class ParsedCircuit:
+    """ Gates of a Bristol Fashion circuit as integer arrays. Use
+    :py:meth:`get` to reuse circuits that have been parsed before in
+    the same process or, via ``Programs/Cache``, in an earlier
+    compilation. """
+    XOR, AND, INV, PROJ, XORC = range(5)
+    types = dict(XOR=XOR, AND=AND, INV=INV, PROJ=PROJ, XORC=XORC)
+    cache = {}
+    # change when the stored attributes change
+    version = 2
+
+    @classmethod
+    def get(cls, filename):
+        stat = os.stat(filename)
+        key = filename, stat.st_mtime_ns, stat.st_size, cls.version
+        if key not in cls.cache:
+            res = cls.load_disk_cache(key)
+            if res is None:
+                res = cls(filename)
+                res.store_disk_cache(key)
+            cls.cache[key] = res
+        return cls.cache[key]
+
+    @staticmethod
+    def disk_cache_path(filename):
+        from Compiler.program import Program
+        prog = getattr(Program, 'prog', None)
+        if prog is not None and hasattr(prog, 'programs_dir'):
+            name = os.path.basename(filename).rpartition('.')[0]
+            digest = hashlib.sha256(
+                os.path.abspath(filename).encode()).hexdigest()[:16]
+            return os.path.join(prog.programs_dir, 'Cache',
+                                'circuit-%s-%s.pickle' % (name, digest))
+
+    @classmethod
+    def load_disk_cache(cls, key):
+        path = cls.disk_cache_path(key[0])
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    stored_key, state = pickle.load(f)
+                if stored_key == key:
+                    res = cls.__new__(cls)
+                    res.__dict__.update(state)
+                    return res
+            except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+                pass
+
+    def store_disk_cache(self, key):
+        path = self.disk_cache_path(key[0])
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    pickle.dump((key, self.__dict__), f)
+            except OSError:
+                pass
+
+    def __init__(self, filename):
+        with open(filename) as f:
+            tokens = f.read().split()
+        numbers = lambda start, n: [int(x) for x in tokens[start:start + n]]
+        self.n_gates, self.n_wires = numbers(0, 2)
+        n_inputs = int(tokens[2])
+        self.n_input_wires = numbers(3, n_inputs)
+        pos = 3 + n_inputs
+        n_outputs = int(tokens[pos])
+        self.n_output_wires = numbers(pos + 1, n_outputs)
+        pos += 1 + n_outputs
+        # extension for n-bit wires
+        self.widths = [1] * (n_inputs + n_outputs)
+        self.tables = []
+        if tokens[pos:pos + 1] == ['WIDTHS']:
+            self.widths = numbers(pos + 1, n_inputs + n_outputs)
+            pos += 1 + n_inputs + n_outputs
+        if tokens[pos:pos + 1] == ['TABLES']:
+            pos += 2
+            for i in range(int(tokens[pos - 1])):
+                input_size, output_size = numbers(pos, 2)
+                rows = numbers(pos + 2, 2 ** input_size)
+                self.tables.append((rows, output_size))
+                pos += 2 + 2 ** input_size
+        self.op = array('b')
+        self.in0 = array('i')
+        self.in1 = array('i')
+        self.out = array('i')
+        # truth table of PROJ, public operand of XORC
+        self.param = array('I')
+        for i in range(self.n_gates):
+            n_in, n_out = numbers(pos, 2)
+            t = tokens[pos + 2 + n_in + n_out]
+            n_params = 0
+            if t == 'PROJ':
+                # one gate per output, which compile() merges again
+                assert n_in == 1
+                n_params = n_out
+                wires = numbers(pos + 2, 1 + n_out)
+                tables = numbers(pos + 3 + n_in + n_out, n_out)
+                for out, table in zip(wires[1:], tables):
+                    self.add_gate(self.PROJ, wires[0], -1, out, table)
+            elif t in self.types:
+                assert n_out == 1
+                assert n_in == (1 if t in ('INV', 'XORC') else 2)
+                wires = numbers(pos + 2, n_in + 1)
+                param = 0
+                if t == 'XORC':
+                    n_params = 1
+                    param = int(tokens[pos + 3 + n_in + n_out])
+                self.add_gate(self.types[t], wires[0],
+                              wires[1] if n_in == 2 else -1, wires[-1], param)
+            pos += 3 + n_in + n_out + n_params
+        self.schedule = self.layers()
+
+    def add_gate(self, op, in0, in1, out, param):
+        self.op.append(op)
+        self.in0.append(in0)
+        self.in1.append(in1)
+        self.out.append(out)
+        self.param.append(param)
+
+    def gates(self):
+        """ Iterate over (type, input, input or -1, output). """
+        return zip(self.op, self.in0, self.in1, self.out)
+
+    def layers(self):
+        """ Order the gates in batches of independent gates of the same
+        type in the way :py:meth:`Compiler.allocator.Merger.longest_paths_merge`
+        would merge one instruction per gate, that is, every round
+        holds either AND or XOR gates, and gates with one input
+        directly follow the round of their input. Returns a list of
+        (type, gate indices) with type None for the latter. """
+        depths = array('i', [0]) * self.n_wires
+        round_type = {}
+        next_available_depth = {}
+        batches = {}
+        for i, (t, a, b, c) in enumerate(self.gates()):
+            if b < 0:
+                depth = depths[a]
+                key = depth, 1
+            else:
+                depth = max(depths[a], depths[b]) + 1
+                # find first depth that has the right type
+                skipped_depths = set()
+                while depth in round_type and round_type[depth] != t:
+                    skipped_depths.add(depth)
+                    depth = next_available_depth.get((t, depth), depth + 1)
+                for d in skipped_depths:
+                    next_available_depth[t, d] = depth
+                round_type[depth] = t
+                key = depth, 0
+            depths[c] = depth
+            if key not in batches:
+                batches[key] = array('i')
+            batches[key].append(i)
+        return [(self.op[gates[0]] if key[1] == 0 else None, gates)
+                for key, gates in sorted(batches.items())]
+
 class Circuit:
     """
     Use a Bristol Fashion circuit in a high-level program. The
@@ -43,82 +225,125 @@ class Circuit:
     last result, which should be ``0x3ad77bb40d7a3660a89ecaf32466ef97``,
     one of the test vectors for AES-128.
 
+    Names ending in ``.txt`` are paths of circuit files outside
+    ``Programs/Circuits``.
+
     """
 
     def __init__(self, name):
-        self.filename = 'Programs/Circuits/%s.txt' % name
-        f = open(self.filename)
+        if name.endswith('.txt'):
+            self.filename = name
+        else:
+            self.filename = 'Programs/Circuits/%s.txt' % name
+        self.circuit = ParsedCircuit.get(self.filename)
+        self.n_output_wires = self.circuit.n_output_wires
         self.functions = {}
 
     def __call__(self, *inputs):
         return self.run(*inputs)
 
     def run(self, *inputs):
-        n = inputs[0][0].n
-        if n not in self.functions:
-            self.functions[n] = function_block(lambda *args:
-                                               self.compile(*args))
-        flat_res = self.functions[n](*itertools.chain(*inputs))
+        """ Outputs of n-bit wires are lists of registers instead of
+        :py:class:`sbitvec`. """
+        if max(self.circuit.widths) > 1:
+            # passing arguments through memory loses the bit length
+            # of n-bit wires, so these circuits are not a function block
+            flat_res = self.compile(*itertools.chain(*inputs))
+        else:
+            n = inputs[0][0].n
+            if n not in self.functions:
+                self.functions[n] = function_block(lambda *args:
+                                                   self.compile(*args))
+            flat_res = self.functions[n](*itertools.chain(*inputs))
         res = []
         i = 0
-        for l in self.n_output_wires:
-            v = []
-            for i in range(l):
-                v.append(flat_res[i])
-                i += 1
-            res.append(sbitvec.from_vec(v))
+        widths = self.circuit.widths[len(self.circuit.n_input_wires):]
+        for l, width in zip(self.n_output_wires, widths):
+            v = list(flat_res[i:i + l])
+            i += l
+            res.append(sbitvec.from_vec(v) if width == 1 else v)
         return util.untuplify(res)
 
     def compile(self, *all_inputs):
-        f = open(self.filename)
-        lines = iter(f)
-        next_line = lambda: next(lines).split()
-        n_gates, n_wires = (int(x) for x in next_line())
-        self.n_wires = n_wires
-        input_line = [int(x) for x in next_line()]
-        n_inputs = input_line[0]
-        n_input_wires = input_line[1:]
-        assert(n_inputs == len(n_input_wires))
+        circuit = self.circuit
+        n_input_wires = circuit.n_input_wires
         inputs = []
         s = 0
         for n in n_input_wires:
             inputs.append(all_inputs[s:s + n])
             s += n
-        output_line = [int(x) for x in next_line()]
-        n_outputs = output_line[0]
-        self.n_output_wires = output_line[1:]
-        assert(n_outputs == len(self.n_output_wires))
-        next(lines)
 
-        wires = [None] * n_wires
+        wires = [None] * circuit.n_wires
+        self.n_wires = circuit.n_wires
         self.wires = wires
         i_wire = 0
-        for input, input_wires in zip(inputs, n_input_wires):
+        for input, input_wires, width in zip(inputs, n_input_wires,
+                                             circuit.widths):
             assert(len(input) == input_wires)
             for i, reg in enumerate(input):
+                if getattr(reg, 'single_wire_n', 1) != width:
+                    raise CompilerError('circuit %s needs %d-bit wires' %
+                                        (self.filename, width))
                 wires[i_wire] = reg
                 i_wire += 1
 
-        for i in range(n_gates):
-            line = next_line()
-            t = line[-1]
-            if t in ('XOR', 'AND'):
-                assert line[0] == '2'
-                assert line[1] == '1'
-                assert len(line) == 6
-                ins = [wires[int(line[2 + i])] for i in range(2)]
-                if t == 'XOR':
-                    wires[int(line[4])] = ins[0] ^ ins[1]
+        # one instruction per batch of independent gates
+        in0, in1, out = circuit.in0, circuit.in1, circuit.out
+        for t, gates in circuit.schedule:
+            if t is None:
+                self.compile_single_input(gates)
+                continue
+            args = []
+            for i in gates:
+                x, y = wires[in0[i]], wires[in1[i]]
+                if isinstance(x, sbits) and isinstance(y, sbits) and \
+                   x.n is not None and x.n == y.n and \
+                   x.single_wire_n == y.single_wire_n == 1:
+                    res = x.new(n=x.n)
+                    args += [x.n, res, x, y]
+                    wires[out[i]] = res
+                elif t == circuit.XOR:
+                    wires[out[i]] = x ^ y
+                else:
+                    wires[out[i]] = x & y
+            if args:
+                if t == circuit.XOR:
+                    inst.xors(*args)
                 else:
-                    wires[int(line[4])] = ins[0] & ins[1]
-            elif t == 'INV':
-                assert line[0] == '1'
-                assert line[1] == '1'
-                assert len(line) == 5
-                wires[int(line[3])] = ~wires[int(line[2])]
+                    inst.ands(*args)
 
         return self.wires[-sum(self.n_output_wires):]
 
+    def compile_single_input(self, gates):
+        """ Gates with one input. PROJ gates on the same wire following
+        each other become one projection with several outputs. """
+        circuit = self.circuit
+        wires = self.wires
+        op, in0, out, param = circuit.op, circuit.in0, circuit.out, \
+            circuit.param
+        i = 0
+        while i < len(gates):
+            g = gates[i]
+            x = wires[in0[g]]
+            j = i + 1
+            if op[g] == circuit.INV:
+                wires[out[g]] = ~x
+            elif op[g] == circuit.XORC:
+                wires[out[g]] = x ^ param[g]
+            else:
+                while j < len(gates) and op[gates[j]] == circuit.PROJ and \
+                      in0[gates[j]] == in0[g]:
+                    j += 1
+                group = gates[i:j]
+                tables = [circuit.tables[param[k]] for k in group]
+                if len(group) == 1:
+                    wires[out[g]] = x.proj(*tables[0])
+                else:
+                    res = x.proj_multi(*zip(*tables))
+                    for k, reg in zip(group, res):
+                        wires[out[k]] = reg
+            i = j
+
 Keccak_f = None
 
 def sha3_256(x):
@@ -1,4 +1,5 @@
-import heapq
+import heapq, itertools
+from array import array
 from Compiler.exceptions import *
 
 class GraphError(CompilerError):
@@ -100,6 +101,211 @@ class SparseDiGraph(object):
     def degree(self, i):
         return len(self.succ[i])
 
+    def contract(self, i, j):
+        """ Merge node j into i, removing node j """
+        if j in self[i]:
+            self.remove_edge(i, j)
+        if i in self[j]:
+            self.remove_edge(j, i)
+        self.add_edges_from(list(zip(itertools.cycle([i]), self[j], [self.weights[(j,k)] for k in self[j]])))
+        self.add_edges_from(list(zip(self.pred[j], itertools.cycle([i]), [self.weights[(k,j)] for k in self.pred[j]])))
+        self.remove_node(j)
+
+
+class Weights(dict):
+    """ Edge weights where only the ones different from 1 are stored """
+    def __missing__(self, edge):
+        return 1
+
+class Neighbours(object):
+    def __init__(self, G, reverse):
+        self.G = G
+        self.reverse = reverse
+
+    def __getitem__(self, i):
+        return self.G.neighbours(i, self.reverse)
+
+class CompactDiGraph(object):
+    """ Directed graph with the same interface as SparseDiGraph for
+    graphs with millions of nodes such as the dependency graph of a
+    basic block.
+
+    Edges are appended to two arrays of 32-bit integers and only
+    turned into compressed sparse rows (CSR) for both directions when
+    neighbours are queried. Removed nodes are marked in a bitmap, and
+    contracting nodes only records the representative, so the edge
+    arrays are not touched after construction. Node attributes and
+    weights are only stored when they differ from the default.
+    """
+    def __init__(self, max_nodes, default_attributes=None):
+        if default_attributes is None:
+            default_attributes = { 'merges': None }
+        self.default_attributes = default_attributes
+        self.attributes = dict((a, {}) for a in default_attributes)
+        self.n = max_nodes
+        self.src = array('i')
+        self.dst = array('i')
+        self.weights = Weights()
+        self.removed = bytearray(self.n)
+        self.removed_edges = set()
+        # representative of every node and nodes contracted into it
+        self.rep = array('i', range(self.n))
+        self.members = {}
+        self.pred = Neighbours(self, True)
+        self.csr = None
+        # edges into the last node to avoid duplicates
+        self.last_dst = None
+        self.last_src = set()
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        """ Get list of the neighbours of node i """
+        return self.neighbours(i, False)
+
+    def __iter__(self):
+        """ Nodes that are neither removed nor contracted into another """
+        return (i for i in range(self.n)
+                if not self.removed[i] and self.rep[i] == i)
+
+    def __contains__(self, i):
+        return i >= 0 and i < self.n
+
+    def add_node(self, i, **attr):
+        if i >= self.n:
+            raise CompilerError('Cannot add node %d to graph of size %d' % (i, self.n))
+        for a,value in list(attr.items()):
+            self.set_attr(i, a, value)
+
+    def set_attr(self, i, attr, value):
+        if attr in self.default_attributes:
+            self.attributes[attr][i] = value
+        else:
+            raise CompilerError('Invalid attribute %s for graph node' % attr)
+
+    def get_attr(self, i, attr):
+        return self.attributes[attr].get(i, self.default_attributes[attr])
+
+    def find(self, i):
+        """ Representative of node i """
+        rep = self.rep
+        root = i
+        while rep[root] != root:
+            root = rep[root]
+        while rep[i] != root:
+            rep[i], i = root, rep[i]
+        return root
+
+    def build(self):
+        """ Compressed sparse rows in both directions, the sources
+        are sorted already if edges are added in the order of their
+        destination """
+        def rows(keys, values):
+            ptr = array('i', [0]) * (self.n + 1)
+            for k in keys:
+                ptr[k + 1] += 1
+            for i in range(self.n):
+                ptr[i + 1] += ptr[i]
+            if all(keys[i] <= keys[i + 1] for i in range(len(keys) - 1)):
+                return ptr, values
+            pos = ptr[:-1]
+            adj = array('i', values)
+            for k, v in zip(keys, values):
+                adj[pos[k]] = v
+                pos[k] += 1
+            return ptr, adj
+        self.csr = rows(self.src, self.dst), rows(self.dst, self.src)
+        self.last_dst = None
+        self.last_src = set()
+
+    def neighbours(self, i, reverse):
+        """ Successors or predecessors of node i after contraction """
+        if self.removed[i] or self.rep[i] != i:
+            return []
+        if self.csr is None:
+            self.build()
+        ptr, adj = self.csr[reverse]
+        res = []
+        seen = set()
+        for m in self.members.get(i, (i,)):
+            for k in adj[ptr[m]:ptr[m + 1]]:
+                k = self.find(k)
+                if k != i and k not in seen and not self.removed[k]:
+                    seen.add(k)
+                    res.append(k)
+        if self.removed_edges:
+            res = [k for k in res if ((k, i) if reverse else (i, k))
+                   not in self.removed_edges]
+        return res
+
+    def remove_node(self, i):
+        """ Remove node i and all its edges """
+        self.removed[i] = 1
+        for attr in self.attributes.values():
+            attr.pop(i, None)
+
+    def add_edge(self, i, j, weight=1):
+        i, j = self.find(i), self.find(j)
+        self.removed_edges.discard((i, j))
+        if j != self.last_dst:
+            self.last_dst = j
+            self.last_src = set()
+        if i not in self.last_src:
+            self.last_src.add(i)
+            self.src.append(i)
+            self.dst.append(j)
+            self.csr = None
+        if weight != 1:
+            self.weights[(i,j)] = weight
+
+    def add_edges_from(self, tuples):
+        for edge in tuples:
+            self.add_edge(*edge)
+
+    def remove_edge(self, i, j):
+        self.removed_edges.add((i, j))
+        self.weights.pop((i,j), None)
+
+    def remove_edges_from(self, pairs):
+        for i,j in pairs:
+            self.remove_edge(i, j)
+
+    def degree(self, i):
+        return len(self[i])
+
+    def contract(self, i, j):
+        """ Merge node j into i, removing node j """
+        if self.weights:
+            # edges of j replace the ones of i with their weights
+            weights = self.weights
+            edges = [((j, k), (i, k)) for k in self[j]] + \
+                [((k, j), (k, i)) for k in self.pred[j]]
+            for old, new in edges:
+                if i not in old:
+                    weights.pop(new, None)
+                    weight = weights.pop(old, 1)
+                    if weight != 1:
+                        weights[new] = weight
+            weights.pop((i, j), None)
+            weights.pop((j, i), None)
+        succ = pred = None
+        if self.removed_edges:
+            # edges of the merged node as in SparseDiGraph
+            succ = (set(self[i]) | set(self[j])) - set((i, j))
+            pred = (set(self.pred[i]) | set(self.pred[j])) - set((i, j))
+            self.removed_edges = set(e for e in self.removed_edges
+                                     if i not in e and j not in e)
+        self.rep[j] = i
+        self.members.setdefault(i, [i]).extend(self.members.pop(j, [j]))
+        for attr in self.attributes.values():
+            attr.pop(j, None)
+        if succ is not None:
+            # hide edges that were removed before merging
+            self.removed_edges.update((i, k) for k in self[i] if k not in succ)
+            self.removed_edges.update((k, i) for k in self.pred[i]
+                                      if k not in pred)
+
 
 def topological_sort(G, nbunch=None, pref=None):
     seen={}
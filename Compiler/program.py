@@ -62,6 +62,8 @@ class defaults:
     asmoutfile = None
     stop = False
     insecure = False
+    sbox_objective = None
+    gc_schedule = None
 
 class Program(object):
     """ A program consists of a list of tapes representing the whole
@@ -150,6 +152,15 @@ class Program(object):
         self._square = False
         self._always_raw = False
         self._linear_rounds = False
+        from Compiler.GC import sbox
+        self.sbox_objective = sbox.parse_objective(options.sbox_objective)
+        """ Weights of garbling hashes, evaluation hashes, and keys
+        sent for choosing how to evaluate
+        :py:meth:`~Compiler.GC.types.sbits.sbox`. """
+        self.gc_schedule = al.parse_gc_schedule(options.gc_schedule)
+        """ Limits for merging binary circuits into wide batches
+        or ``None`` for merging by rounds, see
+        :py:func:`Compiler.allocator.parse_gc_schedule`. """
         self.warn_about_mem = [True]
         Program.prog = self
         from . import instructions_base, instructions, types, comparison
@@ -679,6 +690,8 @@ class Tape:
 
     def init_registers(self):
         self.reg_counter = RegType.create_dict(lambda: 0)
+        # registers linked by Register.link()
+        self.aliases = util.union_find_by_id()
    
     def init_names(self, name):
         self.name = name
@@ -714,6 +727,19 @@ class Tape:
         for block in self.basicblocks:
             al.determine_scope(block, options)
 
+        # simplify projection gates
+        from Compiler.GC.optimizer import ProjOptimizer
+        proj_counter = defaultdict(lambda: 0)
+        for block in self.basicblocks:
+            proj_optimizer = ProjOptimizer(block)
+            proj_optimizer.run()
+            for x, y in proj_optimizer.counter.items():
+                proj_counter[x] += y
+        if proj_counter:
+            print('Tape %s: %s' % (self.name, ', '.join(
+                '%d %s' % (y, ProjOptimizer.descriptions[x])
+                for x, y in sorted(proj_counter.items()))))
+
         # merge open instructions
         # need to do this if there are several blocks
         if (options.merge_opens and self.merge_opens) or options.dead_code_elimination:
@@ -858,6 +884,18 @@ class Tape:
                 print('Tape requires prime bit length', self.req_bit_length['p'])
                 print('Tape requires galois bit length', self.req_bit_length['2'])
 
+        # write every truth table of projection gates only once
+        import Compiler.GC.instructions as gc_inst
+        truth_tables = {}
+        for block in self.basicblocks:
+            for instr in block.instructions:
+                if isinstance(instr, (gc_inst.projs, gc_inst.projms)):
+                    instr.intern_truth_tables(truth_tables)
+        for (input_size, output_size, table), index in truth_tables.items():
+            self.basicblocks[-1].instructions.append(
+                gc_inst.truthtable(index, input_size, output_size, *table,
+                                   add_to_prog=False))
+
     @unpurged
     def expand_cisc(self):
         for block in self.basicblocks:
@@ -916,6 +954,16 @@ class Tape:
             if i is not None:
                 f.write(i.get_bytes())
         f.close()
+        # offset and name of every basic block, for example to find
+        # the markers set by break_point() in the bytecode
+        f = open(filename[:-len('.bc')] + '.blocks', 'w')
+        offset = 0
+        for block in self.basicblocks:
+            n = len([i for i in block.instructions if i is not None])
+            if n:
+                f.write('%d %s\n' % (offset, block.name))
+                offset += n
+        f.close()
     
     def new_reg(self, reg_type, size=None):
         return self.Register(reg_type, self, size=size)
@@ -1055,7 +1103,7 @@ class Tape:
         """
         __slots__ = ["reg_type", "program", "absolute_i", "relative_i", \
                          "size", "vector", "vectorbase", "caller", \
-                         "can_eliminate", "duplicates"]
+                         "can_eliminate"]
         maximum_size = 2 ** (32 - inst_base.Instruction.code_length) - 1
 
         def __init__(self, reg_type, program, size=None, i=None):
@@ -1084,7 +1132,6 @@ class Tape:
                 self.i = float('inf')
             self.vector = []
             self.can_eliminate = True
-            self.duplicates = util.set_by_id([self])
             if Program.prog.DEBUG:
                 self.caller = [frame[1:] for frame in inspect.stack()[1:]]
             else:
@@ -1154,10 +1201,13 @@ class Tape:
         def copy(self):
             return Tape.Register(self.reg_type, Program.prog.curr_tape)
 
+        @property
+        def duplicates(self):
+            """ Registers linked to this one, including itself """
+            return self.program.aliases[self]
+
         def link(self, other):
-            self.duplicates |= other.duplicates
-            for dup in self.duplicates:
-                dup.duplicates = self.duplicates
+            self.program.aliases.union(self, other)
 
         @property
         def is_gf2n(self):
@@ -281,6 +281,44 @@ class dict_by_id(object):
     def __iter__(self):
         return self.keys()
 
+class union_find_by_id(object):
+    """ Disjoint sets of objects compared by identity. Only objects
+    that have been united with another one are stored, every other
+    object is in a set on its own. """
+    def __init__(self):
+        # parent of every non-root object
+        self.parent = {}
+        # members of every set with more than one object by root
+        self.members = {}
+
+    def find(self, x):
+        parent = self.parent
+        root = x
+        while id(root) in parent:
+            root = parent[id(root)]
+        # path compression
+        while x is not root:
+            parent[id(x)], x = root, parent[id(x)]
+        return root
+
+    def __getitem__(self, x):
+        """ All objects in the same set as :py:obj:`x` """
+        root = self.find(x)
+        return self.members.get(id(root), [root])
+
+    def union(self, x, y):
+        x, y = self.find(x), self.find(y)
+        if x is y:
+            return
+        x_members = self.members.pop(id(x), [x])
+        y_members = self.members.pop(id(y), [y])
+        # attach the smaller set
+        if len(x_members) < len(y_members):
+            x, y, x_members, y_members = y, x, y_members, x_members
+        self.parent[id(y)] = x
+        x_members.extend(y_members)
+        self.members[id(x)] = x_members
+
 class defaultdict_by_id(dict_by_id):
     def __init__(self, default):
         dict_by_id.__init__(self)
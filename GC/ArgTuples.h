@@ -121,6 +121,42 @@ public:
     }
 };
 
+class InputNArgs
+{
+public:
+    static const int n = 4;
+
+    int from;
+    int n_bits;
+    int n_wires;
+    int params[2];
+    int dest;
+
+    InputNArgs(vector<int>::const_iterator it)
+    {
+        from = *it++;
+        n_bits = *it++;
+        n_wires = *it++;
+        dest = *it++;
+        // single bits use the protocol of INPUTB
+        if (n_bits < 2 or n_bits > 32)
+            throw runtime_error("invalid bit length for n-bit input: "
+                    + to_string(n_bits));
+        // one more bit to accept values up to 2^n_bits - 1
+        params[0] = n_bits + 1;
+        params[1] = 0;
+    }
+};
+
+class InputNArgList : public InputArgListBase<InputNArgs>
+{
+public:
+    InputNArgList(const vector<int>& args) :
+            InputArgListBase<InputNArgs>(args)
+    {
+    }
+};
+
 class InputVecArgs
 {
 public:
@@ -70,6 +70,20 @@ unsigned Instruction::get_mem(RegType reg_type) const
     return 0;
 }
 
+TruthTable::TruthTable(const Instruction& instruction)
+{
+    auto& args = instruction.get_start();
+    input_size = args.at(1);
+    output_size = args.at(2);
+    if (input_size < 0 or input_size >= 32 or output_size < 0
+            or output_size > 32 or args.size() != size_t(3
+                    + proj_truth_table_size(input_size, output_size)))
+        throw runtime_error("invalid truth table " + to_string(args[0]));
+    rows.resize(1 << input_size);
+    for (size_t x = 0; x < rows.size(); x++)
+        rows[x] = proj_truth_table_row(args, 3, x, output_size);
+}
+
 void Instruction::parse(istream& s, int pos)
 {
     BaseInstruction::parse(s, pos);
@@ -32,6 +32,47 @@ public:
     unsigned get_mem(RegType reg_type) const;
 };
 
+// truth tables of projection gates are packed into ints with four rows
+// per int for outputs of up to 8 bits, two for up to 16 bits, and one
+// for up to 32 bits
+inline int proj_rows_per_int(int output_size)
+{
+    return output_size <= 8 ? 4 : (output_size <= 16 ? 2 : 1);
+}
+
+// number of ints used for a truth table
+inline int proj_truth_table_size(int input_size, int output_size)
+{
+    int rows_per_int = proj_rows_per_int(output_size);
+    return ((1 << input_size) + rows_per_int - 1) / rows_per_int;
+}
+
+// row x of a truth table starting at args[offset]
+inline unsigned proj_truth_table_row(const vector<int>& args, size_t offset,
+        size_t x, int output_size)
+{
+    int rows_per_int = proj_rows_per_int(output_size);
+    int row_bits = 32 / rows_per_int;
+    unsigned res = unsigned(args[offset + x / rows_per_int]) >> (row_bits * (x % rows_per_int));
+    return row_bits == 32 ? res : res & ((1u << row_bits) - 1);
+}
+
+// truth table of projection gates, decoded from a TRUTHTABLE instruction
+// and referenced by index from PROJS and PROJMS
+class TruthTable
+{
+public:
+    int input_size, output_size;
+    vector<unsigned> rows;
+
+    TruthTable() : input_size(0), output_size(0) {}
+    TruthTable(const Instruction& instruction);
+
+    unsigned operator[](size_t x) const { return rows[x]; }
+};
+
+typedef vector<TruthTable> TruthTables;
+
 } /* namespace GC */
 
 enum
@@ -91,6 +132,9 @@ enum
     CONVCBITVEC = 0x231,
     // projection gates
     PROJS = 0x24a,
+    PROJMS = 0x24c,
+    TRUTHTABLE = 0x24d,
+    INPUTBN = 0x24e,
     REVEALN = 0x250,
     XORMN = 0x24b,
 };
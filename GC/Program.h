@@ -28,6 +28,9 @@ class Program
 {
     vector<Instruction> p;
 
+    // Truth tables of projection gates by index
+    TruthTables truth_tables;
+
     // Maximal register used
     unsigned max_reg[MAX_REG_TYPE];
 
@@ -35,6 +38,7 @@ class Program
     unsigned max_mem[MAX_REG_TYPE];
 
     void compute_constants();
+    void parse_truth_tables();
 
     public:
 
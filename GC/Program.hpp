@@ -80,9 +80,64 @@ void Program::parse(istream& s)
         pos++;
     }
     CALLGRIND_START_INSTRUMENTATION;
+    parse_truth_tables();
     compute_constants();
 }
 
+inline
+void Program::parse_truth_tables()
+{
+    // truth tables are stored once per tape and referenced by index
+    truth_tables.clear();
+    vector<bool> defined;
+    for (auto& instruction : p)
+        if (instruction.get_opcode() == TRUTHTABLE)
+        {
+            size_t index = instruction.get_start().at(0);
+            if (truth_tables.size() <= index)
+            {
+                truth_tables.resize(index + 1);
+                defined.resize(index + 1);
+            }
+            truth_tables[index] = TruthTable(instruction);
+            defined[index] = true;
+        }
+
+    for (auto& instruction : p)
+    {
+        auto& args = instruction.get_start();
+        int input_size;
+        vector<int> output_sizes, indices;
+        switch (instruction.get_opcode())
+        {
+        case PROJS:
+            input_size = args.at(2);
+            output_sizes = {args.at(1)};
+            indices = {args.at(3)};
+            break;
+        case PROJMS:
+            input_size = args.at(1);
+            output_sizes.assign(args.begin() + 2, args.begin() + 2 + args[0]);
+            indices.assign(args.begin() + 2 + args[0],
+                    args.begin() + 2 + 2 * args[0]);
+            break;
+        default:
+            continue;
+        }
+
+        for (size_t i = 0; i < indices.size(); i++)
+        {
+            size_t index = indices[i];
+            if (index >= truth_tables.size() or not defined[index])
+                throw runtime_error("undefined truth table " + to_string(index));
+            auto& table = truth_tables[index];
+            if (table.input_size != input_size
+                    or table.output_size != output_sizes[i])
+                throw runtime_error("truth table size mismatch");
+        }
+    }
+}
+
 template <class T, class U>
 BreakType Program::execute(Processor<T>& Proc, U& dynamic_memory,
         int PC) const
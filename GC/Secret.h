@@ -14,6 +14,7 @@
 #include "GC/Memory.h"
 #include "GC/Access.h"
 #include "GC/ArgTuples.h"
+#include "GC/Instruction.h"
 
 #include "Math/gf2nlong.h"
 
@@ -146,8 +147,18 @@ public:
     { T::convcbit2s(processor, instruction); }
 
     template<class U>
-    static void projs(Processor<U> &processor, const vector<int>& args)
-    { T::projs(processor, args); }
+    static void projs(Processor<U> &processor, const vector<int>& args,
+            const TruthTables& tables)
+    { T::projs(processor, args, tables); }
+
+    template<class U>
+    static void projms(Processor<U> &processor, const vector<int>& args,
+            const TruthTables& tables)
+    { T::projms(processor, args, tables); }
+
+    template<class U>
+    static void inputbn(Processor<U> &processor, const vector<int>& args)
+    { T::inputbn(processor, args); }
 
     Secret();
     Secret(const Integer& x) { *this = x; }
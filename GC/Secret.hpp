@@ -295,7 +295,7 @@ template <class T>
 template <class U>
 void Secret<T>::revealn(size_t bitlength, size_t i, U& x) {
   get_reg(i).output();
-  uint8_t out = get_reg(i).get_output(bitlength);
+  uint32_t out = get_reg(i).get_output(bitlength);
   x = U(out);
 }
 
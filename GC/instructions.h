@@ -140,7 +140,10 @@
     X(USE_INP, ) \
 
 #define PROJ_INSTRUCTIONS \
-    X(PROJS, T::projs(PROC, EXTRA)) \
+    X(PROJS, T::projs(PROC, EXTRA, truth_tables)) \
+    X(PROJMS, T::projms(PROC, EXTRA, truth_tables)) \
+    X(TRUTHTABLE, ) \
+    X(INPUTBN, T::inputbn(PROC, EXTRA)) \
     X(REVEALN, T::revealn_inst(PROC, EXTRA)) \
     X(XORMN, T::xormn(PROC, EXTRA)) \
     X(XORM, T::xorm(PROC, EXTRA)) \
@@ -453,10 +453,13 @@ void BaseInstruction::parse_operands(istream& s, int pos, int file_pos)
       case ANDS:
       case INPUTB:
       case INPUTBVEC:
+      case INPUTBN:
       case REVEAL:
       case REVEALN:
       case XORMN:
       case PROJS:
+      case PROJMS:
+      case TRUTHTABLE:
         get_vector(get_int(s), start, s);
         break;
       case PRINTREGSIGNED:
@@ -694,6 +697,11 @@ unsigned BaseInstruction::get_max_reg(int reg_type) const
       offset = 3;
       size_offset = -2;
       break;
+  case INPUTBN:
+      skip = 4;
+      offset = 3;
+      size_offset = -1;
+      break;
   case INPUTBVEC:
   {
 	  int res = 0;
@@ -729,7 +737,7 @@ unsigned BaseInstruction::get_max_reg(int reg_type) const
       break;
   case REVEALN:
   {
-    unsigned size = 1; // we never reveal more than a 8 bit wire (projection gates don't support more bits)
+    unsigned size = 1; // n-bit wires are stored in one register per wire
     unsigned m = 0;
     for(unsigned i=1; i<start.size(); ) {
       int n = start[i];
@@ -746,7 +754,7 @@ unsigned BaseInstruction::get_max_reg(int reg_type) const
       break;
   case PROJS:
   {
-      offset = 3 + DIV_CEIL(1 << start[2], 4);
+      offset = 4;
       skip = 3;
       unsigned m = 0;
       for (size_t i = offset; i < start.size(); i += skip)
@@ -756,6 +764,21 @@ unsigned BaseInstruction::get_max_reg(int reg_type) const
       }
       return m;
   }
+  case TRUTHTABLE:
+      return 0;
+  case PROJMS:
+  {
+      skip = start[0] + 2;
+      offset = 2 + 2 * start[0];
+      unsigned m = 0;
+      for (size_t i = offset; i < start.size(); i += skip)
+      {
+          size = DIV_CEIL(start[i], 64);
+          for (int k = 0; k < start[0]; k++)
+              m = max(m, (unsigned)start[i+1+k] + size);
+      }
+      return m;
+  }
   case XORMN:
   {
     offset = 1;
@@ -1,7 +1,5 @@
 from Compiler.GC.types import sbits, cbits
 
-import math
-
 class Cell:
     def __init__(self, cellsize):
         self.cellsize = cellsize
@@ -70,23 +68,10 @@ class ProjCell(Cell):
         return ProjCell(self.cellsize, wire=self.wire.proj(sbox, n))
 
 def compose_bit(bits):
-    n = len(bits)
-    return sum([b.proj([0, 1 << i],n) for i,b in enumerate(bits)])
+    return sbits.bits_to_wire(bits)
 
 def uncompose_bits(w):
-    assert 2**math.ceil(math.log2(w.single_wire_n)) == w.single_wire_n, f'Argument single_wire_n of n-bit wire {w} must be a power of two: {w.single_wire_n}'
-    def _uncompose_bits(ws, n):
-        if n == 1:
-            return ws
-        lower_mask = 2**(n//2)-1
-        table0 = [x & lower_mask for x in range(2**n)]
-        table1 = [(x >> (n//2)) & lower_mask for x in range(2**n)]
-        output = []
-        for w in ws:
-            output.append(w.proj(table0, n//2))
-            output.append(w.proj(table1, n//2))
-        return _uncompose_bits(output, n//2)
-    return _uncompose_bits([w], w.single_wire_n)
+    return w.wire_to_bits()
 
 def into_cells(x, n, variant):
     assert len(x) % n == 0, f'{len(x)} % {n} failed'
@@ -104,7 +89,7 @@ def from_cells(cells, variant):
     if variant == 'bit':
         return [b for cell in cells for b in cell.value]
     else:
-        return [w for cell in cells for w in cell.wire.bit_decompose() for w in uncompose_bits(w)]
+        return [b for cell in cells for w in cell.wire.bit_decompose() for b in uncompose_bits(w)]
 
 def permute(state, permutation):
     assert len(state) == len(permutation)
@@ -14,6 +14,7 @@ enum YaoJobType
 	YAO_AND_JOB,
 	YAO_XOR_JOB,
 	YAO_PROJ_JOB,
+	YAO_PROJM_JOB,
 	YAO_NO_JOB
 };
 
@@ -22,6 +23,7 @@ class YaoAndJob
 {
 	GC::Processor< GC::Secret<T> >* processor;
 	const vector<int>* args;
+	const GC::TruthTables* tables;
 	size_t start, end, n_gates;
 	YaoGate* gate;
 	long counter;
@@ -35,7 +37,7 @@ public:
 	Worker<YaoAndJob> worker;
 
 	YaoAndJob(typename T::Party& party) :
-			processor(0), args(0), start(0), end(0), n_gates(0), gate(0),
+			processor(0), args(0), tables(0), start(0), end(0), n_gates(0), gate(0),
 			counter(0), repeat(0), party(party), type(YAO_NO_JOB)
 	{
 		prng.ReSeed();
@@ -67,12 +69,13 @@ public:
 	}
 
 	void dispatch(GC::Processor<GC::Secret<T> >& processor, const vector<int>& args,
-	size_t start, size_t end, size_t source_size,
-	Key* gate, long counter)
+	const GC::TruthTables& tables, size_t start, size_t end, size_t source_size,
+	Key* gate, long counter, YaoJobType type = YAO_PROJ_JOB)
 	{
-		this->type = YAO_PROJ_JOB;
+		this->type = type;
 		this->processor = &processor;
 		this->args = &args;
+		this->tables = &tables;
 		this->start = start;
 		this->end = end;
 		this->n_gates = source_size;
@@ -95,7 +98,12 @@ public:
 			break;
 		case YAO_PROJ_JOB: {
 			Key *gate = (Key*)this->gate;
-			T::projs_singlethread(processor->S, *args, gate, start, end, prng, party, counter);
+			T::projs_singlethread(processor->S, *args, *tables, gate, start, end, prng, party, counter);
+			break;
+		}
+		case YAO_PROJM_JOB: {
+			Key *gate = (Key*)this->gate;
+			T::projms_singlethread(processor->S, *args, *tables, gate, start, end, prng, party, counter);
 			break;
 		}
 		default:
@@ -181,6 +181,70 @@ void YaoEvalWire::inputbvec(GC::Processor<GC::Secret<YaoEvalWire> >& processor,
     return;
 }
 
+void YaoEvalWire::inputbn(GC::Processor<GC::Secret<YaoEvalWire> >& processor,
+        const vector<int>& args)
+{
+	YaoEvalInput inputter;
+	auto& evaluator = inputter.evaluator;
+	int my_num = evaluator.P->my_num();
+	InputNArgList a(args);
+	bool interactive = a.n_interactive_inputs_from_me(my_num) > 0;
+	int dl = GC::Secret<YaoEvalWire>::default_length;
+
+	for (auto x : a)
+	{
+		assert(x.n_bits <= 32);
+		processor.complexity += x.n_bits * x.n_wires;
+		if (x.from == my_num)
+			for (int i = 0; i < x.n_wires; i++)
+			{
+				long long input = processor.get_input(x.params, interactive);
+				size_t start = inputter.inputs.size();
+				inputter.inputs.resize(start + x.n_bits);
+				for (int j = 0; j < x.n_bits; j++)
+					inputter.inputs.set_bit(start + j, (input >> j) & 1);
+			}
+	}
+
+	if (interactive)
+		cout << "Thank you" << endl;
+
+	inputter.exchange();
+
+	auto& i_bit = inputter.i_bit;
+	for (auto x : a)
+	{
+		for (int k = 0; k < DIV_CEIL(x.n_wires, dl); k++)
+		{
+			auto& dest = processor.S[x.dest + k];
+			int nk = min(dl, x.n_wires - k * dl);
+			dest.resize_regs(nk);
+			for (int j = 0; j < nk; j++)
+			{
+				auto& wire = dest.get_reg(j);
+				if (x.from != my_num)
+				{
+					wire.set(0);
+					continue;
+				}
+				Key label(0LL), correction;
+				for (int l = 0; l < x.n_bits; l++)
+				{
+					inputter.os.unserialize(correction);
+					label ^= input_hash(evaluator.mmo,
+							evaluator.ot_ext.receiverOutputMatrix[i_bit],
+							i_bit);
+					if (inputter.inputs.get_bit(i_bit))
+						label ^= correction;
+					i_bit++;
+				}
+				inputter.os.unserialize(correction);
+				wire.set(label ^ correction);
+			}
+		}
+	}
+}
+
 void YaoEvalWire::op(const YaoEvalWire& left, const YaoEvalWire& right,
 		Function func)
 {
@@ -198,10 +262,14 @@ bool YaoEvalWire::get_output()
 	return res;
 }
 
-uint8_t YaoEvalWire::get_output(std::size_t n) {
+uint32_t YaoEvalWire::get_output(std::size_t n) {
 	YaoEvaluator::s().taint();
-	uint8_t decode = YaoEvaluator::s().output_masks.pop_front();
-	uint8_t res = key_.get_signal(n) ^ decode;
+	uint32_t decode;
+	if (n <= 8)
+		decode = (uint8_t) YaoEvaluator::s().output_masks.pop_front();
+	else
+		YaoEvaluator::s().output_masks.unserialize(decode);
+	uint32_t res = key_.get_signal(n) ^ decode;
 	return res;
 }
 
@@ -225,11 +293,11 @@ void YaoEvalWire::convcbit(Integer& dest, const GC::Clear& source,
 	throw needs_cleaning();
 }
 
-void YaoEvalWire::projs(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args) {
-	projs_multithread(processor, args);
+void YaoEvalWire::projs(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args, const GC::TruthTables& tables) {
+	projs_multithread(processor, args, tables);
 }
 
-void YaoEvalWire::projs_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, const vector<int> &args, Key *gate_ptr, std::size_t start, std::size_t end, PRNG &, YaoEvaluator &evaluator, long counter) {
+void YaoEvalWire::projs_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, const vector<int> &args, const GC::TruthTables&, Key *gate_ptr, std::size_t start, std::size_t end, PRNG &, YaoEvaluator &evaluator, long counter) {
 	std::size_t source_size = args[2];
 	int dl = GC::Secret<YaoEvalWire>::default_length;
 	for(std::size_t i=start; i<end; i += 3) {
@@ -254,33 +322,34 @@ void YaoEvalWire::projs_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, con
 	}
 }
 
-void YaoEvalWire::projs_multithread(GC::Processor<GC::Secret<YaoEvalWire> >& processor, const vector<int>& args)
+void YaoEvalWire::projs_multithread(GC::Processor<GC::Secret<YaoEvalWire> >& processor, const vector<int>& args,
+		const GC::TruthTables& tables)
 {
 	YaoEvaluator& party = YaoEvaluator::s();
 	int source_size = args[2];
 	int threshold = 1024;
 	std::size_t proj_size = YaoProjGate::sizeof_table(source_size);
-	int tt_len = DIV_CEIL(1 << source_size, 4);
-	int total = count_proj_args(args, 3+tt_len);
+	size_t tt_end = projs_start(args);
+	int total = count_proj_args(args, tt_end);
 	if (total < threshold)
 	{
 		// run in single thread
 		Key *gate_ptr = (Key*) party.gates.consume(total * proj_size);
 		SeededPRNG prng;
-		projs_singlethread(processor.S, args, gate_ptr, 3+tt_len, args.size(), prng, party, party.counter);
+		projs_singlethread(processor.S, args, tables, gate_ptr, tt_end, args.size(), prng, party, party.get_gate_id());
 		party.counter += total;
 		return;
 	}
 
 	processor.complexity += total;
 	int i_thread = 0;
-	size_t start = 3+tt_len;
-	for (auto& x : party.get_splits(args, threshold, total, 3+tt_len, 3))
+	size_t start = tt_end;
+	for (auto& x : party.get_splits(args, threshold, total, tt_end, 3))
 	{
 		auto n_gates = x[0];
 		auto end = x[1];
 		Key* gate_ptr = (Key*) party.gates.consume(n_gates * proj_size);
-		party.jobs[i_thread++]->dispatch(processor, args, start,
+		party.jobs[i_thread++]->dispatch(processor, args, tables, start,
 					end, source_size, gate_ptr, party.get_gate_id());
 		party.counter += n_gates;
 		start = end;
@@ -288,6 +357,66 @@ void YaoEvalWire::projs_multithread(GC::Processor<GC::Secret<YaoEvalWire> >& pro
 	party.wait(i_thread);
 }
 
+void YaoEvalWire::projms(GC::Processor<GC::Secret<YaoEvalWire> >& processor, const vector<int>& args,
+		const GC::TruthTables& tables)
+{
+	YaoEvaluator& party = YaoEvaluator::s();
+	int n_outputs = args[0];
+	int source_size = args[1];
+	int threshold = 1024;
+	std::size_t proj_size = YaoMultiProjGate::sizeof_table(source_size, n_outputs);
+	size_t start = projms_start(args);
+	int total = count_proj_args(args, start, n_outputs + 2);
+	if (total * n_outputs < threshold)
+	{
+		// run in single thread
+		Key *gate_ptr = (Key*) party.gates.consume(total * proj_size);
+		SeededPRNG prng;
+		projms_singlethread(processor.S, args, tables, gate_ptr, start, args.size(), prng, party, party.get_gate_id());
+		party.counter += total * n_outputs;
+		return;
+	}
+
+	processor.complexity += total * n_outputs;
+	int i_thread = 0;
+	for (auto& x : party.get_splits(args, threshold / n_outputs, total, start, n_outputs + 2))
+	{
+		auto n_gates = x[0];
+		auto end = x[1];
+		Key* gate_ptr = (Key*) party.gates.consume(n_gates * proj_size);
+		party.jobs[i_thread++]->dispatch(processor, args, tables, start,
+					end, source_size, gate_ptr, party.get_gate_id(), YAO_PROJM_JOB);
+		party.counter += n_gates * n_outputs;
+		start = end;
+	}
+	party.wait(i_thread);
+}
+
+void YaoEvalWire::projms_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, const vector<int> &args, const GC::TruthTables&, Key *gate_ptr, std::size_t start, std::size_t end, PRNG &, YaoEvaluator &evaluator, long counter) {
+	std::size_t n_outputs = args[0];
+	std::size_t source_size = args[1];
+	std::vector<YaoEvalWire*> dest_wires(n_outputs);
+	int dl = GC::Secret<YaoEvalWire>::default_length;
+	for(std::size_t i=start; i<end; i += n_outputs + 2) {
+		int n = args[i];
+		int n_units = DIV_CEIL(n, dl);
+		for(int k=0; k < n_units; k++) {
+			auto &src = S[args[i+n_outputs+1]+k];
+			int nk = min(dl, n - k*dl);
+			for(std::size_t l=0; l < n_outputs; l++)
+				S[args[i+1+l]+k].resize_regs(nk);
+			for(int j=0; j<nk; j++) {
+				for(std::size_t l=0; l < n_outputs; l++)
+					dest_wires[l] = &S[args[i+1+l]+k].get_reg(j);
+				YaoMultiProjGate gate(source_size, n_outputs, gate_ptr);
+				gate.eval(evaluator.mmo, dest_wires.data(), src.get_reg(j), counter);
+				gate_ptr += gate.garbled_table_size();
+				counter += n_outputs;
+			}
+		}
+	}
+}
+
 void YaoEvalWire::XOR(const YaoEvalWire &x, const YaoEvalWire &y) {
 	set(x.key() ^ y.key());
 }
@@ -58,13 +58,16 @@ public:
 			const vector<int>& args);
 	static void inputbvec(Processor& processor, ProcessorBase& input_processor,
 			const vector<int>& args);
+	static void inputbn(Processor& processor, const vector<int>& args);
 
 	static void convcbit(Integer& dest, const GC::Clear& source,
 			GC::Processor<GC::Secret<YaoEvalWire>>&);
 
-	static void projs(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args);
-	static void projs_multithread(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args);
-	static void projs_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, const vector<int> &args, Key *gate, std::size_t start, std::size_t end, PRNG &prng, YaoEvaluator &evaluator, long counter);
+	static void projs(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args, const GC::TruthTables& tables);
+	static void projs_multithread(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args, const GC::TruthTables& tables);
+	static void projs_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, const vector<int> &args, const GC::TruthTables& tables, Key *gate, std::size_t start, std::size_t end, PRNG &prng, YaoEvaluator &evaluator, long counter);
+	static void projms(GC::Processor<GC::Secret<YaoEvalWire>> &processor, const vector<int>& args, const GC::TruthTables& tables);
+	static void projms_singlethread(GC::Memory<GC::Secret<YaoEvalWire>> &S, const vector<int>& args, const GC::TruthTables& tables, Key *gate, std::size_t start, std::size_t end, PRNG &prng, YaoEvaluator &evaluator, long counter);
 
     static void convcbit2s(GC::Processor<whole_type>& processor,
 		const BaseInstruction& instruction);
@@ -87,7 +90,7 @@ public:
 	void public_input(bool value);
 	void op(const YaoEvalWire& left, const YaoEvalWire& right, Function func);
 	bool get_output();
-	uint8_t get_output(std::size_t n);
+	uint32_t get_output(std::size_t n);
 
 	template<class T>
 	void my_input(T&, bool value, int n_bits);
@@ -20,7 +20,7 @@ YaoGarbleMaster::YaoGarbleMaster(bool continuous, OnlineOptions& opts, int thres
 {
     PRNG prng;
     prng.ReSeed();
-    gen_delta(prng, 8);
+    gen_delta(prng, 32);
 }
 
 GC::Thread<GC::Secret<YaoGarbleWire>>* YaoGarbleMaster::new_thread(int i)
@@ -33,7 +33,7 @@ Key YaoGarbleMaster::get_delta() {
 }
 
 const std::vector<Key>& YaoGarbleMaster::get_deltas(std::size_t dim) {
-  assert(dim <= 8);
+  assert(dim <= delta.size());
   return delta[dim-1];
 }
 
@@ -44,7 +44,7 @@ void YaoGarbleMaster::gen_delta(PRNG & prng, std::size_t dim) {
     std::vector<Key> delta_dim(d);
     for(std::size_t i=0; i < d; i++) {
       Key r = prng.get_doubleword();
-      r.set_signal(d, 0x1 << i);
+      r.set_signal(d, 1u << i);
       delta_dim[i] = r;
     }
     delta[d-1] = delta_dim;
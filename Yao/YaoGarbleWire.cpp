@@ -174,6 +174,49 @@ void YaoGarbleWire::inputbvec(GC::Processor<GC::Secret<YaoGarbleWire>>& processo
     processor.inputbvec(input, input_processor, args, garbler.P->my_num());
 }
 
+void YaoGarbleWire::inputbn(GC::Processor<GC::Secret<YaoGarbleWire>>& processor,
+        const vector<int>& args)
+{
+	auto& garbler = YaoGarbler::s();
+	int my_num = garbler.P->my_num();
+	InputNArgList a(args);
+	bool interactive = a.n_interactive_inputs_from_me(my_num) > 0;
+	int dl = GC::Secret<YaoGarbleWire>::default_length;
+	garbler.receiver_input_keys.push_back({});
+	auto& keys = garbler.receiver_input_keys.back();
+
+	for (auto x : a)
+	{
+		assert(x.n_bits <= 32);
+		auto& deltas = garbler.get_deltas(x.n_bits);
+		uint32_t mask = (1ull << x.n_bits) - 1;
+		processor.complexity += x.n_bits * x.n_wires;
+		for (int k = 0; k < DIV_CEIL(x.n_wires, dl); k++)
+		{
+			auto& dest = processor.S[x.dest + k];
+			int nk = min(dl, x.n_wires - k * dl);
+			dest.resize_regs(nk);
+			for (int j = 0; j < nk; j++)
+			{
+				auto& wire = dest.get_reg(j);
+				if (x.from == my_num)
+					// the evaluator uses the zero label as for public input
+					wire.set_full_key(Key::prod(
+							processor.get_input(x.params, interactive) & mask,
+							deltas));
+				else
+				{
+					wire.randomize(garbler.prng);
+					keys.push_back({wire.full_key(), x.n_bits});
+				}
+			}
+		}
+	}
+
+	if (interactive)
+		cout << "Thank you" << endl;
+}
+
 inline void YaoGarbler::store_gate(const YaoGate& gate)
 {
 	gates.serialize(gate);
@@ -196,9 +239,12 @@ char YaoGarbleWire::get_output()
 	return 0;
 }
 
-uint8_t YaoGarbleWire::get_output(std::size_t n) {
+uint32_t YaoGarbleWire::get_output(std::size_t n) {
 	YaoGarbler::s().taint();
-	YaoGarbler::s().output_masks.push_back(key_.get_signal(n));
+	if (n <= 8)
+		YaoGarbler::s().output_masks.push_back(key_.get_signal(n));
+	else
+		YaoGarbler::s().output_masks.serialize(key_.get_signal(n));
 	return 0;
 }
 
@@ -211,12 +257,13 @@ void YaoGarbleWire::convcbit(Integer& dest, const GC::Clear& source,
 	dest = garbler.P->receive_long(1);
 }
 
-void YaoGarbleWire::projs(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args) {
-	projs_multithread(processor, args);
+void YaoGarbleWire::projs(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args, const GC::TruthTables& tables) {
+	projs_multithread(processor, args, tables);
 }
 
-void YaoGarbleWire::projs_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S, const vector<int>& args, Key *gate_ptr, std::size_t start, std::size_t end, PRNG &prng, YaoGarbler &garbler, long counter) {
+void YaoGarbleWire::projs_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S, const vector<int>& args, const GC::TruthTables& tables, Key *gate_ptr, std::size_t start, std::size_t end, PRNG &prng, YaoGarbler &garbler, long counter) {
 	std::size_t source_size = args[2];
+	auto& table = tables[args[3]];
 	auto& in_deltas = garbler.get_deltas(source_size);
 	auto& out_deltas = garbler.get_deltas(args[1]);
 	int dl = GC::Secret<YaoGarbleWire>::default_length;
@@ -233,7 +280,7 @@ void YaoGarbleWire::projs_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S,
 				YaoGarbleWire &dest_wire = dest.get_reg(j);
 				const YaoGarbleWire &src_wire = src.get_reg(j);
 				YaoProjGate gate(source_size, gate_ptr);
-				gate.garble(prng, garbler.mmo, dest_wire, src_wire, args, 3, in_deltas, out_deltas, counter);
+				gate.garble(prng, garbler.mmo, dest_wire, src_wire, table, in_deltas, out_deltas, counter);
 				gate_ptr += gate.garbled_table_size();
 				counter++;
 			}
@@ -242,19 +289,19 @@ void YaoGarbleWire::projs_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S,
 	}
 }
 
-void YaoGarbleWire::projs_multithread(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args) {
+void YaoGarbleWire::projs_multithread(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args, const GC::TruthTables& tables) {
 	YaoGarbler& party = YaoGarbler::s();
 	int source_size = args[2];
 	SendBuffer& gates = party.gates;
 	std::size_t proj_size = YaoProjGate::sizeof_table(source_size);
-	int tt_len = DIV_CEIL(1 << source_size, 4);
-	int total = count_proj_args(args, 3+tt_len);
+	size_t tt_end = projs_start(args);
+	int total = count_proj_args(args, tt_end);
 	gates.allocate(total * proj_size);
 	if (total < (party.get_threshold() >> (std::max(0, (int)(source_size) - 2))))
 	{
 		// run in single thread
 		Key *gate_ptr = (Key*) gates.end();
-		projs_singlethread(processor.S, args, gate_ptr, 3+tt_len, args.size(), party.prng, party, party.get_gate_id());
+		projs_singlethread(processor.S, args, tables, gate_ptr, tt_end, args.size(), party.prng, party, party.get_gate_id());
 		gates.skip(total * proj_size);
 		party.counter += total;
 		return;
@@ -262,15 +309,15 @@ void YaoGarbleWire::projs_multithread(GC::Processor<GC::Secret<YaoGarbleWire>> &
 
 	processor.complexity += total;
 	int i_thread = 0;
-	size_t start = 3+tt_len;
-	for (auto& x : party.get_splits(args, party.get_threshold(), total, 3+tt_len, 3))
+	size_t start = tt_end;
+	for (auto& x : party.get_splits(args, party.get_threshold(), total, tt_end, 3))
 	{
 		size_t n_gates = x[0];
 		size_t end = x[1];
 		Key *gate = (Key*)gates.end();
 		gates.skip(n_gates * proj_size);
 		party.timers["Dispatch"].start();
-		party.jobs[i_thread++]->dispatch(processor, args, start, end, source_size, gate, party.get_gate_id());
+		party.jobs[i_thread++]->dispatch(processor, args, tables, start, end, source_size, gate, party.get_gate_id());
 		party.timers["Dispatch"].stop();
 		party.counter += n_gates;
 		start = end;
@@ -278,6 +325,74 @@ void YaoGarbleWire::projs_multithread(GC::Processor<GC::Secret<YaoGarbleWire>> &
 	party.wait(i_thread);
 }
 
+void YaoGarbleWire::projms(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args, const GC::TruthTables& tables) {
+	YaoGarbler& party = YaoGarbler::s();
+	int n_outputs = args[0];
+	int source_size = args[1];
+	SendBuffer& gates = party.gates;
+	std::size_t proj_size = YaoMultiProjGate::sizeof_table(source_size, n_outputs);
+	size_t start = projms_start(args);
+	int total = count_proj_args(args, start, n_outputs + 2);
+	gates.allocate(total * proj_size);
+	if (total * n_outputs < (party.get_threshold() >> (std::max(0, source_size - 2))))
+	{
+		// run in single thread
+		Key *gate_ptr = (Key*) gates.end();
+		projms_singlethread(processor.S, args, tables, gate_ptr, start, args.size(), party.prng, party, party.get_gate_id());
+		gates.skip(total * proj_size);
+		party.counter += total * n_outputs;
+		return;
+	}
+
+	processor.complexity += total * n_outputs;
+	int i_thread = 0;
+	for (auto& x : party.get_splits(args, party.get_threshold() / n_outputs, total, start, n_outputs + 2))
+	{
+		size_t n_gates = x[0];
+		size_t end = x[1];
+		Key *gate = (Key*)gates.end();
+		gates.skip(n_gates * proj_size);
+		party.timers["Dispatch"].start();
+		party.jobs[i_thread++]->dispatch(processor, args, tables, start, end, source_size, gate, party.get_gate_id(), YAO_PROJM_JOB);
+		party.timers["Dispatch"].stop();
+		party.counter += n_gates * n_outputs;
+		start = end;
+	}
+	party.wait(i_thread);
+}
+
+void YaoGarbleWire::projms_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S, const vector<int>& args, const GC::TruthTables& tables, Key *gate_ptr, std::size_t start, std::size_t end, PRNG &prng, YaoGarbler &garbler, long counter) {
+	std::size_t n_outputs = args[0];
+	std::size_t source_size = args[1];
+	auto& in_deltas = garbler.get_deltas(source_size);
+	std::vector<const std::vector<Key>*> out_deltas;
+	std::vector<const GC::TruthTable*> output_tables;
+	for(std::size_t l=0; l < n_outputs; l++) {
+		out_deltas.push_back(&garbler.get_deltas(args[2+l]));
+		output_tables.push_back(&tables[args[2+n_outputs+l]]);
+	}
+	std::vector<YaoGarbleWire*> dest_wires(n_outputs);
+	int dl = GC::Secret<YaoGarbleWire>::default_length;
+	for(std::size_t i=start; i < end; i += n_outputs + 2) {
+		int n = args[i];
+		int n_units = DIV_CEIL(n, dl);
+		for(int k=0; k < n_units; k++) {
+			auto &src = S[args[i+n_outputs+1]+k];
+			int nk = min(dl, n - k*dl);
+			for(std::size_t l=0; l < n_outputs; l++)
+				S[args[i+1+l]+k].resize_regs(nk);
+			for(int j=0; j<nk; j++) {
+				for(std::size_t l=0; l < n_outputs; l++)
+					dest_wires[l] = &S[args[i+1+l]+k].get_reg(j);
+				YaoMultiProjGate gate(source_size, n_outputs, gate_ptr);
+				gate.garble(prng, garbler.mmo, dest_wires.data(), src.get_reg(j), output_tables, in_deltas, out_deltas, counter);
+				gate_ptr += gate.garbled_table_size();
+				counter += n_outputs;
+			}
+		}
+	}
+}
+
 void YaoGarbleWire::XOR(const YaoGarbleWire &x, const YaoGarbleWire &y) {
 	set_full_key(x.full_key() ^ y.full_key());
 }
@@ -287,7 +402,7 @@ void YaoGarbleWire::XOR(const YaoGarbleWire &x, bool y) {
 }
 
 void YaoGarbleWire::XOR(int n, const YaoGarbleWire &x, const GC::Clear &y) {
-	assert(y.get() <= 0xff);
+	assert(y.get() <= 0xffffffff);
 	set_full_key(x.full_key() ^ Key::prod(y.get(), YaoGarbler::s().get_deltas(n)));
 }
 
@@ -59,13 +59,16 @@ public:
 			const vector<int>& args);
 	static void inputbvec(Processor& processor, ProcessorBase& input_processor,
 			const vector<int>& args);
+	static void inputbn(Processor& processor, const vector<int>& args);
 
 	static void convcbit(Integer& dest, const GC::Clear& source,
 			GC::Processor<GC::Secret<YaoGarbleWire>>&);
 
-	static void projs(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args);
-	static void projs_multithread(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args);
-	static void projs_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S, const vector<int>& args, Key *gate, std::size_t start, std::size_t end, PRNG &prng, YaoGarbler &garbler, long counter);
+	static void projs(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args, const GC::TruthTables& tables);
+	static void projs_multithread(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args, const GC::TruthTables& tables);
+	static void projs_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S, const vector<int>& args, const GC::TruthTables& tables, Key *gate, std::size_t start, std::size_t end, PRNG &prng, YaoGarbler &garbler, long counter);
+	static void projms(GC::Processor<GC::Secret<YaoGarbleWire>> &processor, const vector<int>& args, const GC::TruthTables& tables);
+	static void projms_singlethread(GC::Memory<GC::Secret<YaoGarbleWire>> &S, const vector<int>& args, const GC::TruthTables& tables, Key *gate, std::size_t start, std::size_t end, PRNG &prng, YaoGarbler &garbler, long counter);
 
 	static void convcbit2s(GC::Processor<whole_type>& processor,
 		const BaseInstruction& instruction);
@@ -99,7 +102,7 @@ public:
 	void public_input(bool value);
 	void op(const YaoGarbleWire& left, const YaoGarbleWire& right, Function func);
 	char get_output();
-	uint8_t get_output(std::size_t n);
+	uint32_t get_output(std::size_t n);
 
 	template<class T>
 	void my_input(T&, bool value, int n_bits)
@@ -116,7 +119,7 @@ public:
 		{
 			set(inputter.garbler.prng.get_doubleword(), 0);
 			assert(mask() == 0);
-			inputter.garbler.receiver_input_keys.back().push_back(full_key());
+			inputter.garbler.receiver_input_keys.back().push_back({full_key(), 1});
 		}
 	}
 	void XOR(const YaoGarbleWire &x, const YaoGarbleWire &y);
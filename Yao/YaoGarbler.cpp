@@ -99,13 +99,39 @@ void YaoGarbler::process_receiver_inputs()
 {
 	while (not receiver_input_keys.empty())
 	{
-		vector<Key>& inputs = receiver_input_keys.front();
+		auto& inputs = receiver_input_keys.front();
+		size_t n_ots = 0;
+		for (auto& input : inputs)
+			n_ots += input.second;
 		BitVector _;
-		ot_ext.extend_correlated(inputs.size(), _);
+		ot_ext.extend_correlated(n_ots, _);
 
 		octetStream os;
-		for (size_t i = 0; i < inputs.size(); i++)
-			os.serialize(inputs[i] ^ ot_ext.senderOutputMatrices[0][i]);
+		size_t i = 0;
+		for (auto& input : inputs)
+		{
+			if (input.second == 1)
+			{
+				os.serialize(input.first ^ ot_ext.senderOutputMatrices[0][i++]);
+				continue;
+			}
+
+			// turn the correlation with delta into correlations with
+			// the deltas of the n-bit wire, the label for zero being
+			// the sum of the hashes of the OT outputs for zero
+			auto& deltas = get_deltas(input.second);
+			Key offset = input.first;
+			for (int j = 0; j < input.second; j++)
+			{
+				Key q = ot_ext.senderOutputMatrices[0][i];
+				Key h0 = YaoWire::input_hash(mmo, q, i);
+				Key h1 = YaoWire::input_hash(mmo, q ^ get_delta(), i);
+				os.serialize(h0 ^ h1 ^ deltas[j]);
+				offset ^= h0;
+				i++;
+			}
+			os.serialize(offset);
+		}
 		player.send(os);
 
 		receiver_input_keys.pop_front();
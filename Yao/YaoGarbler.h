@@ -50,7 +50,8 @@ public:
 	RealTwoPartyPlayer player;
 	OTExtensionWithMatrix ot_ext;
 
-	deque<vector<Key>> receiver_input_keys;
+	// keys of evaluator inputs with the bit length of the wire
+	deque<vector<pair<Key, int>>> receiver_input_keys;
 
 	static YaoGarbler& s();
 
@@ -1,13 +1,14 @@
 #include "YaoProjGate.h"
+#include "GC/Instruction.h"
 
-void YaoProjGate::garble(PRNG &prng, MMO &mmo, YaoGarbleWire &out, const YaoGarbleWire &in, const std::vector<int> &args, std::size_t offset, const std::vector<Key> &delta_in, const std::vector<Key> &delta_out, long counter) {
+void YaoProjGate::garble(PRNG &prng, MMO &mmo, YaoGarbleWire &out, const YaoGarbleWire &in, const GC::TruthTable &table, const std::vector<Key> &delta_in, const std::vector<Key> &delta_out, long counter) {
   assert(delta_in.size() == n);
   #ifdef YAO_PROJ_NO_GRR
     // no garbled row reduction
     out.randomize(prng);
     Key wout = out.full_key();
     for(std::size_t x=0; x < (1ULL << n); x++) {
-      uint8_t y = args[offset + x/4] >> (8*(x % 4));
+      auto y = table[x];
       auto win = Key::prod(x, delta_in);
       win ^= in.full_key();
       auto row = hash(win, mmo, counter);
@@ -23,7 +24,7 @@ void YaoProjGate::garble(PRNG &prng, MMO &mmo, YaoGarbleWire &out, const YaoGarb
 
     // the first garbled table entry is fixed to a constant
     std::size_t x0 = in.full_key().get_signal(n);
-    uint8_t y = args[offset + x0/4] >> (8*(x0 % 4));
+    auto y = table[x0];
     auto win = Key::prod(x0, delta_in);
     win ^= in.full_key();
     auto wout = hash(win, mmo, counter);
@@ -33,7 +34,7 @@ void YaoProjGate::garble(PRNG &prng, MMO &mmo, YaoGarbleWire &out, const YaoGarb
     for(std::size_t x=0; x < (1ULL << n); x++) {
       if (x == x0)
         continue;
-      y = args[offset + x/4] >> (8*(x % 4));
+      y = table[x];
       win = Key::prod(x, delta_in);
       win ^= in.full_key();
       auto row = hash(win, mmo, counter);
@@ -59,3 +60,72 @@ void YaoProjGate::eval(MMO &mmo, YaoEvalWire &out, const YaoEvalWire &in, long c
   #endif
 
 }
+
+void YaoMultiProjGate::garble(PRNG &prng, MMO &mmo, YaoGarbleWire* const* out, const YaoGarbleWire &in, const std::vector<const GC::TruthTable*> &tables, const std::vector<Key> &delta_in, const std::vector<const std::vector<Key>*> &delta_out, long counter) {
+  assert(delta_in.size() == n);
+  assert(tables.size() == n_outputs);
+  std::size_t table_size = YaoProjGate::sizeof_table(n) / sizeof(Key);
+  #ifdef YAO_PROJ_NO_GRR
+    // no garbled row reduction
+    for(std::size_t k=0; k < n_outputs; k++)
+      out[k]->randomize(prng);
+    for(std::size_t x=0; x < (1ULL << n); x++) {
+      auto win = Key::prod(x, delta_in);
+      win ^= in.full_key();
+      auto i = win.get_signal(n);
+      for(std::size_t k=0; k < n_outputs; k++) {
+        auto y = (*tables[k])[x];
+        auto row = hash(win, mmo, counter + k);
+        row ^= Key::prod(y, *delta_out[k]);
+        row ^= out[k]->full_key();
+        garbled_table[k * table_size + i] = row;
+      }
+    }
+  #else
+    (void)prng;
+
+    // the first garbled table entry of every output is fixed to a constant
+    std::size_t x0 = in.full_key().get_signal(n);
+    auto win = Key::prod(x0, delta_in);
+    win ^= in.full_key();
+    for(std::size_t k=0; k < n_outputs; k++) {
+      auto y = (*tables[k])[x0];
+      auto wout = hash(win, mmo, counter + k);
+      wout ^= Key::prod(y, *delta_out[k]);
+      out[k]->set_full_key(wout);
+    }
+
+    for(std::size_t x=0; x < (1ULL << n); x++) {
+      if (x == x0)
+        continue;
+      win = Key::prod(x, delta_in);
+      win ^= in.full_key();
+      auto i = win.get_signal(n) - 1;
+      for(std::size_t k=0; k < n_outputs; k++) {
+        auto y = (*tables[k])[x];
+        auto row = hash(win, mmo, counter + k);
+        row ^= Key::prod(y, *delta_out[k]);
+        row ^= out[k]->full_key();
+        garbled_table[k * table_size + i] = row;
+      }
+    }
+  #endif
+}
+
+void YaoMultiProjGate::eval(MMO &mmo, YaoEvalWire* const* out, const YaoEvalWire &in, long counter) const {
+  auto &win = in.key();
+  auto i = win.get_signal(n);
+  std::size_t table_size = YaoProjGate::sizeof_table(n) / sizeof(Key);
+  for(std::size_t k=0; k < n_outputs; k++) {
+    auto h = hash(win, mmo, counter + k);
+  #ifdef YAO_PROJ_NO_GRR
+    out[k]->set(garbled_table[k * table_size + i] ^ h);
+  #else
+    if(i == 0) {
+      out[k]->set(h);
+    }else{
+      out[k]->set(garbled_table[k * table_size + i - 1] ^ h);
+    }
+  #endif
+  }
+}
@@ -17,7 +17,7 @@ public:
 
 	YaoProjGate(std::size_t n, Key *garbled_table): n(n), garbled_table(garbled_table) {}
 
-	void garble(PRNG &prng, MMO &mmo, YaoGarbleWire &out, const YaoGarbleWire &in, const std::vector<int> &args, std::size_t offset, const std::vector<Key> &delta_in,  const std::vector<Key> &delta_out, long counter);
+	void garble(PRNG &prng, MMO &mmo, YaoGarbleWire &out, const YaoGarbleWire &in, const GC::TruthTable &table, const std::vector<Key> &delta_in,  const std::vector<Key> &delta_out, long counter);
 
 	void eval(MMO &mmo, YaoEvalWire &out, const YaoEvalWire &in, long counter) const;
 
@@ -31,7 +31,8 @@ public:
 	}
 
 
-	static inline Key hash(const Key &x, MMO &mmo, long) { return mmo.hash(x); }
+	// the gate counter makes the row hashes of every gate distinct
+	static inline Key hash(const Key &x, MMO &mmo, long counter) { return mmo.hash(x ^ Key(counter, 0)); }
 
 	// returns the number of bytes of the garbled table
 	static inline std::size_t sizeof_table(std::size_t n) {
@@ -43,4 +44,34 @@ public:
 	 }
 };
 
+// several projections of the same input wire
+// every output gets its own garbled table, using the gate counter plus
+// the output index as tweak of the row hash
+class YaoMultiProjGate
+{
+	std::size_t n;
+	std::size_t n_outputs;
+	Key* garbled_table;
+
+public:
+
+	YaoMultiProjGate(std::size_t n, std::size_t n_outputs, Key *garbled_table): n(n), n_outputs(n_outputs), garbled_table(garbled_table) {}
+
+	void garble(PRNG &prng, MMO &mmo, YaoGarbleWire* const* out, const YaoGarbleWire &in, const std::vector<const GC::TruthTable*> &tables, const std::vector<Key> &delta_in, const std::vector<const std::vector<Key>*> &delta_out, long counter);
+
+	void eval(MMO &mmo, YaoEvalWire* const* out, const YaoEvalWire &in, long counter) const;
+
+	// returns the number of entries in the garbled table
+	inline std::size_t garbled_table_size() {
+		return n_outputs * YaoProjGate::sizeof_table(n) / sizeof(Key);
+	}
+
+	static inline Key hash(const Key &x, MMO &mmo, long counter) { return YaoProjGate::hash(x, mmo, counter); }
+
+	// returns the number of bytes of the garbled table
+	static inline std::size_t sizeof_table(std::size_t n, std::size_t n_outputs) {
+		return n_outputs * YaoProjGate::sizeof_table(n);
+	}
+};
+
 #endif /* YAO_YAOPROJGATE_H_ */
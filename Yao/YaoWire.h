@@ -8,6 +8,8 @@
 
 #include "BMR/Key.h"
 #include "BMR/Register.h"
+#include "GC/Instruction.h"
+#include "Tools/MMO.h"
 
 class YaoWire : public Phase
 {
@@ -33,13 +35,29 @@ public:
 	template<class T>
 	void other_input(T&, int) {}
 
-	static int count_proj_args(const std::vector<int> &args, size_t begin) {
+	// hash of the i-th correlated OT output for n-bit wire inputs
+	static Key input_hash(MMO& mmo, const Key& x, size_t i)
+	{
+		return mmo.hash(x ^ Key(i, 1));
+	}
+
+	static int count_proj_args(const std::vector<int> &args, size_t begin, size_t step = 3) {
 		int n = 0;
-		for(auto it = std::begin(args)+begin; it != std::end(args); it += 3) {
+		for(auto it = std::begin(args)+begin; it != std::end(args); it += step) {
 			n += *it;
 		}
 		return n;
 	}
+
+	// position of the first tuple of projs arguments
+	static size_t projs_start(const std::vector<int> &) {
+		return 4;
+	}
+
+	// position of the first tuple of projms arguments
+	static size_t projms_start(const std::vector<int> &args) {
+		return 2 + 2 * args[0];
+	}
 };
 
 #endif /* YAO_YAOWIRE_H_ */
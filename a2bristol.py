@@ -1,228 +1,471 @@
 import argparse
+import itertools
 import re
+import sys
+from array import array
 
-class Instruction:
-    def __init__(self, name, in_wires, out_wires):
-        self.name = name
-        self.in_wires = in_wires
-        self.out_wires = out_wires
+# gate types as stored in Gates.op
+XOR, AND, NOT, PROJ, XORC = range(5)
+gate_names = ('XOR', 'AND', 'NOT', 'PROJ', 'XORC')
+
+class Gates:
+    """ Gates with one or two input wires and one output wire, stored
+    as one typed array per field (about 17 bytes per gate). NOT, PROJ
+    and XORC gates have in1 = -1. Arrays indexed by wire id have a
+    spare last entry so that they can also be indexed with in1. The
+    parameter is the truth table of PROJ gates and the public operand
+    of XORC gates. """
+    def __init__(self):
+        self.op = array('b')
+        self.in0 = array('i')
+        self.in1 = array('i')
+        self.out = array('i')
+        self.param = array('I')
     
-    @classmethod
-    def XOR(cls, res, op1, op2):
-        assert isinstance(res, int)
-        assert isinstance(op1, int)
-        assert isinstance(op2, int)
-        return cls(name='XOR', in_wires=[op1, op2], out_wires=[res])
-    @classmethod
-    def AND(cls, res, op1, op2):
-        assert isinstance(res, int)
-        assert isinstance(op1, int)
-        assert isinstance(op2, int)
-        return cls(name='AND', in_wires=[op1, op2], out_wires=[res])
-    @classmethod
-    def NOT(cls, res, op1):
-        assert isinstance(res, int)
-        assert isinstance(op1, int)
-        return cls(name='NOT', in_wires=[op1], out_wires=[res])
-        
-    def __repr__(self):
-        return str(self)
+    def append(self, op, in0, in1, out, param=0):
+        self.op.append(op)
+        self.in0.append(in0)
+        self.in1.append(in1)
+        self.out.append(out)
+        self.param.append(param)
     
-    def __str__(self):
-        return f'{self.name} in={self.in_wires} out={self.out_wires}'
+    def extend(self, op, in0, in1, out, param=0):
+        """ Add len(out) gates of the same type """
+        self.op.extend([op] * len(out))
+        self.in0.extend(in0)
+        self.in1.extend(in1)
+        self.out.extend(out)
+        self.param.extend([param] * len(out))
     
-    def to_bristol_format(self, not_is_inv=False):
-        name = self.name
-        if not_is_inv and name == 'NOT':
-            name = 'INV'
-        in_wires = ' '.join(map(str, self.in_wires))
-        out_wires = ' '.join(map(str, self.out_wires))
-        return f'{len(self.in_wires)} {len(self.out_wires)} {in_wires} {out_wires} {name}'
+    def select(self, indices):
+        """ New gate list with the gates at the given positions """
+        res = Gates()
+        for name in ('op', 'in0', 'in1', 'out', 'param'):
+            column = getattr(self, name)
+            setattr(res, name, array(column.typecode, map(column.__getitem__, indices)))
+        return res
+    
+    def __len__(self):
+        return len(self.op)
+    
+    def __iter__(self):
+        return zip(self.op, self.in0, self.in1, self.out)
+    
+    def to_string(self, i):
+        op = self.op[i]
+        in_wires = [self.in0[i], self.in1[i]] if op in (XOR, AND) else [self.in0[i]]
+        res = f'{gate_names[op]} in={in_wires} out={[self.out[i]]}'
+        if op in (PROJ, XORC):
+            res += f' param={self.param[i]}'
+        return res
 
 class Circuit:
-    def __init__(self, gates, inputs, outputs):
+    def __init__(self, gates, inputs, outputs, constants=None, widths=None,
+                 tables=None):
         self.gates = gates
         self.inputs = inputs
         self.outputs = outputs
+        # wire id -> public bit, only used by optimize()
+        self.constants = constants or dict()
+        # bit length of the wires of every input and output
+        self.widths = widths or ([1] * len(inputs), [1] * len(outputs))
+        # truth table index -> (input bits, output bits, encoded rows)
+        self.tables = tables or dict()
     
-    def _count_unique_wires(self):
-        wires = set()
-        for g in self.gates:
-            wires |= set(g.in_wires)
-            wires |= set(g.out_wires)
-        return len(wires)
-        
-    def map_wire_ids(self, map_f):
-        """ Replaces each wire wi in the circuit with map_f(wi) """
-        for g in self.gates:
-            g.in_wires = [map_f(wi) for wi in g.in_wires]
-            g.out_wires = [map_f(wi) for wi in g.out_wires]
+    def is_extended(self):
+        """ Whether the circuit needs the Bristol Fashion extension
+        with n-bit wires """
+        return any(op in (PROJ, XORC) for op in set(self.gates.op)) or \
+            any(width > 1 for widths in self.widths for width in widths)
     
-    def rename_first_wire(self, wi, wo, start=0):
-        """ Rename the first wire with id wi to wo """
-        cnt = 0
-        for g in self.gates[start:]:
-            if wi in g.in_wires:
-                # replace wi with wo in the input list
-                g.in_wires = [wo if xi == wi else xi for xi in g.in_wires]
-                cnt += 1
-            if wi in g.out_wires:
-                # stop since from now on, wi is a different value
-                return cnt
-        return cnt
+    def wire_widths(self):
+        """ Wire id -> bit length for all wires with more than one bit """
+        widths = dict()
+        for ids, width in zip(self.inputs, self.widths[0]):
+            if width > 1:
+                widths.update((wi, width) for wi in ids)
+        gates = self.gates
+        for i, (op, a, b, c) in enumerate(gates):
+            if op == PROJ:
+                width = self.tables[gates.param[i]][1]
+            elif op in (XOR, XORC):
+                width = widths.get(a, 1)
+            else:
+                width = 1
+            if width > 1:
+                widths[c] = width
+            else:
+                widths.pop(c, None)
+        return widths
+    
+    def map_wire_ids(self, new_id):
+        """ Replaces each wire wi in the circuit with new_id[wi], where
+        new_id[-1] = -1 """
+        gates = self.gates
+        for name in ('in0', 'in1', 'out'):
+            setattr(gates, name, array('i', map(new_id.__getitem__, getattr(gates, name))))
     
-    def rename_last_wire(self, wi, wo):
-        cnt = 0
-        for g in reversed(self.gates):
-            if wi in g.out_wires:
-                # replace wi with wo in the output list
-                g.out_wires = [wo if xi == wi else xi for xi in g.out_wires]
-                cnt += 1
-                return cnt
-            if wi in g.in_wires:
-                # replace wi with wo in the input list
-                g.in_wires = [wo if xi == wi else xi for xi in g.in_wires]
-                cnt += 1
-        return cnt
+    def count_gates(self, name):
+        return self.gates.op.count(gate_names.index(name))
+    
+    def optimize(self):
+        """ Fold gates with public inputs, replace gates by an earlier
+        gate with the same inputs, remove double negations, and remove
+        gates that do not contribute to the outputs. This requires that
+        every wire is written at most once. Public values are only
+        folded for 1-bit wires. """
+        n_ands = self.count_gates('AND')
+        n_gates = len(self.gates)
+        input_wires = set(wi for ids in self.inputs for wi in ids)
+        widths = self.wire_widths()
+        next_id = max([self.max_wire()] + list(input_wires) + list(self.constants)) + 1
+        # wire id -> wire id or (None, bit) for public values
+        values = dict()
+        # wire id -> wire id holding the negation
+        negation = dict()
+        gates = Gates()
+        known = dict()
+        def value(wi):
+            if wi in values:
+                return values[wi]
+            if wi in self.constants:
+                return None, self.constants[wi]
+            return wi
+        def new_wire():
+            nonlocal next_id
+            next_id += 1
+            return next_id - 1
+        def add_gate(op, a, b=-1, out=None, param=0):
+            key = (op, min(a, b), max(a, b)) if b >= 0 else (op, a, param)
+            if key not in known:
+                if out is None:
+                    out = new_wire()
+                gates.append(op, a, b, out, param)
+                known[key] = out
+            return known[key]
+        def negate(a, out=None):
+            if isinstance(a, tuple):
+                return None, 1 - a[1]
+            if a not in negation:
+                res = add_gate(NOT, a, out=out)
+                negation[a] = res
+                negation[res] = a
+            return negation[a]
+        def to_wire(a):
+            if isinstance(a, tuple):
+                # public values from the first 1-bit input
+                bits = [wi for wi in input_wires if wi not in widths]
+                if not bits:
+                    raise Exception('Cannot create public value without 1-bit input')
+                first = min(bits)
+                zero = add_gate(XOR, first, first)
+                return negate(zero) if a[1] else zero
+            return a
+        for i, (op, in0, in1, out) in enumerate(self.gates):
+            a = value(in0)
+            if op == NOT:
+                values[out] = negate(a, out)
+                continue
+            elif op == PROJ:
+                values[out] = add_gate(PROJ, to_wire(a), out=out,
+                                       param=self.gates.param[i])
+                continue
+            elif op == XORC:
+                param = self.gates.param[i]
+                values[out] = add_gate(XORC, a, out=out, param=param) if param else a
+                continue
+            b = value(in1)
+            if isinstance(b, tuple):
+                a, b = b, a
+            if op == XOR:
+                if isinstance(a, tuple):
+                    res = negate(b, out) if a[1] else b
+                elif a == b and a not in widths:
+                    res = None, 0
+                elif negation.get(a) == b:
+                    res = None, 1
+                else:
+                    res = add_gate(XOR, a, b, out)
+            elif op == AND:
+                if isinstance(a, tuple):
+                    res = b if a[1] else a
+                elif a == b:
+                    res = a
+                elif negation.get(a) == b:
+                    res = None, 0
+                else:
+                    res = add_gate(AND, a, b, out)
+            else:
+                raise Exception(f'Unknown gate {self.gates.to_string(i)}')
+            values[out] = res
+        # outputs must be distinct wires written by gates
+        used = set()
+        for ids in self.outputs:
+            for i, wi in enumerate(ids):
+                wo = to_wire(value(wi))
+                if (wo in used or wo in input_wires) and wo in widths:
+                    tmp = new_wire()
+                    gates.append(XORC, wo, -1, tmp)
+                    wo = tmp
+                elif wo in used or wo in input_wires:
+                    tmp = new_wire()
+                    gates.append(NOT, wo, -1, tmp)
+                    wo = new_wire()
+                    gates.append(NOT, tmp, -1, wo)
+                used.add(wo)
+                ids[i] = wo
+        # dead gate elimination
+        live = set(used)
+        kept = array('i')
+        for i in reversed(range(len(gates))):
+            if gates.out[i] in live:
+                live.add(gates.in0[i])
+                live.add(gates.in1[i])
+                kept.append(i)
+        kept.reverse()
+        self.gates = gates.select(kept)
+        print(f'Optimized circuit: {n_ands} -> {self.count_gates("AND")} AND gates, '
+              f'{n_gates} -> {len(self.gates)} gates')
     
     def max_wire(self):
-        max_wire_id = -1
-        for g in self.gates:
-            m1 = max(g.out_wires)
-            m2 = max(g.in_wires)
-            max_wire_id = max([m1,m2,max_wire_id])
-        return max_wire_id
-        
+        gates = self.gates
+        return max(max(gates.in0, default=-1), max(gates.in1, default=-1),
+                   max(gates.out, default=-1))
+    
+    def max_id(self):
+        """ Largest wire id in the gates, inputs and outputs """
+        return max([self.max_wire()] + [wi for ids in self.inputs + self.outputs for wi in ids])
+    
     def num_wires(self):
-        return sum(len(g.out_wires) for g in self.gates)
+        return len(self.gates)
     
     def relabel_circuit(self):
+        gates = self.gates
         n_input_wires = sum([len(in_ids) for in_ids in self.inputs])
-        # increment all wire ids in the circuit
-        self.map_wire_ids(lambda w: w + n_input_wires)
-        # rename inputs
+        size = self.max_id() + 2
+        # the i-th input wire gets id i, the output of the i-th gate
+        # gets id n_input_wires + i. An input wire is only renamed in
+        # gates reading it before it is overwritten.
+        position = dict()
+        next_wire_id = 0
+        for ids in self.inputs:
+            for wi in ids:
+                position.setdefault(wi, next_wire_id)
+                next_wire_id += 1
+        pending = array('i', [-1]) * size
+        for wi, i in position.items():
+            pending[wi] = i
+        counts = array('i', [0]) * size
+        # wire id -> last gate writing it
+        writer = array('i', [-1]) * size
+        n_wires = len(gates) + n_input_wires
+        # number of gates reading or writing each new id
+        n_gates = array('i', [0]) * n_input_wires + array('i', [1]) * len(gates)
+        in0 = array('i', [0]) * len(gates)
+        in1 = array('i', [-1]) * len(gates)
+        for i, (op, a, b, c) in enumerate(gates):
+            if pending[a] >= 0:
+                counts[a] += 1
+                new_a = pending[a]
+            else:
+                assert writer[a] >= 0
+                new_a = n_input_wires + writer[a]
+            n_gates[new_a] += 1
+            in0[i] = new_a
+            if b >= 0:
+                if b == a:
+                    new_b = new_a
+                else:
+                    if pending[b] >= 0:
+                        counts[b] += 1
+                        new_b = pending[b]
+                    else:
+                        assert writer[b] >= 0
+                        new_b = n_input_wires + writer[b]
+                    n_gates[new_b] += 1
+                in1[i] = new_b
+            # from now on, c is a different value
+            pending[c] = -1
+            writer[c] = i
+        gates.in0 = in0
+        gates.in1 = in1
+        gates.out = array('i', range(n_input_wires, n_wires))
         next_wire_id = 0
         for ids in self.inputs:
             for i,wi in enumerate(ids):
-                # rename wi (which is now wi+n_input_wires) to next_wire_id
-                cnt = self.rename_first_wire(wi+n_input_wires, next_wire_id)
+                cnt = 0
+                if position[wi] == next_wire_id:
+                    cnt = counts[wi]
                 ids[i] = next_wire_id
                 next_wire_id += 1
                 print(f'Renamed input wire {wi} {cnt} times')
+        for ids in self.outputs:
+            for i,wi in enumerate(ids):
+                assert writer[wi] >= 0
+                ids[i] = n_input_wires + writer[wi]
+        del pending, counts, writer
         
-        # fix self.outputs
-        self.outputs = [[i + n_input_wires for i in ids] for ids in self.outputs]
-        
-        
-        # linearize ids
-        id_dict = {i:i for i in range(n_input_wires)}
-        next_free = n_input_wires
-        for g in self.gates:
-            # print(f'Gate {g}')
-            assert all(wi in id_dict for wi in g.in_wires)
-            assert len(set(g.out_wires)) == len(g.out_wires), f'No duplicates in out wires supported'
-            out_wires = []
-            in_wires = []
-            
-            for wi in g.in_wires:
-                in_wires.append(id_dict[wi])
-                # print(f'Renaming input wire {wi} to {id_dict[wi]}')
-            
-            for wi in g.out_wires:
-                out_wires.append(next_free)
-                id_dict[wi] = next_free
-                # print(f'Renaming output wire {wi} to {next_free}')
-                next_free += 1
-            g.in_wires = in_wires
-            g.out_wires = out_wires
-        # fix self.outputs
-        self.outputs = [[id_dict[i] for i in ids] for ids in self.outputs]
+        # every wire is now written at most once, so renaming a wire
+        # changes all its occurrences. The renamings are recorded
+        # (current id -> id after linearization) and applied at the end.
+        n_output_wires = sum(len(ids) for ids in self.outputs)
+        origin = array('i', [-1]) * (n_wires + n_output_wires)
+        for wi in range(n_wires):
+            if n_gates[wi]:
+                origin[wi] = wi
+        def rename(wi, wo):
+            if not 0 <= wi < len(origin) or origin[wi] < 0:
+                return 0
+            wire, origin[wi] = origin[wi], -1
+            origin[wo] = wire
+            return n_gates[wire]
         
         # now the output wires are not ordered and the last ids in the circuit
-        n_wires = self.num_wires() + n_input_wires
         # rename output wires to free range
         id_cnt = n_wires
         for ids in self.outputs:
             for i,wi in enumerate(ids):
-                cnt = self.rename_last_wire(wi, id_cnt)
+                cnt = rename(wi, id_cnt)
                 ids[i] = id_cnt
                 id_cnt += 1
         
         # we potentially have n_outputs unused wires between n_input_wires and n_wires
-        n_output_wires = sum(len(ids) for ids in self.outputs)
-        wires = set()
-        for g in self.gates:
-            wires |= set(g.in_wires)
-            wires |= set(g.out_wires)
-        max_wire_id = max(wires)
-        unused = list()
-        for i in range(max_wire_id+1):
-            if i not in wires:
-                unused.append(i)
+        max_wire_id = next(i for i in reversed(range(len(origin))) if origin[i] >= 0)
+        unused = [i for i in range(max_wire_id+1) if origin[i] < 0]
         # try to rename wires from n_wires - n_output_wires until n_wires into the unused ids
         unused_idx = 0
         for i in range(n_wires - n_output_wires, n_wires):
-            cnt = self.rename_last_wire(i, unused[unused_idx])
+            cnt = rename(i, unused[unused_idx])
             if cnt > 0:
                 unused_idx += 1
-    
+        
         # rename output wires into the range n_wires - n_output_wires until n_wires
         id_cnt = n_wires - n_output_wires
         for ids in self.outputs:
             for i,wi in enumerate(ids):
-                cnt = self.rename_last_wire(wi, id_cnt)
+                cnt = rename(wi, id_cnt)
                 ids[i] = id_cnt
                 id_cnt += 1
                 print(f'Renamed output wire {wi} {cnt} times')
+        
+        new_id = array('i', [-1]) * (n_wires + 1)
+        for wo, wi in enumerate(origin):
+            if wi >= 0:
+                new_id[wi] = wo
+        self.map_wire_ids(new_id)
     
     def shrink_circuit(self):
-        wires = set()
-        for g in self.gates:
-            wires |= set(g.in_wires)
-            wires |= set(g.out_wires)
-        max_wire_id = max(wires)
-        unused = set()
-        for i in range(max_wire_id+1):
-            if i not in wires:
-                unused.add(i)
-        print(f'Found {len(unused)} unused wire slots')
+        gates = self.gates
+        max_wire_id = self.max_wire()
+        in_gates = bytearray(max_wire_id + 2)
+        for column in (gates.in0, gates.in1, gates.out):
+            for wi in column:
+                in_gates[wi] = 1
+        print(f'Found {in_gates.count(0, 0, max_wire_id + 1)} unused wire slots')
         
-        computed_wires = set(wi for ids in self.inputs for wi in ids)
-        required_wires = set(wi for ids in self.outputs for wi in ids)
-        for g in self.gates:
-            computed_wires |= set(g.out_wires)
-            required_wires |= set(g.in_wires)
-        cnt = 0
-        unused_gate_ids = set()
-        for i in computed_wires:
-            if i not in required_wires:
-                cnt += 1
-                unused_gate_ids.add(i)
+        size = self.max_id() + 2
+        computed_wires = bytearray(size)
+        required_wires = bytearray(size)
+        for ids in self.inputs:
+            for wi in ids:
+                computed_wires[wi] = 1
+        for ids in self.outputs:
+            for wi in ids:
+                required_wires[wi] = 1
+        for wi in gates.out:
+            computed_wires[wi] = 1
+        for column in (gates.in0, gates.in1):
+            for wi in column:
+                required_wires[wi] = 1
+        required_wires[-1] = 0
+        unused_gate_ids = set(i for i in range(size) if computed_wires[i] and not required_wires[i])
+        cnt = len(unused_gate_ids)
         print(f'Found {cnt} unused gates')
         if cnt > 0:
-            for i,g in enumerate(self.gates):
-                for wi in g.out_wires:
-                    if wi in unused_gate_ids:
-                        print(f'#{i} {g} unused output wire {wi}')
+            for i,wi in enumerate(gates.out):
+                if wi in unused_gate_ids:
+                    print(f'#{i} {gates.to_string(i)} unused output wire {wi}')
     
     def check_connectivity(self):
         print('Checking wire connections in the circuit')
-        wires = set()
+        written = bytearray(self.max_id() + 2)
+        # NOT gates only have one input
+        written[-1] = 1
         # add input wires
         for ids in self.inputs:
             for wi in ids:
-                wires.add(wi)
-        for i,g in enumerate(self.gates):
-            for wi in g.in_wires:
-                assert wi in wires, f'Input wire {wi} to gate #{i} ({str(g)}) has not been written'
-            for wi in g.out_wires:
-                wires.add(wi)
+                written[wi] = 1
+        gates = self.gates
+        for i,(op, a, b, c) in enumerate(gates):
+            assert written[a], f'Input wire {a} to gate #{i} ({gates.to_string(i)}) has not been written'
+            assert written[b], f'Input wire {b} to gate #{i} ({gates.to_string(i)}) has not been written'
+            written[c] = 1
         # output wires are written to
         for i,ids in enumerate(self.outputs):
             for wi in ids:
-                assert wi in wires, f'Output wire {wi} of output #{i} has not been written'
+                assert written[wi], f'Output wire {wi} of output #{i} has not been written'
         print('ok')
+    
+    def and_depths(self):
+        """ AND depth of every gate, i.e., the largest number of AND
+        gates on a path from an input to its output. """
+        wire_depth = array('i', [0]) * (self.max_wire() + 2)
+        depths = array('i')
+        for op, a, b, c in self.gates:
+            depth = max(wire_depth[a], wire_depth[b]) + (op == AND)
+            wire_depth[c] = depth
+            depths.append(depth)
+        return depths
+    
+    def levelize(self, reorder=False):
+        """ Group the gates by AND depth. Layer k consists of the AND
+        gates of depth k followed by the other gates of depth k, each
+        in the original order, which keeps the order topological. The
+        gates are only reordered if requested.
         
+        :returns: list of (number of gates, AND, XOR, NOT, PROJ, XORC)
+          per layer
+        """
+        depths = self.and_depths()
+        # number of gates of every type per layer
+        counts = [[0] * len(gate_names) for i in range(max(depths, default=0) + 1)]
+        for op, depth in zip(self.gates.op, depths):
+            counts[depth][op] += 1
+        self.layers = [(sum(c), c[AND], c[XOR], c[NOT], c[PROJ], c[XORC])
+                       for c in counts]
+        if reorder:
+            # next position of the AND and other gates of every layer
+            start = list()
+            first = 0
+            for n_gates, n_ands, *_ in self.layers:
+                start.append([first, first + n_ands])
+                first += n_gates
+            order = array('i', [0]) * len(self.gates)
+            for i, (op, depth) in enumerate(zip(self.gates.op, depths)):
+                slot = start[depth]
+                order[slot[op != AND]] = i
+                slot[op != AND] += 1
+            self.gates = self.gates.select(order)
+        widths = [layer[1] for layer in self.layers]
+        print(f'AND depth {len(self.layers) - 1}, up to {max(widths)} AND gates per layer '
+              f'({sum(widths) / max(1, len(widths) - 1):.1f} on average)')
+        return self.layers
+    
+    def write_layers(self, fp):
+        """ Layer boundaries for a circuit ordered by :py:meth:`levelize`.
+        Circuits with n-bit wires also get the number of PROJ and XORC
+        gates. """
+        header = '# layer first_gate n_gates AND XOR NOT'
+        n_columns = 4
+        if self.is_extended():
+            header += ' PROJ XORC'
+            n_columns = 6
+        fp.write(header + '\n')
+        first = 0
+        for i, layer in enumerate(self.layers):
+            fp.write(' '.join(map(str, (i, first) + layer[:n_columns])) + '\n')
+            first += layer[0]
+    
     def prepare_for_bristol_format(self):
         self.check_connectivity()
         #print(self)
@@ -235,141 +478,396 @@ class Circuit:
         self.check_connectivity()
     
     def write_to_bristol_format(self, fp, not_is_inv=False):
+        """ Write the circuit in Bristol Fashion. Circuits with n-bit
+        wires use the extension described in the help of this script. """
+        gates = self.gates
+        extended = self.is_extended()
+        # PROJ gates on the same input following each other share a line
+        shared = bytearray(len(gates))
+        for i in range(1, len(gates) if extended else 0):
+            shared[i] = gates.op[i] == gates.op[i - 1] == PROJ and \
+                gates.in0[i] == gates.in0[i - 1]
         n_wires = self.max_wire() + 1
-        fp.write(f'{len(self.gates)} {n_wires}\n')
+        fp.write(f'{len(gates) - shared.count(1)} {n_wires}\n')
         inputs = ' '.join([str(len(ids)) for ids in self.inputs])
         outputs = ' '.join([str(len(ids)) for ids in self.outputs])
         fp.write(f'{len(self.inputs)} {inputs}\n')
         fp.write(f'{len(self.outputs)} {outputs}\n')
+        table_ids = dict()
+        if extended:
+            from Compiler.GC.instructions import projs
+            fp.write('WIDTHS %s\n' % ' '.join(str(width) for widths in self.widths
+                                               for width in widths))
+            for i in sorted(set(gates.param[i] for i in range(len(gates))
+                                if gates.op[i] == PROJ)):
+                table_ids[i] = len(table_ids)
+            fp.write(f'TABLES {len(table_ids)}\n')
+            for i in table_ids:
+                input_size, output_size, table = self.tables[i]
+                rows = projs.decode_truth_table(table, input_size, output_size)
+                fp.write(f'{input_size} {output_size} {" ".join(map(str, rows))}\n')
         # write newline (this is not explicitly documented but all parsers expect it...)
         fp.write('\n')
-        for g in self.gates:
-            fp.write(g.to_bristol_format(not_is_inv=not_is_inv))
-            fp.write('\n')
+        names = ('XOR', 'AND', 'INV' if not_is_inv else 'NOT')
+        lines = list()
+        for i, (op, a, b, c) in enumerate(gates):
+            if op in (XOR, AND):
+                lines.append(f'2 1 {a} {b} {c} {names[op]}\n')
+            elif op == NOT:
+                lines.append(f'1 1 {a} {c} {names[op]}\n')
+            elif op == XORC:
+                lines.append(f'1 1 {a} {c} XORC {gates.param[i]}\n')
+            elif not shared[i]:
+                j = i + 1
+                while j < len(gates) and shared[j]:
+                    j += 1
+                outs = ' '.join(map(str, gates.out[i:j]))
+                tables = ' '.join(str(table_ids[x]) for x in gates.param[i:j])
+                lines.append(f'1 {j - i} {a} {outs} PROJ {tables}\n')
+            if len(lines) == 1 << 16:
+                fp.write(''.join(lines))
+                lines.clear()
+        fp.write(''.join(lines))
     
     def __repr__(self):
         return str(self)
     def __str__(self):
-        gates = [str(g) for g in self.gates]
+        gates = [self.gates.to_string(i) for i in range(len(self.gates))]
         return f'Circuit with input={self.inputs}, output={self.outputs}\n' + "\n".join(gates)
 
-sbit_pattern = re.compile(r'''sb(\d+)\(\d+\)''')
-def parse_sbit_op(sbitop):
-    m = sbit_pattern.match(sbitop)
-    return int(m.group(1))
+class WireMap:
+    """ Assigns wire ids to the bits of registers. Bit j of a register
+    with more than 64 bits is stored in register reg + j // 64, so every
+    bit has the key 64 * reg + j. Every gate output gets a new wire id,
+    and instructions that only move bits between registers just copy
+    the ids. """
+    def __init__(self):
+        self.current = dict()
+        self.next_id = 0
+        # wire id -> public bit
+        self.constants = dict()
+    
+    @staticmethod
+    def key(reg, bit):
+        return 64 * reg + bit
+    
+    def read(self, reg, bit=0):
+        key = self.key(reg, bit)
+        if key not in self.current:
+            # bit not computed by any gate, e.g., a constant or input
+            self.current[key] = self.next_id
+            self.next_id += 1
+        return self.current[key]
+    
+    def write(self, reg, bit=0):
+        self.current[self.key(reg, bit)] = self.next_id
+        self.next_id += 1
+        return self.next_id - 1
+    
+    def copy(self, dest, dest_bit, src, src_bit):
+        self.current[self.key(dest, dest_bit)] = self.read(src, src_bit)
+    
+    def load(self, reg, n_bits, value):
+        for j in range(n_bits):
+            self.constants[self.write(reg, j)] = (value >> j) & 1
+
+def parse_binary_gates(args, wires, gates, op):
+    assert len(args) % 4 == 0
+    in0, in1, out = list(), list(), list()
+    for offset in range(0, len(args), 4):
+        n_bits, res, op1, op2 = args[offset:offset+4]
+        # inputs first in case the result overwrites an operand
+        for j in range(n_bits):
+            in0.append(wires.read(op1, j))
+            in1.append(wires.read(op2, j))
+        out += [wires.write(res, j) for j in range(n_bits)]
+    gates.extend(op, in0, in1, out)
 
-def parse_xors(instr):
-    l = list()
-    name = instr[0]
-    assert name == 'xors'
-    n_xors = int(instr[1])
-    assert n_xors % 4 == 0
-    offset = 2
-    for i in range(n_xors//4):
-        n_bits = int(instr[offset+0])
-        res = parse_sbit_op(instr[offset+1])
-        op1 = parse_sbit_op(instr[offset+2])
-        op2 = parse_sbit_op(instr[offset+3])
-        
-        assert n_bits == 1, 'More bits for XORS currently not implemented'
-        l.append(Instruction.XOR(res, op1, op2))
-        offset += 4
-    return l
+def parse_xors(args, wires, gates):
+    parse_binary_gates(args, wires, gates, XOR)
 
-def parse_ands(instr):
+def parse_ands(args, wires, gates):
+    parse_binary_gates(args, wires, gates, AND)
+
+def parse_andrs(args, wires, gates):
+    """ AND of every bit with the same single bit """
+    assert len(args) % 4 == 0
+    for offset in range(0, len(args), 4):
+        n_bits, res, op1, op2 = args[offset:offset+4]
+        op2 = wires.read(op2)
+        in_wires = [wires.read(op1, j) for j in range(n_bits)]
+        gates.extend(AND, in_wires, [op2] * n_bits,
+                     [wires.write(res, j) for j in range(n_bits)])
+
+def parse_reveal(args, wires):
     l = list()
-    name = instr[0]
-    assert name == 'ands'
-    n_ands = int(instr[1])
-    assert n_ands % 4 == 0
-    offset = 2
-    for i in range(n_ands//4):
-        n_bits = int(instr[offset+0])
-        res = parse_sbit_op(instr[offset+1])
-        op1 = parse_sbit_op(instr[offset+2])
-        op2 = parse_sbit_op(instr[offset+3])
-        
-        assert n_bits == 1, 'More bits for ANDS currently not implemented'
-        l.append(Instruction.AND(res, op1, op2))
-        offset += 4
+    assert len(args) % 3 == 0
+    for offset in range(0, len(args), 3):
+        n_bits, _, rev = args[offset:offset+3]
+        l += [wires.read(rev, j) for j in range(n_bits)]
     return l
 
-def parse_reveal(instr):
+def parse_revealn(args, wires):
+    """ Returns the n-bit wires and their bit length """
     l = list()
-    name = instr[0]
-    assert name == 'reveal'
-    n = int(instr[1])
-    assert n % 3 == 0
-    offset = 2
-    for i in range(n//3):
-        n_bits = int(instr[offset+0])
-        rev = parse_sbit_op(instr[offset+2])
-        
-        assert n_bits == 1, 'More bits for reveal currently not implemented'
-        l.append(rev)
-        offset += 3
-    return l
+    offset = 1
+    while offset < len(args):
+        n_wires = args[offset]
+        rev = args[offset + n_wires + 1]
+        l += [wires.read(rev, j) for j in range(n_wires)]
+        offset += n_wires + 2
+    return l, args[0]
+
+def parse_marker(name, args, wires):
+    """ Wires revealed after a break point for an input or output and
+    their bit length """
+    assert name in ('reveal', 'revealn')
+    if name == 'reveal':
+        return parse_reveal(args, wires), 1
+    else:
+        return parse_revealn(args, wires)
+
+def describe_wires(ids, width):
+    if width == 1:
+        return f'{len(ids)} bits'
+    return f'{len(ids)} {width}-bit wires'
+
+def parse_nots(args, wires, gates):
+    n_bits, res, op1 = args
+    in_wires = [wires.read(op1, j) for j in range(n_bits)]
+    gates.extend(NOT, in_wires, [-1] * n_bits,
+                 [wires.write(res, j) for j in range(n_bits)])
+
+def parse_projs(args, wires, gates):
+    """ Projection of every wire, the truth table is given by its
+    index in the tape """
+    table = args[3]
+    for offset in range(4, len(args), 3):
+        n_wires, res, op1 = args[offset:offset+3]
+        in_wires = [wires.read(op1, j) for j in range(n_wires)]
+        gates.extend(PROJ, in_wires, [-1] * n_wires,
+                     [wires.write(res, j) for j in range(n_wires)], table)
+
+def parse_projms(args, wires, gates):
+    """ Several projections of every wire, one PROJ gate each """
+    n_tables = args[0]
+    tables = args[2 + n_tables:2 + 2 * n_tables]
+    for offset in range(2 + 2 * n_tables, len(args), n_tables + 2):
+        n_wires = args[offset]
+        results = args[offset + 1:offset + 1 + n_tables]
+        op1 = args[offset + 1 + n_tables]
+        in_wires = [wires.read(op1, j) for j in range(n_wires)]
+        for j, wire in enumerate(in_wires):
+            for res, table in zip(results, tables):
+                gates.append(PROJ, wire, -1, wires.write(res, j), table)
+
+def parse_xormn(args, wires, gates, clear):
+    """ XOR of n-bit wires with a public value, which has to be known
+    from clear """
+    for offset in range(1, len(args), 4):
+        n_wires, res, op1, op2 = args[offset:offset+4]
+        if ('cb', op2) not in clear:
+            raise Exception(f'Cannot write xormn with unknown operand cb{op2} as Bristol Fashion circuit')
+        in_wires = [wires.read(op1, j) for j in range(n_wires)]
+        gates.extend(XORC, in_wires, [-1] * n_wires,
+                     [wires.write(res, j) for j in range(n_wires)],
+                     clear['cb', op2])
+
+def parse_moves(name, args, wires):
+    """ Instructions that only rearrange bits """
+    if name == 'movsb':
+        dest, src = args
+        for j in range(64):
+            if wires.key(src, j) in wires.current:
+                wires.copy(dest, j, src, j)
+            else:
+                wires.current.pop(wires.key(dest, j), None)
+    elif name == 'bitdecs':
+        for j, dest in enumerate(args[1:]):
+            wires.copy(dest, 0, args[0], j)
+    elif name == 'bitcoms':
+        for j, src in enumerate(args[1:]):
+            wires.copy(args[0], j, src, 0)
+    elif name == 'trans':
+        n_outputs = args[0]
+        outputs, inputs = args[1:1+n_outputs], args[1+n_outputs:]
+        # read everything first in case registers overlap
+        bits = [[wires.read(src, i) for src in inputs] for i in range(n_outputs)]
+        for dest, column in zip(outputs, bits):
+            for j, wire in enumerate(column):
+                wires.current[wires.key(dest, j)] = wire
 
-def parse_nots(instr):
-    name = instr[0]
-    assert name == 'nots'
-    n_bits = int(instr[1])
-    assert n_bits == 1, 'More bits for NOTS currently not implemented'
-    res = parse_sbit_op(instr[2])
-    op1 = parse_sbit_op(instr[3])
-    return [Instruction.NOT(res, op1)]
+# instructions used by parse_circuit(), the assembly of the ones in
+# var_args starts with the number of arguments
+circuit_instructions = {'xors', 'ands', 'andrs', 'nots', 'reveal', 'movsb',
+                        'bitdecs', 'bitcoms', 'trans', 'ldbits', 'projs',
+                        'projms', 'xormn', 'revealn', 'truthtable', 'ldint',
+                        'convcint'}
+var_args = circuit_instructions - {'nots', 'movsb', 'ldbits', 'ldint', 'convcint'}
+
+def parse_arg(arg):
+    """ Integer or register number of, e.g., sb<reg>(<size>) """
+    return int(arg.lstrip('abcdefghijklmnopqrstuvwxyz').partition('(')[0])
+
+def read_asm_file(path):
+    """ Yields ('#', comment) for comments and (name, arguments) for
+    instructions. The arguments are only parsed for the instructions
+    in circuit_instructions. """
+    with open(path, 'r') as fp:
+        for line in fp:
+            if line.startswith('#'):
+                yield '#', line
+                continue
+            line, _, _ = line.partition('#')
+            instruction = line.replace(',', ' ').split()
+            if not instruction:
+                continue
+            name = instruction[0]
+            args = None
+            if name in circuit_instructions:
+                args = [parse_arg(x) for x in instruction[1 + (name in var_args):]]
+            yield name, args
+
+def bytecode_formats():
+    """ Opcode -> (name, number of words per argument or None for
+    instructions starting with the number of arguments), taken from
+    the instruction classes of the compiler. """
+    import Compiler.instructions
+    import Compiler.GC.instructions
+    from Compiler.instructions_base import Instruction, ArgFormats
+    formats = dict()
+    for module in (Compiler.instructions, Compiler.GC.instructions):
+        for cls in vars(module).values():
+            if not isinstance(cls, type) or not issubclass(cls, Instruction) or \
+               not isinstance(cls.code, int):
+                continue
+            # prefer the plain instruction to the vectorized one
+            if cls.code in formats and len(formats[cls.code][0]) <= len(cls.__name__):
+                continue
+            if cls.has_var_args(cls):
+                words = None
+            else:
+                words = [getattr(ArgFormats[x], 'length', 4) // 4 for x in cls.arg_format]
+            formats[cls.code] = cls.__name__, words
+    return formats
+
+def read_bytecode_file(path):
+    """ Yields the same as read_asm_file() from the bytecode of a tape,
+    with the names of the basic blocks from <tape>.blocks as comments. """
+    formats = bytecode_formats()
+    blocks = dict()
+    with open(path[:-len('.bc')] + '.blocks', 'r') as fp:
+        for line in fp:
+            offset, _, name = line.rstrip('\n').partition(' ')
+            blocks[int(offset)] = name
+    code = array('i')
+    with open(path, 'rb') as fp:
+        code.frombytes(fp.read())
+    if sys.byteorder == 'little':
+        code.byteswap()
+    pos = 0
+    for i in itertools.count():
+        if pos == len(code):
+            break
+        if i in blocks:
+            yield '#', blocks[i]
+        # the upper bits are the vector size
+        opcode = code[pos] & 0x3ff
+        if opcode not in formats:
+            raise Exception(f'Unknown opcode {hex(opcode)} at instruction {i}')
+        name, words = formats[opcode]
+        if words is None:
+            n_args = code[pos + 1]
+            args = code[pos + 2:pos + 2 + n_args]
+            pos += 2 + n_args
+        else:
+            args = code[pos + 1:pos + 1 + sum(words)]
+            pos += 1 + sum(words)
+        yield name, args.tolist() if name in circuit_instructions else None
 
 input_marker = re.compile(r'''Input (\d+)''')
 output_marker = re.compile(r'''Output (\d+)''')
 
-def parse_asm_file(path, inputs, outputs):
-    gates = list()
+def parse_circuit(instructions, inputs, outputs):
+    """ Collect the gates of instructions as yielded by
+    read_asm_file() or read_bytecode_file() in a Circuit. """
+    gates = Gates()
     input_ids = dict()
     output_ids = dict()
+    widths = dict()
     next_input = False
     next_output = False
     next_i = None
-    with open(path, 'r') as fp:
-        for line in fp.readlines():
-            if not line.startswith('#'):
-                line, _, _ = line.partition('#')
-                instruction = re.split(r''',?\s''', line.strip())
-                name = instruction[0]
-                if next_input:
-                    assert name == 'reveal'
-                    next_input = False
-                    assert next_i not in input_ids
-                    ids = parse_reveal(instruction)
-                    assert len(ids) == inputs[next_i]
-                    input_ids[next_i] = ids
-                    print(f'Found Input #{next_i} with {len(ids)} bits')
-                if next_output:
-                    assert name == 'reveal'
-                    next_output = False
-                    assert next_i not in output_ids
-                    ids = parse_reveal(instruction)
-                    assert len(ids) == outputs[next_i]
-                    output_ids[next_i] = ids
-                    print(f'Found Output #{next_i} with {len(ids)} bits')
-                if name == 'xors':
-                    gates += parse_xors(instruction)
-                elif name == 'ands':
-                    gates += parse_ands(instruction)
-                elif name == 'nots':
-                    gates += parse_nots(instruction)
-            else:
-                m = re.search(input_marker, line)
-                if m != None:
-                    next_input = True
-                    next_output = False
-                    next_i = int(m.group(1))
-                    continue
-                m = re.search(output_marker, line)
-                if m != None:
-                    next_output = True
-                    next_input = False
-                    next_i = int(m.group(1))
-                    continue
+    wires = WireMap()
+    # ('ci' or 'cb', register) -> public value, only kept while
+    # no other instruction could overwrite the register
+    clear = dict()
+    tables = dict()
+    for name, args in instructions:
+        if name != '#':
+            if next_input:
+                next_input = False
+                assert next_i not in input_ids
+                ids, width = parse_marker(name, args, wires)
+                assert len(ids) == inputs[next_i]
+                for wi in ids:
+                    # constants are only placeholders for inputs
+                    wires.constants.pop(wi, None)
+                input_ids[next_i] = ids
+                widths[False, next_i] = width
+                print(f'Found Input #{next_i} with {describe_wires(ids, width)}')
+            if next_output:
+                next_output = False
+                assert next_i not in output_ids
+                ids, width = parse_marker(name, args, wires)
+                assert len(ids) == outputs[next_i]
+                output_ids[next_i] = ids
+                widths[True, next_i] = width
+                print(f'Found Output #{next_i} with {describe_wires(ids, width)}')
+            if name == 'ldint':
+                clear['ci', args[0]] = args[1]
+                continue
+            elif name == 'convcint':
+                if ('ci', args[1]) in clear:
+                    clear['cb', args[0]] = clear['ci', args[1]] % 2 ** 32
+                else:
+                    clear.pop(('cb', args[0]), None)
+                continue
+            elif args is None or name in ('reveal', 'revealn'):
+                clear.clear()
+            if name == 'xors':
+                parse_xors(args, wires, gates)
+            elif name == 'ands':
+                parse_ands(args, wires, gates)
+            elif name == 'andrs':
+                parse_andrs(args, wires, gates)
+            elif name == 'nots':
+                parse_nots(args, wires, gates)
+            elif name in ('movsb', 'bitdecs', 'bitcoms', 'trans'):
+                parse_moves(name, args, wires)
+            elif name == 'ldbits':
+                wires.load(*args)
+            elif name == 'projs':
+                parse_projs(args, wires, gates)
+            elif name == 'projms':
+                parse_projms(args, wires, gates)
+            elif name == 'xormn':
+                parse_xormn(args, wires, gates, clear)
+            elif name == 'truthtable':
+                tables[args[0]] = args[1], args[2], args[3:]
+        else:
+            m = re.search(input_marker, args)
+            if m != None:
+                next_input = True
+                next_output = False
+                next_i = int(m.group(1))
+                continue
+            m = re.search(output_marker, args)
+            if m != None:
+                next_output = True
+                next_input = False
+                next_i = int(m.group(1))
+                continue
     
     input_id_list = []
     for i in range(len(inputs)):
@@ -379,8 +877,11 @@ def parse_asm_file(path, inputs, outputs):
     for i in range(len(outputs)):
         assert i in output_ids
         output_id_list.append(output_ids[i])
+    widths = ([widths[False, i] for i in range(len(inputs))],
+              [widths[True, i] for i in range(len(outputs))])
     
-    return gates, input_id_list, output_id_list
+    return Circuit(gates, input_id_list, output_id_list, wires.constants,
+                   widths, tables)
 
 description = '''This script transpiles the Boolean circuit assembly from the MP-SPDZ compiler into the Bristol Fashion Circuit format (https://homes.esat.kuleuven.be/~nsmart/MPC/).
 
@@ -408,10 +909,15 @@ Example MP-SPDZ file "test.mpc"
 Compile to assembly using "./compile.py -a <assembly name> test.mpc".
 Now run the a2bristol script "python a2bristol.py --input 2 --output 2 <assembly name>". This will create the circuit file <assembly name>.txt.
 Note that --input or --output can be repeated multiple times, e.g., --input 2 --input 4 for two breakpoints with names 'Input 0' and 'Input 1' revealing 2 and 4 sbits, respectively.
+Registers with several bits such as sbits.get_type(n) are split into one wire per bit, in the order of the revealed registers and then the bits. The sizes given by --input and --output are in bits, e.g., --input 64 for revealing 8 registers of type sbits.get_type(8).
+Programs with n-bit wires (sbits.proj(), sbits.proj_multi(), and XOR with public values) are written in an extension of Bristol Fashion with PROJ and XORC gates, which is described in Compiler/circuit.py. Break points then also mark revealn, and the sizes given by --input and --output count n-bit wires instead of bits.
+Instead of the assembly, the script also reads the bytecode of a tape without compiling with -a, e.g., "python a2bristol.py --input 2 --output 2 Programs/Bytecode/test-0.bc". The break points are then found in Programs/Bytecode/test-0.blocks, which the compiler writes next to the bytecode.
 '''
 parser = argparse.ArgumentParser(prog='a2bristol.py', description=description, formatter_class=argparse.RawTextHelpFormatter)
 parser.add_argument('path', type=str)
 parser.add_argument('--not-is-inv', action='store_true', default=False, required=False, dest='not_is_inv', help='Write every encountered NOTS instruction as INV gate (instead of NOT) in the output circuit. The MP-SPDZ circuit module requires this.')
+parser.add_argument('-O', '--optimize', action='store_true', default=False, required=False, dest='optimize', help='Fold gates with public inputs, merge identical gates, and remove gates that do not contribute to the output before writing the circuit.')
+parser.add_argument('--layers', action='store_true', default=False, required=False, dest='layers', help='Order the gates by AND depth and write the first gate and the number of AND, XOR and NOT gates of every layer to <path>.layers.')
 parser.add_argument('--input', type=str, action='append', required=False, dest='input')
 parser.add_argument('--output', type=str, action='append', required=False, dest='output')
 
@@ -429,10 +935,19 @@ for i,in_stmt in enumerate(outputs):
 
 
 
-gates, input_ids, output_ids = parse_asm_file(args.path, parsed_inputs, parsed_outputs)
-c = Circuit(gates, input_ids, output_ids)
+if args.path.endswith('.bc'):
+    instructions = read_bytecode_file(args.path)
+else:
+    instructions = read_asm_file(args.path)
+c = parse_circuit(instructions, parsed_inputs, parsed_outputs)
+if args.optimize:
+    c.optimize()
+c.levelize(reorder=args.layers)
 c.prepare_for_bristol_format()
 
 with open(f'{args.path}.txt', 'w') as fp:
     c.write_to_bristol_format(fp, not_is_inv=args.not_is_inv)
+if args.layers:
+    with open(f'{args.path}.layers', 'w') as fp:
+        c.write_layers(fp)
 print('Done :)')
\ No newline at end of file
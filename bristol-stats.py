@@ -0,0 +1,240 @@
+import argparse
+import numpy as np
+
+from Compiler.GC.sbox import and_cost, proj_cost
+
+# gate types after loading, MAND and multi-output PROJ are split into
+# one gate per output
+XOR, AND, INV, EQ, EQW, PROJ, XORC = range(7)
+gate_names = ('XOR', 'AND', 'INV', 'EQ', 'EQW', 'PROJ', 'XORC')
+# replacement of the gate names in the text, longer names first
+sentinels = [('XORC', XORC), ('MAND', -1), ('XOR', XOR), ('AND', AND),
+             ('INV', INV), ('NOT', INV), ('EQW', EQW), ('EQ', EQ),
+             ('PROJ', PROJ)]
+# bytes of a key (label) in MP-SPDZ
+key_size = 16
+# ThreeHalves sends 1.5 keys and five bits per AND gate
+three_halves_size = 1.5 * key_size + 5 / 8
+
+class Circuit:
+    """ Gates of a Bristol Fashion circuit, including the extension
+    with PROJ and XORC gates described in Compiler/circuit.py, as NumPy
+    arrays with one entry per gate. Gates with one input have in1 = -1,
+    and EQ gates have no input wires at all. The header is read line
+    by line, and the gates are parsed in one go by replacing the gate
+    names with negative numbers. """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        lines = data.split(b'\n')
+        header = [lines[0].split(), lines[1].split(), lines[2].split()]
+        self.n_gates, self.n_wires = map(int, header[0])
+        self.inputs = [int(x) for x in header[1][1:]]
+        self.outputs = [int(x) for x in header[2][1:]]
+        self.widths = [1] * (len(self.inputs) + len(self.outputs))
+        # input bits of every truth table
+        self.tables = []
+        i = 3
+        while i < len(lines) and lines[i].split()[:1] in ([b'WIDTHS'], [b'TABLES']):
+            tokens = lines[i].split()
+            if tokens[0] == b'WIDTHS':
+                self.widths = [int(x) for x in tokens[1:]]
+            else:
+                for line in lines[i + 1:i + 1 + int(tokens[1])]:
+                    self.tables.append(int(line.split()[0]))
+                i += int(tokens[1])
+            i += 1
+        body = b'\n'.join(lines[i:])
+        self.parse_gates(body)
+
+    def parse_gates(self, body):
+        # line of every token
+        chars = np.frombuffer(body, np.uint8)
+        space = np.isin(chars, np.frombuffer(b' \t\r\n', np.uint8))
+        token_start = ~space & np.r_[True, space[:-1]]
+        token_line = np.cumsum(chars == ord('\n'))[token_start]
+        for name, code in sentinels:
+            body = body.replace(name.encode(), str(-2 - code).encode())
+        try:
+            values = np.array(body.split(), dtype=np.int64)
+        except ValueError:
+            raise Exception('Unknown gate type in ' + self.path)
+        assert len(values) == len(token_line)
+        # first token of every gate
+        starts = np.flatnonzero(np.r_[True, token_line[1:] != token_line[:-1]])
+        if len(starts) != self.n_gates:
+            raise Exception(f'Found {len(starts)} instead of {self.n_gates} gates')
+        n_in = values[starts]
+        n_out = values[starts + 1]
+        types = -2 - values[starts + 2 + n_in + n_out]
+        if np.any(values[starts + 2 + n_in + n_out] >= 0):
+            raise Exception('Malformed gate')
+        columns = dict(pos=[], op=[], in0=[], in1=[], out=[], param=[])
+        def add(op, pos, in0, in1, out, param=0):
+            for key, value in dict(pos=pos, op=op, in0=in0, in1=in1,
+                                   out=out, param=param).items():
+                columns[key].append(np.broadcast_to(value, len(pos)))
+        # gates with one output
+        for op in XOR, AND, INV, EQ, EQW, XORC:
+            s = starts[types == op]
+            if op in (XOR, AND):
+                add(op, s, values[s + 2], values[s + 3], values[s + 4])
+            elif op == EQ:
+                # the input is a constant
+                add(op, s, -1, -1, values[s + 3])
+            else:
+                add(op, s, values[s + 2], -1, values[s + 3],
+                    values[s + 5] if op == XORC else 0)
+        # MAND and PROJ gates, one entry for every output
+        for code in -1, PROJ:
+            m = n_out[types == code]
+            s = np.repeat(starts[types == code], m)
+            j = np.arange(m.sum()) - np.repeat(np.cumsum(m) - m, m)
+            m = np.repeat(m, m)
+            if code == -1:
+                # 2m inputs and m outputs
+                add(AND, s, values[s + 2 + j], values[s + 2 + m + j],
+                    values[s + 2 + 2 * m + j])
+            else:
+                add(PROJ, s, values[s + 2], -1, values[s + 3 + j],
+                    values[s + 4 + m + j])
+        # back to the order in the file
+        order = np.argsort(np.concatenate(columns['pos']), kind='stable')
+        for key in 'op', 'in0', 'in1', 'out', 'param':
+            setattr(self, key, np.concatenate(columns[key]).astype(np.int64)[order])
+
+    def counts(self):
+        return dict((name, int(np.count_nonzero(self.op == i)))
+                    for i, name in enumerate(gate_names))
+
+    def nonfree(self):
+        """ Gates that need a garbled table """
+        return (self.op == AND) | (self.op == PROJ)
+
+    def depths(self):
+        """ Depth of every gate counting AND and PROJ gates, computed
+        one topological level at a time starting from the gates whose
+        inputs are all circuit inputs. """
+        n_gates = len(self.op)
+        n_wires = self.n_wires
+        writer = np.full(n_wires + 1, -1)
+        writer[self.out] = np.arange(n_gates)
+        # operands written by a gate, sorted by wire
+        wires = np.concatenate([self.in0, self.in1])
+        readers = np.concatenate([np.arange(n_gates)] * 2)
+        computed = (wires >= 0) & (writer[wires] >= 0)
+        wires, readers = wires[computed], readers[computed]
+        pending = np.bincount(readers, minlength=n_gates)
+        order = np.argsort(wires, kind='stable')
+        readers = readers[order]
+        indptr = np.r_[0, np.cumsum(np.bincount(wires, minlength=n_wires))]
+        nonfree = self.nonfree()
+        # wire depths with a spare last entry for in1 = -1
+        wire_depth = np.zeros(n_wires + 1, np.int64)
+        depth = np.zeros(n_gates, np.int64)
+        frontier = np.flatnonzero(pending == 0)
+        while len(frontier):
+            d = np.maximum(wire_depth[self.in0[frontier]],
+                           wire_depth[self.in1[frontier]]) + nonfree[frontier]
+            depth[frontier] = d
+            wire_depth[self.out[frontier]] = d
+            # gates reading the new wires
+            w = self.out[frontier]
+            n = indptr[w + 1] - indptr[w]
+            index = np.repeat(indptr[w] - np.cumsum(n) + n, n) + np.arange(n.sum())
+            gates, count = np.unique(readers[index], return_counts=True)
+            pending[gates] -= count
+            frontier = gates[pending[gates] == 0]
+        if np.any(pending):
+            raise Exception('Circuit has a cycle or reads unwritten wires')
+        return depth
+
+    def peak_live_wires(self):
+        """ Largest number of wires the evaluator has to keep when
+        evaluating the gates in the order of the file. Inputs are live
+        from the start and outputs until the end. """
+        n_gates = len(self.op)
+        birth = np.zeros(self.n_wires, np.int64)
+        birth[self.out] = np.arange(n_gates)
+        death = birth.copy()
+        for column in self.in0, self.in1:
+            used = column >= 0
+            np.maximum.at(death, column[used], np.flatnonzero(used))
+        death[self.n_wires - sum(self.outputs):] = n_gates
+        # only wires that are inputs or written by a gate
+        wires = np.r_[np.arange(sum(self.inputs)), self.out]
+        change = np.bincount(birth[wires], minlength=n_gates + 2) - \
+            np.bincount(death[wires] + 1, minlength=n_gates + 2)
+        return int(np.cumsum(change).max())
+
+    def garbled_keys(self):
+        """ Number of keys sent for AND and PROJ gates as in
+        Compiler/GC/sbox.py, i.e., half gates and projections with row
+        reduction """
+        keys = and_cost().size * int(np.count_nonzero(self.op == AND))
+        proj = self.param[self.op == PROJ]
+        if len(proj):
+            input_bits = np.array(self.tables)[proj]
+            keys += int(sum(proj_cost(int(k)).size * int(n) for k, n in
+                            zip(*np.unique(input_bits, return_counts=True))))
+        return keys
+
+def megabytes(n_bytes):
+    return f'{n_bytes / 2 ** 20:.3f} MB'
+
+def report(path, args):
+    c = Circuit(path)
+    counts = c.counts()
+    depth = c.depths()
+    nonfree = c.nonfree()
+    widths = np.bincount(depth[nonfree], minlength=depth.max(initial=0) + 1)
+    peak = c.peak_live_wires()
+    n_ands = counts['AND']
+    has_proj = counts['PROJ'] > 0
+    stats = dict(circuit=path, gates=len(c.op), wires=c.n_wires,
+                 depth=len(widths) - 1, max_width=int(widths.max(initial=0)),
+                 peak_wires=peak, **counts)
+    stats['halfgates'] = None if has_proj else n_ands * and_cost().size * key_size * args.simd
+    stats['threehalves'] = None if has_proj else n_ands * three_halves_size * args.simd
+    stats['proj'] = c.garbled_keys() * key_size * args.simd
+    print(path)
+    print(f'  {len(c.op)} gates, {c.n_wires} wires, inputs {c.inputs}, outputs {c.outputs}'
+          + (f', widths {c.widths}' if has_proj or max(c.widths) > 1 else ''))
+    print('  ' + ', '.join(f'{n} {name}' for name, n in counts.items() if n))
+    print(f'  depth {stats["depth"]} (AND and PROJ gates), up to {stats["max_width"]} per layer '
+          f'({nonfree.sum() / max(1, len(widths) - 1):.1f} on average)')
+    print(f'  peak live wires {peak} ({megabytes(peak * key_size * args.simd)} of keys)')
+    sizes = [(name, stats[key]) for name, key in (('HalfGates', 'halfgates'),
+                                                 ('ThreeHalves', 'threehalves'),
+                                                 ('projection', 'proj'))]
+    print(f'  garbled size with SIMD={args.simd}: ' +
+          ', '.join(f'{name} {"n/a" if size is None else megabytes(size)}'
+                    for name, size in sizes))
+    if args.layers:
+        for i, width in enumerate(widths):
+            print(f'  layer {i}: {width}')
+    return stats
+
+description = '''Statistics of circuits in Bristol Fashion or the extension with PROJ gates written by a2bristol.py: gate counts by type, depth counting AND and PROJ gates, number of these gates per layer, the largest number of wires the evaluator keeps when evaluating the gates in order, and the size of the garbled circuit with HalfGates, ThreeHalves and projection gates.
+The projection scheme uses half gates for AND gates and row reduction for PROJ gates as in MP-SPDZ. HalfGates and ThreeHalves do not apply to circuits with PROJ gates. Sizes do not include input keys.
+
+Example: python bristol-stats.py skinny64_128.txt twine80.txt --simd 1000
+'''
+parser = argparse.ArgumentParser(prog='bristol-stats.py', description=description, formatter_class=argparse.RawTextHelpFormatter)
+parser.add_argument('path', type=str, nargs='+')
+parser.add_argument('--simd', type=int, required=False, default=1, help='The number of SIMD, i.e., parallel invocations of the circuit')
+parser.add_argument('--layers', action='store_true', default=False, required=False, help='Print the number of AND and PROJ gates of every layer.')
+parser.add_argument('--csv', type=str, required=False, help='Generate a csv file with the data.')
+
+args = parser.parse_args()
+
+all_stats = [report(path, args) for path in args.path]
+
+if args.csv:
+    with open(args.csv, 'w') as fp:
+        keys = list(all_stats[0])
+        fp.write(','.join(keys) + '\n')
+        for stats in all_stats:
+            fp.write(','.join('' if stats[key] is None else str(stats[key]) for key in keys) + '\n')
+    print(f'Wrote results to {args.csv}')
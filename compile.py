@@ -78,6 +78,18 @@ def main():
                       "(number of parties as argument)")
     parser.add_option("-C", "--CISC", action="store_true", dest="cisc",
                       help="faster CISC compilation mode")
+    parser.add_option("--sbox-objective", dest="sbox_objective",
+                      default=defaults.sbox_objective,
+                      help="weights for choosing between projections and "
+                      "bitsliced circuits for S-boxes "
+                      "(default: garble=1,eval=1,size=1)")
+    parser.add_option("--gc-schedule", dest="gc_schedule",
+                      default=defaults.gc_schedule,
+                      help="merge AND and projection gates of binary "
+                      "circuits into batches as wide as possible instead of "
+                      "minimizing rounds, optionally limiting the gates per "
+                      "instruction and per layer (e.g., wide or "
+                      "wide,batch=100000,live=1000000)")
     parser.add_option("-v", "--verbose", action="store_true", dest="verbose",
                       help="more verbose output")
     options,args = parser.parse_args()
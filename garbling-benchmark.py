@@ -52,7 +52,15 @@ def parse_mpspdz(path):
         mem = float(mem.group(1))
         return time, mem
 
+def write_inputs(simd):
+    # the proj variants read the cells of the blocks and the AES key
+    # as n-bit wire inputs from the garbler
+    os.makedirs('Player-Data', exist_ok=True)
+    with open('Player-Data/Input-P0-0', 'w') as fp:
+        fp.write(' '.join(['0'] * (16 * (simd + 1))))
+
 def benchmark_mpspdz(dir, target, simd, iters):
+    write_inputs(simd)
     compile(['-B', str(simd), 'garbling_benchmark', target, str(simd)])
     garble_logs, eval_logs = run_mpspdz(f'garbling_benchmark-{target}-{simd}', dir, iters)
     garble = []